@@ -0,0 +1,41 @@
+import importlib
+import sys
+
+
+def lazy_attributes(package, attributes):
+    ''' Module :code:`__getattr__` and :code:`__dir__` (PEP 562) for a
+    package whose public names are imported from their submodules on first
+    access, so that importing one submodule does not import all of them and
+    their dependencies. Python versions without module :code:`__getattr__`
+    import every name right away.
+
+    Parameters
+    ----------
+    package : str
+        Name of the package, i.e., its :code:`__name__`.
+    attributes : dict
+        Submodule (relative to the package) of each lazy name.
+
+    Returns
+    -------
+    getattr_, dir_ : callable
+        Assign these to the package's :code:`__getattr__` and
+        :code:`__dir__`.
+    '''
+    def getattr_(name):
+        if name not in attributes:
+            message = "module '{}' has no attribute '{}'".format(package, name)
+            raise AttributeError(message)
+        module = importlib.import_module(attributes[name], package)
+        value = getattr(module, name)
+        setattr(sys.modules[package], name, value)
+        return value
+
+    def dir_():
+        return sorted(set(vars(sys.modules[package])) | set(attributes))
+
+    if sys.version_info < (3, 7):
+        for name in attributes:
+            getattr_(name)
+
+    return getattr_, dir_
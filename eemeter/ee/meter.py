@@ -1,4 +1,8 @@
+from datetime import datetime
 import logging
+import multiprocessing
+from multiprocessing.pool import ThreadPool
+import traceback
 
 from eemeter.processors.interventions import get_modeling_period_set
 from eemeter.processors.location import (
@@ -7,9 +11,18 @@ from eemeter.processors.location import (
 )
 from eemeter.processors.dispatchers import get_energy_modeling_dispatches
 from eemeter.ee.derivatives import annualized_weather_normal, gross_predicted
+from eemeter.modeling.params import portable_params
+from eemeter.weather.noaa import NOAAWeatherSourceBase
+from eemeter.weather.registry import WeatherSourceRegistry
 
 logger = logging.getLogger(__name__)
 
+# Model attributes set by fitting, copied back from trace worker processes.
+_FITTED_MODEL_ATTRIBUTES = [
+    "params", "X", "y", "estimated", "r2", "rmse", "cvrmse", "upper",
+    "lower", "n",
+]
+
 
 class EnergyEfficiencyMeter(object):
     ''' The standard way of calculating energy efficiency savings values from
@@ -18,16 +31,52 @@ class EnergyEfficiencyMeter(object):
     Parameters
     ----------
     settings : dict
-        Dictionary of settings (ignored; for now, this is a placeholder).
+        Dictionary of settings:
+
+        - :code:`"trace_executor"`: how modeled energy traces within a
+          single project are fitted and their derivatives computed. One of
+          :code:`None` (default; serially), :code:`"thread"` (in a thread
+          pool) or :code:`"process"` (in a process pool). Weather sources are
+          loaded for every needed year beforehand and only read by workers.
+          With :code:`"process"`, fitted model state is copied back from
+          the worker processes without :code:`"X_design_info"`, which
+          can't be pickled; models predict from the :code:`"design"` spec
+          in their parameters instead. :code:`"process"` is rejected by
+          :code:`.evaluate_many()` with more than one worker, because its
+          workers cannot have children.
+        - :code:`"n_trace_workers"`: number of workers for
+          :code:`"trace_executor"`; defaults to the number of CPUs.
+        - :code:`"lean_results"`: if :code:`True`, results of
+          :code:`.evaluate()` hold only numeric fit outputs, derivatives and
+          compact model parameters, without trace data, fitted model objects
+          or weather sources. Default :code:`False`.
+        - :code:`"fit_cache"`: an
+          :code:`eemeter.modeling.cache.SqliteFitCache` from which model fits
+          to unchanged data are restored instead of refit. Default
+          :code:`None`.
+        - :code:`"solver"`: regression solver for all models, one of
+          :code:`"elastic_net_cv"`, :code:`"ols"` or :code:`"ridge"`. See
+          :code:`eemeter.modeling.solvers.get_estimator`. Default
+          :code:`None` (the model default, :code:`"elastic_net_cv"`).
     '''
 
+    TRACE_EXECUTORS = [None, "thread", "process"]
+
     def __init__(self, settings=None):
         if settings is None:
-            self.settings = {}
+            settings = {}
         self.settings = settings
 
+        trace_executor = self.settings.get("trace_executor")
+        if trace_executor not in self.TRACE_EXECUTORS:
+            message = (
+                'Trace executor "{}" not recognized. Use one of {}.'
+                .format(trace_executor, self.TRACE_EXECUTORS)
+            )
+            raise ValueError(message)
+
     def evaluate(self, project, weather_source=None,
-                 weather_normal_source=None):
+                 weather_normal_source=None, weather_source_registry=None):
         ''' Main entry point to the meter, taking in project data and returning
         results indicating energy efficiency performance.
 
@@ -42,6 +91,9 @@ class EnergyEfficiencyMeter(object):
         weather_normal_source : eemeter.weather.WeatherSource
             Weather normal source to be used for this meter. Overrides weather
             source found using :code:`project.site`. Useful for test mocking.
+        weather_source_registry : eemeter.weather.WeatherSourceRegistry
+            Registry through which weather sources found using
+            :code:`project.site` are shared with other projects.
 
         Returns
         -------
@@ -57,89 +109,58 @@ class EnergyEfficiencyMeter(object):
             - :code:`"modeled_energy_trace_derivatives"`: derivatives for each
               modeled energy trace.
             - :code:`"project_derivatives"`: Project summaries for derivatives.
+            - :code:`"weather_source"`: weather source used.
+            - :code:`"weather_normal_source"`: weather normal source used.
+
+            If the :code:`"lean_results"` setting is :code:`True`,
+            :code:`"modeled_energy_traces"` instead maps trace labels to
+            dicts with the items :code:`"interpretation"`, :code:`"unit"`
+            and :code:`"fit_outputs"`, in which :code:`"model_params"` are
+            portable parameters (see
+            :code:`eemeter.modeling.params.portable_params`); and the
+            weather sources are replaced by
+            :code:`"weather_source_station"` and
+            :code:`"weather_normal_source_station"`.
         '''
 
         modeling_period_set = get_modeling_period_set(project.interventions)
 
         if weather_source is None:
-            weather_source = get_weather_source(project)
+            weather_source = get_weather_source(
+                project, weather_source_registry)
         else:
             logger.info("Using supplied weather_source")
 
         if weather_normal_source is None:
-            weather_normal_source = get_weather_normal_source(project)
+            weather_normal_source = get_weather_normal_source(
+                project, weather_source_registry)
         else:
             logger.info("Using supplied weather_normal_source")
 
         dispatches = get_energy_modeling_dispatches(
-            modeling_period_set, project.energy_trace_set)
+            modeling_period_set, project.energy_trace_set,
+            self.settings.get("fit_cache"), self.settings.get("solver"))
 
         derivatives = {}
+        tasks = []
         for trace_label, modeled_energy_trace in dispatches.items():
-
-            trace_derivatives = {}
+            derivatives[trace_label] = {}
+            if modeled_energy_trace is not None:
+                tasks.append((trace_label, modeled_energy_trace,
+                              modeling_period_set, weather_source,
+                              weather_normal_source))
+
+        for trace_label, fit_outputs, trace_derivatives in \
+                self._map_traces(tasks):
+            dispatches[trace_label].fit_outputs = fit_outputs
             derivatives[trace_label] = trace_derivatives
 
-            if modeled_energy_trace is None:
-                continue
-
-            modeled_energy_trace.fit(weather_source)
-
-            for group_label, (_, reporting_period) in \
-                    modeling_period_set.iter_modeling_period_groups():
-
-                period_derivatives = {
-                    "BASELINE": {},
-                    "REPORTING": {},
-                }
-                trace_derivatives[group_label] = \
-                    period_derivatives
-
-                baseline_label, reporting_label = group_label
-
-                baseline_output = modeled_energy_trace.fit_outputs[
-                    baseline_label]
-                reporting_output = modeled_energy_trace.fit_outputs[
-                    reporting_label]
-
-                if baseline_output["status"] == "SUCCESS":
-                    awn = modeled_energy_trace.compute_derivative(
-                        baseline_label,
-                        annualized_weather_normal,
-                        weather_normal_source=weather_normal_source)
-                    if awn is not None:
-                        period_derivatives["BASELINE"].update(awn)
-
-                    gp = modeled_energy_trace.compute_derivative(
-                        baseline_label,
-                        gross_predicted,
-                        weather_source=weather_source,
-                        reporting_period=reporting_period)
-                    if gp is not None:
-                        period_derivatives["BASELINE"].update(gp)
-
-                if reporting_output["status"] == "SUCCESS":
-                    awn = modeled_energy_trace.compute_derivative(
-                        reporting_label,
-                        annualized_weather_normal,
-                        weather_normal_source=weather_normal_source)
-                    if awn is not None:
-                        period_derivatives["REPORTING"].update(awn)
-
-                    gp = modeled_energy_trace.compute_derivative(
-                        reporting_label,
-                        gross_predicted,
-                        weather_source=weather_source,
-                        reporting_period=reporting_period)
-                    if gp is not None:
-                        period_derivatives["REPORTING"].update(gp)
-
         project_derivatives = self._get_project_derivatives(
             modeling_period_set,
             project.energy_trace_set,
             derivatives)
 
-        return {
+        results = {
             "modeling_period_set": modeling_period_set,
             "modeled_energy_traces": dispatches,
             "modeled_energy_trace_derivatives": derivatives,
@@ -148,6 +169,137 @@ class EnergyEfficiencyMeter(object):
             "weather_normal_source": weather_normal_source,
         }
 
+        if self.settings.get("lean_results", False):
+            results = _lean_results(results)
+
+        return results
+
+    def evaluate_many(self, projects, n_workers=None, weather_source=None,
+                      weather_normal_source=None, chunksize=1,
+                      weather_source_registry_size=256):
+        ''' Evaluate a portfolio of projects using a pool of worker
+        processes, yielding results as they become available.
+
+        Parameters
+        ----------
+        projects : iterable of eemeter.structures.Project
+            Projects for which energy effienciency performance is to be
+            evaluated.
+        n_workers : int, default None
+            Number of worker processes. If :code:`None`, uses the number of
+            CPUs on this machine. If :code:`1`, projects are evaluated
+            serially in this process.
+        weather_source : eemeter.weather.WeatherSource
+            Weather source to be used for every project. Overrides weather
+            source found using :code:`project.site`.
+        weather_normal_source : eemeter.weather.WeatherSource
+            Weather normal source to be used for every project. Overrides
+            weather normal source found using :code:`project.site`.
+        chunksize : int, default 1
+            Number of projects sent to a worker process at a time.
+        weather_source_registry_size : int, default 256
+            Maximum number of weather sources each worker keeps loaded for
+            sharing between projects at the same station. Weather sources
+            are released when the run finishes.
+
+        Yields
+        ------
+        out : dict
+            Outputs for a single project, in order of completion:
+
+            - :code:`"project_index"`: position of the project in
+              :code:`projects`.
+            - :code:`"status"`: :code:`"SUCCESS"` or :code:`"FAILURE"`.
+            - :code:`"results"`: results of :code:`.evaluate()`; :code:`None`
+              on failure. Unless the :code:`"lean_results"` setting is
+              :code:`True`, fitted :code:`"modeled_energy_traces"` are
+              omitted because they cannot be sent between processes.
+            - :code:`"traceback"`: traceback of the failure, if any.
+
+        Raises
+        ------
+        ValueError
+            If the :code:`"trace_executor"` setting is :code:`"process"` and
+            :code:`n_workers` is not :code:`1`.
+        '''
+        if n_workers != 1 and \
+                self.settings.get("trace_executor") == "process":
+            message = (
+                'The "process" trace executor cannot be used by the worker'
+                ' processes of evaluate_many; use "thread" or n_workers=1.'
+            )
+            raise ValueError(message)
+
+        return self._evaluate_many(
+            projects, n_workers, weather_source, weather_normal_source,
+            chunksize, weather_source_registry_size)
+
+    def _evaluate_many(self, projects, n_workers, weather_source,
+                       weather_normal_source, chunksize,
+                       weather_source_registry_size):
+        tasks = (
+            (project_index, self, project, weather_source,
+             weather_normal_source)
+            for project_index, project in enumerate(projects)
+        )
+
+        if n_workers == 1:
+            with WeatherSourceRegistry(
+                    weather_source_registry_size) as weather_source_registry:
+                for task in tasks:
+                    yield _evaluate_project(task, weather_source_registry)
+            return
+
+        pool = multiprocessing.Pool(
+            n_workers, _init_worker, (weather_source_registry_size,))
+        try:
+            for output in pool.imap_unordered(
+                    _evaluate_project_in_worker, tasks, chunksize):
+                yield output
+        finally:
+            pool.terminate()
+            pool.join()
+
+    def _map_traces(self, tasks):
+        trace_executor = self.settings.get("trace_executor")
+
+        if trace_executor is None or len(tasks) <= 1:
+            return [_fit_modeled_energy_trace(task) for task in tasks]
+
+        _, _, modeling_period_set, weather_source, _ = tasks[0]
+        _preload_weather_years(
+            weather_source, modeling_period_set,
+            [modeled_energy_trace for _, modeled_energy_trace, _, _, _
+             in tasks])
+
+        n_trace_workers = self.settings.get("n_trace_workers")
+        if trace_executor == "thread":
+            pool = ThreadPool(n_trace_workers)
+            func = _fit_modeled_energy_trace
+        else:
+            pool = multiprocessing.Pool(n_trace_workers)
+            func = _fit_modeled_energy_trace_in_process
+
+        try:
+            outputs = pool.map(func, tasks)
+        finally:
+            pool.terminate()
+            pool.join()
+
+        if trace_executor == "thread":
+            return outputs
+
+        # models were fitted in worker processes; copy their fitted state
+        # onto the models of this process.
+        results = []
+        for task, (trace_label, fit_outputs, trace_derivatives,
+                   fitted_models) in zip(tasks, outputs):
+            model_mapping = task[1].model_mapping
+            for modeling_period_label, state in fitted_models.items():
+                model_mapping[modeling_period_label].__dict__.update(state)
+            results.append((trace_label, fit_outputs, trace_derivatives))
+        return results
+
     def _get_project_derivatives(self, modeling_period_set, energy_trace_set,
                                  derivatives):
 
@@ -295,6 +447,195 @@ class EnergyEfficiencyMeter(object):
         return project_derivatives
 
 
+def _fit_modeled_energy_trace(task):
+    (
+        trace_label,
+        modeled_energy_trace,
+        modeling_period_set,
+        weather_source,
+        weather_normal_source,
+    ) = task
+
+    modeled_energy_trace.fit(weather_source)
+
+    trace_derivatives = {}
+    for group_label, (_, reporting_period) in \
+            modeling_period_set.iter_modeling_period_groups():
+
+        period_derivatives = {
+            "BASELINE": {},
+            "REPORTING": {},
+        }
+        trace_derivatives[group_label] = period_derivatives
+
+        for modeling_period_label, interpretation in \
+                zip(group_label, ["BASELINE", "REPORTING"]):
+
+            output = modeled_energy_trace.fit_outputs[modeling_period_label]
+            if output["status"] != "SUCCESS":
+                continue
+
+            awn = modeled_energy_trace.compute_derivative(
+                modeling_period_label,
+                annualized_weather_normal,
+                weather_normal_source=weather_normal_source)
+            if awn is not None:
+                period_derivatives[interpretation].update(awn)
+
+            gp = modeled_energy_trace.compute_derivative(
+                modeling_period_label,
+                gross_predicted,
+                weather_source=weather_source,
+                reporting_period=reporting_period)
+            if gp is not None:
+                period_derivatives[interpretation].update(gp)
+
+    return trace_label, modeled_energy_trace.fit_outputs, trace_derivatives
+
+
+def _fit_modeled_energy_trace_in_process(task):
+    trace_label, fit_outputs, trace_derivatives = \
+        _fit_modeled_energy_trace(task)
+
+    # patsy design info can't be pickled back to the parent process; models
+    # predict from the "design" spec in their parameters instead.
+    for outputs in fit_outputs.values():
+        model_params = outputs.get("model_params")
+        if model_params is not None:
+            model_params.pop("X_design_info", None)
+
+    fitted_models = {}
+    for modeling_period_label, model in task[1].model_mapping.items():
+        fitted_models[modeling_period_label] = dict(
+            (name, getattr(model, name)) for name in _FITTED_MODEL_ATTRIBUTES
+            if hasattr(model, name))
+
+    return trace_label, fit_outputs, trace_derivatives, fitted_models
+
+
+def _preload_weather_years(weather_source, modeling_period_set,
+                           modeled_energy_traces):
+    # Load every year trace workers could ask for, so that they only read
+    # from the shared weather source.
+    if not isinstance(weather_source, NOAAWeatherSourceBase):
+        return
+
+    years = set()
+    for modeled_energy_trace in modeled_energy_traces:
+        index = modeled_energy_trace.trace.data.index
+        if index.shape[0] > 0:
+            years.update([index[0].year, index[-1].year])
+
+    for _, (_, reporting_period) in \
+            modeling_period_set.iter_modeling_period_groups():
+        years.add(reporting_period.start_date.year)
+        if reporting_period.end_date is None:
+            years.add(datetime.utcnow().year)
+        else:
+            years.add(reporting_period.end_date.year)
+
+    if len(years) > 0:
+        weather_source.add_year_range(min(years), max(years))
+
+
+def _lean_results(results):
+    modeled_energy_traces = {}
+    for trace_label, modeled_energy_trace in \
+            results["modeled_energy_traces"].items():
+
+        if modeled_energy_trace is None:
+            modeled_energy_traces[trace_label] = None
+            continue
+
+        fit_outputs = {}
+        for modeling_period_label, outputs in \
+                modeled_energy_trace.fit_outputs.items():
+            model = modeled_energy_trace.model_mapping[modeling_period_label]
+            fit_outputs[modeling_period_label] = \
+                _lean_fit_outputs(outputs, model)
+
+        modeled_energy_traces[trace_label] = {
+            "interpretation": modeled_energy_trace.trace.interpretation,
+            "unit": modeled_energy_trace.trace.unit,
+            "fit_outputs": fit_outputs,
+        }
+
+    weather_source = results["weather_source"]
+    weather_normal_source = results["weather_normal_source"]
+
+    return {
+        "modeling_period_set": results["modeling_period_set"],
+        "modeled_energy_traces": modeled_energy_traces,
+        "modeled_energy_trace_derivatives":
+            results["modeled_energy_trace_derivatives"],
+        "project_derivatives": results["project_derivatives"],
+        "weather_source_station": getattr(weather_source, "station", None),
+        "weather_normal_source_station":
+            getattr(weather_normal_source, "station", None),
+    }
+
+
+def _lean_fit_outputs(outputs, model):
+    outputs = dict(outputs)
+
+    model_params = outputs.get("model_params")
+    if model_params is None:
+        return outputs
+
+    model_params = portable_params(model_params)
+    for base_temp in ["cooling_base_temp", "heating_base_temp"]:
+        if model_params[base_temp] is None:
+            model_params[base_temp] = getattr(model, base_temp, None)
+
+    outputs["model_params"] = model_params
+    return outputs
+
+
+# Per-process weather source registry for evaluate_many worker processes.
+_worker_weather_source_registry = None
+
+
+def _init_worker(weather_source_registry_size):
+    global _worker_weather_source_registry
+    _worker_weather_source_registry = WeatherSourceRegistry(
+        weather_source_registry_size)
+
+
+def _evaluate_project_in_worker(task):
+    # module level so that it can be sent to worker processes.
+    return _evaluate_project(task, _worker_weather_source_registry)
+
+
+def _evaluate_project(task, weather_source_registry=None):
+    project_index, meter, project, weather_source, weather_normal_source = \
+        task
+
+    try:
+        results = meter.evaluate(project, weather_source,
+                                 weather_normal_source,
+                                 weather_source_registry)
+    except Exception:
+        logger.exception(
+            "Evaluation failed for project {}.".format(project_index))
+        return {
+            "project_index": project_index,
+            "status": "FAILURE",
+            "results": None,
+            "traceback": traceback.format_exc(),
+        }
+
+    if not meter.settings.get("lean_results", False):
+        # fitted models hold patsy design info, which can't be pickled.
+        results.pop("modeled_energy_traces")
+
+    return {
+        "project_index": project_index,
+        "status": "SUCCESS",
+        "results": results,
+        "traceback": None,
+    }
+
+
 def _add_errors(errors1, errors2):
     # TODO add autocorrelation correction
     mean1, lower1, upper1, n1 = errors1
@@ -0,0 +1,178 @@
+import hashlib
+import logging
+import sqlite3
+
+import numpy as np
+
+from eemeter import get_version
+from eemeter.weather.cache import SqliteJSONStore
+
+logger = logging.getLogger(__name__)
+
+# Increment to invalidate fits cached by earlier versions of model code.
+FIT_CACHE_VERSION = 1
+
+
+class SqliteFitCache(SqliteJSONStore):
+    ''' On-disk cache of fitted linear model coefficients, so that refitting
+    a model to unchanged data skips the regression entirely. Fits are keyed
+    by a fingerprint of the design matrix and response (and therefore of
+    the modeling-period-filtered trace data, the weather data and the base
+    temperatures used to create them), the estimator class and parameters,
+    the eemeter model and :code:`FIT_CACHE_VERSION`.
+
+    Basic usage is as follows:
+
+    .. code-block:: python
+
+        >>> from eemeter.ee.meter import EnergyEfficiencyMeter
+        >>> from eemeter.modeling.cache import SqliteFitCache
+        >>> meter = EnergyEfficiencyMeter(settings={
+        ...     'fit_cache': SqliteFitCache(max_size=256 * 2**20),
+        ... })
+
+    Cached fits are stored in :code:`fit_cache.db` in the weather cache
+    directory by default (see :code:`EEMETER_WEATHER_CACHE_DIRECTORY`). Use
+    :code:`.clear()` to invalidate all cached fits.
+
+    Parameters
+    ----------
+    directory : str, default None
+        Directory in which to store cached fits.
+    max_size : int, default 67108864
+        Maximum total size, in bytes, of cached fits. The least recently
+        used fits are evicted once this is exceeded.
+    '''
+
+    filename = "fit_cache.db"
+
+    def __init__(self, directory=None, max_size=64 * 2**20):
+        super(SqliteFitCache, self).__init__(directory)
+        self.max_size = max_size
+
+    def __repr__(self):
+        return 'SqliteFitCache("{}")'.format(self.directory)
+
+    def __getstate__(self):
+        state = super(SqliteFitCache, self).__getstate__()
+        state["max_size"] = self.max_size
+        return state
+
+    def __setstate__(self, state):
+        super(SqliteFitCache, self).__setstate__(state)
+        self.max_size = state["max_size"]
+
+    def fingerprint(self, estimator, X, y, context=None):
+        ''' Content fingerprint identifying a fit.
+
+        Parameters
+        ----------
+        estimator : sklearn.linear_model estimator
+            Unfitted estimator.
+        X : pandas.DataFrame or numpy.ndarray
+            Design matrix.
+        y : numpy.ndarray
+            Response vector.
+        context : object, default None
+            Anything else which should distinguish fits, such as the
+            :code:`repr` of the eemeter model doing the fitting.
+
+        Returns
+        -------
+        fingerprint : str
+            Hex digest of the fit inputs.
+        '''
+        import sklearn
+
+        h = hashlib.sha1()
+        parts = [
+            FIT_CACHE_VERSION,
+            get_version(),
+            sklearn.__version__,
+            type(estimator).__name__,
+            sorted(estimator.get_params().items()),
+            context,
+            list(getattr(X, "columns", [])),
+        ]
+        for part in parts:
+            h.update(repr(part).encode("utf-8"))
+        h.update(np.ascontiguousarray(X, dtype=float).tobytes())
+        h.update(np.ascontiguousarray(y, dtype=float).tobytes())
+        return h.hexdigest()
+
+    def fit(self, estimator, X, y, context=None):
+        ''' Fit the estimator, or restore its fitted :code:`coef_` and
+        :code:`intercept_` from the cache if these inputs have been fit
+        before. Errors reading or writing the cache are logged, not raised.
+
+        Parameters
+        ----------
+        estimator : sklearn.linear_model estimator
+            Unfitted estimator.
+        X : pandas.DataFrame or numpy.ndarray
+            Design matrix.
+        y : numpy.ndarray
+            Response vector.
+        context : object, default None
+            See :code:`.fingerprint(`.
+
+        Returns
+        -------
+        estimator : sklearn.linear_model estimator
+            The fitted estimator.
+        '''
+        key = self.fingerprint(estimator, X, y, context)
+
+        try:
+            cached = self.retrieve_json(key)
+            if cached is not None:
+                self._touch(key)
+        except sqlite3.Error as e:
+            logger.warning("{} could not read fit: {}".format(self, e))
+            cached = None
+
+        if cached is not None:
+            logger.info("{} restored cached fit {}.".format(self, key))
+            estimator.coef_ = np.array(cached["coefficients"], dtype=float)
+            estimator.intercept_ = cached["intercept"]
+            return estimator
+
+        estimator.fit(X, y)
+
+        try:
+            self.save_json(key, {
+                "coefficients": [float(c) for c in estimator.coef_],
+                "intercept": float(estimator.intercept_),
+            })
+            self._evict()
+        except sqlite3.Error as e:
+            logger.warning("{} could not save fit: {}".format(self, e))
+
+        return estimator
+
+    def _touch(self, key):
+        # mark a fit as most recently used; fits are evicted in order of
+        # (dt, id), so the id is moved past every other fit as well.
+        with self.transaction() as conn:
+            conn.execute(
+                'UPDATE items SET dt=datetime(\'now\'),'
+                ' id=(SELECT MAX(id) FROM items) + 1 WHERE key=?;', (key,))
+
+    def _evict(self):
+        cursor = self.conn.cursor()
+        cursor.execute('SELECT SUM(LENGTH(data)) FROM items;')
+        total_size = cursor.fetchone()[0] or 0
+        if total_size <= self.max_size:
+            return
+
+        cursor.execute('SELECT id, LENGTH(data) FROM items ORDER BY dt, id;')
+        evicted = []
+        for id_, size in cursor.fetchall():
+            if total_size <= self.max_size:
+                break
+            evicted.append((id_,))
+            total_size -= size
+
+        with self.transaction() as conn:
+            conn.executemany('DELETE FROM items WHERE id=?;', evicted)
+        logger.info("{} evicted {} fits.".format(self, len(evicted)))
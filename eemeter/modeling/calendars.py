@@ -0,0 +1,173 @@
+import threading
+
+import numpy as np
+import pandas as pd
+
+# Years covered by a calendar when it is first built; calendars are rebuilt
+# over a wider range if a lookup falls outside of this.
+DEFAULT_START_YEAR = 1950
+DEFAULT_END_YEAR = 2050
+
+_calendars = {}
+_calendars_lock = threading.Lock()
+
+
+class HolidayCalendar(object):
+    ''' Daily calendar of holiday names, precomputed over a range of years
+    so that a whole :code:`DatetimeIndex` can be mapped to holiday names
+    with one vectorized lookup instead of one :code:`holidays` lookup per
+    day. Holiday names have any :code:`" (Observed)"` suffix removed; days
+    which are not holidays are named :code:`"none"`.
+
+    Use :code:`get_holiday_calendar` to share one calendar per country
+    within a process.
+
+    Parameters
+    ----------
+    country : str, default "UnitedStates"
+        Name of a country class in the :code:`holidays` package, e.g.,
+        :code:`"UnitedStates"`, :code:`"Canada"` or :code:`"UnitedKingdom"`.
+    start_year : int, default 1950
+        First year covered.
+    end_year : int, default 2050
+        Last year covered.
+    '''
+
+    def __init__(self, country="UnitedStates", start_year=DEFAULT_START_YEAR,
+                 end_year=DEFAULT_END_YEAR):
+        import holidays
+
+        try:
+            self._holidays_class = getattr(holidays, country)
+        except AttributeError:
+            message = (
+                'Holiday calendar for country "{}" not found in the'
+                ' holidays package.'.format(country)
+            )
+            raise ValueError(message)
+        self.country = country
+        self._lock = threading.Lock()
+        self._build(start_year, end_year)
+
+    def __repr__(self):
+        return (
+            'HolidayCalendar("{}", start_year={}, end_year={})'
+            .format(self.country, self.start_year, self.end_year)
+        )
+
+    def __len__(self):
+        ''' Number of holidays in the calendar. '''
+        return int(np.count_nonzero(self.codes))
+
+    def __reduce__(self):
+        # unpickle to the shared calendar of the receiving process.
+        return (get_holiday_calendar, (self.country,))
+
+    def _build(self, start_year, end_year):
+        raw = self._holidays_class(years=range(start_year, end_year + 1))
+
+        names = ["none"]
+        codes_by_name = {"none": 0}
+        start = np.datetime64("{:04d}-01-01".format(start_year), "D")
+        end = np.datetime64("{:04d}-01-01".format(end_year + 1), "D")
+        codes = np.zeros((end - start).astype(int), dtype=np.int16)
+
+        for date, raw_name in raw.items():
+            name = raw_name
+            if name.endswith(" (Observed)"):
+                name = name[:-11]
+            code = codes_by_name.get(name)
+            if code is None:
+                code = codes_by_name[name] = len(names)
+                names.append(name)
+            codes[(np.datetime64(date, "D") - start).astype(int)] = code
+
+        # swapped in as one tuple so concurrent lookups see either the old or
+        # the new calendar, never a mix.
+        self._table = (start, codes, np.array(names, dtype=object))
+        self.start_year, self.end_year = start_year, end_year
+
+    @property
+    def codes(self):
+        ''' Holiday code of each day covered, starting January 1 of
+        :code:`.start_year`. '''
+        return self._table[1]
+
+    @property
+    def names(self):
+        ''' Holiday name of each code. '''
+        return self._table[2]
+
+    def _lookup(self, dt_index):
+        if getattr(dt_index, "tz", None) is not None:
+            dt_index = dt_index.tz_localize(None)  # local wall time
+        days = dt_index.values.astype("datetime64[D]")
+
+        if len(days) > 0:
+            years = days[[days.argmin(), days.argmax()]] \
+                .astype("datetime64[Y]").astype(int) + 1970
+            start_year, end_year = int(years[0]), int(years[1])
+            if start_year < self.start_year or end_year > self.end_year:
+                with self._lock:
+                    self._build(min(start_year, self.start_year),
+                                max(end_year, self.end_year))
+
+        start, codes, names = self._table
+        return codes[(days - start).astype(int)], names
+
+    def holiday_codes(self, dt_index):
+        ''' Map dates to integer holiday codes, which index into
+        :code:`.names`. Code 0 is :code:`"none"`.
+
+        Parameters
+        ----------
+        dt_index : pandas.DatetimeIndex
+            Dates to look up. Timezone-aware indexes are looked up by their
+            local date.
+
+        Returns
+        -------
+        codes : numpy.ndarray
+            Holiday code for each date.
+        '''
+        codes, _ = self._lookup(dt_index)
+        return codes
+
+    def holiday_names(self, dt_index):
+        ''' Map dates to holiday names.
+
+        Parameters
+        ----------
+        dt_index : pandas.DatetimeIndex
+            Dates to look up. Timezone-aware indexes are looked up by their
+            local date.
+
+        Returns
+        -------
+        holiday_names : pandas.Series
+            Holiday name (or :code:`"none"`) for each date, indexed by
+            :code:`dt_index`.
+        '''
+        codes, names = self._lookup(dt_index)
+        return pd.Series(names[codes], index=dt_index)
+
+
+def get_holiday_calendar(country="UnitedStates"):
+    ''' Get the holiday calendar for a country, building it the first time
+    it is requested in this process.
+
+    Parameters
+    ----------
+    country : str, default "UnitedStates"
+        See :code:`HolidayCalendar`.
+
+    Returns
+    -------
+    calendar : eemeter.modeling.calendars.HolidayCalendar
+        Calendar shared by all callers in this process.
+    '''
+    with _calendars_lock:
+        calendar = _calendars.get(country)
+        if calendar is None:
+            calendar = _calendars[country] = HolidayCalendar(country)
+    return calendar
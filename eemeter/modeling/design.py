@@ -0,0 +1,548 @@
+from collections import OrderedDict
+import ast
+import threading
+import weakref
+
+import numpy as np
+import pandas as pd
+
+# Maximum number of compiled formula configurations held by :code:`dmatrices`.
+MAX_COMPILED_FORMULAS = 64
+
+_lock = threading.Lock()
+_formula_builders = OrderedDict()
+_design_info_builders = weakref.WeakKeyDictionary()
+
+
+def _patsy():
+    # patsy is only needed to parse formulas and for designs that can't be
+    # compiled, so it is imported on first use.
+    import patsy
+    return patsy
+
+
+def _categorical(value, *args, **kwargs):
+    # stands in for patsy's C(); levels and contrasts come from design info.
+    return value
+
+
+class _DataNamespace(object):
+
+    def __init__(self, data):
+        self.data = data
+
+    def __getitem__(self, key):
+        try:
+            return self.data[key]
+        except (KeyError, IndexError, ValueError):
+            raise KeyError(key)
+
+
+def _is_supported_expression(node):
+    if isinstance(node, ast.Name):
+        return True
+    if isinstance(node, ast.Attribute):
+        return not node.attr.startswith("_") and \
+            _is_supported_expression(node.value)
+    return False
+
+
+def _compile_factor_code(code):
+    ''' Compile a factor such as :code:`CDD` or
+    :code:`C(tempF.index.month)`. Only plain (dotted) names, optionally
+    wrapped in :code:`C(`, are supported, since anything else may depend on
+    stateful transforms or the environment patsy evaluated them in.
+    '''
+    try:
+        node = ast.parse(code, mode="eval").body
+    except SyntaxError:
+        return None
+
+    if isinstance(node, ast.Call) and isinstance(node.func, ast.Name) \
+            and node.func.id == "C" and len(node.args) >= 1:
+        node = node.args[0]
+
+    if not _is_supported_expression(node):
+        return None
+
+    return compile(code, "<design factor {}>".format(code), "eval")
+
+
+def _to_builtin(value):
+    # numpy scalars (e.g., categorical levels) to JSON-serializable values.
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+def _contrast_to_spec(matrix):
+    # treatment-style contrasts are stored as the level of each column.
+    matrix = np.asarray(matrix, dtype=float)
+    if np.all((matrix == 0) | (matrix == 1)) and \
+            np.all(matrix.sum(axis=0) == 1):
+        return {"levels": [int(i) for i in matrix.argmax(axis=0)]}
+    return {"matrix": matrix.tolist()}
+
+
+def _contrast_from_spec(spec, n_categories):
+    if "levels" in spec:
+        levels = spec["levels"]
+        matrix = np.zeros((n_categories, len(levels)))
+        matrix[levels, np.arange(len(levels))] = 1.
+        return matrix
+    return np.array(spec["matrix"], dtype=float)
+
+
+class DesignMatrixBuilder(object):
+    ''' Builds design matrices with the column layout of a patsy
+    :code:`DesignInfo` using numpy only, skipping patsy's per-call formula
+    evaluation. Produces the same columns, values and dropped rows as
+    :code:`patsy.build_design_matrices([design_info], data,
+    return_type="dataframe")`.
+
+    The layout can be exported with :code:`.to_spec()` as a
+    JSON-serializable design spec, from which :code:`.from_spec(` creates an
+    equivalent builder without patsy.
+
+    Parameters
+    ----------
+    design_info : patsy.DesignInfo
+        Column layout, e.g., as stored in the :code:`"X_design_info"` model
+        parameter.
+
+    Raises
+    ------
+    NotImplementedError
+        If a factor of the design is more than a (dotted) column name,
+        optionally wrapped in :code:`C(`.
+    '''
+
+    def __init__(self, design_info):
+        factors = []
+        for factor, factor_info in design_info.factor_infos.items():
+            if factor_info.type == "categorical":
+                categories = list(factor_info.categories)
+            else:
+                categories = None
+            factors.append((factor.code, factor_info.type,
+                            factor_info.num_columns, categories))
+
+        subterms = []
+        for term_subterms in design_info.term_codings.values():
+            for subterm in term_subterms:
+                subterms.append((
+                    [factor.code for factor in subterm.factors],
+                    dict((factor.code, contrast.matrix) for factor, contrast
+                         in subterm.contrast_matrices.items()),
+                    subterm.num_columns,
+                ))
+
+        self._set_layout(list(design_info.column_names), factors, subterms)
+        self.design_info = design_info
+
+    def _set_layout(self, column_names, factors, subterms):
+        self.design_info = None
+        self.column_names = column_names
+
+        self._factors = OrderedDict()
+        for code, factor_type, num_columns, categories in factors:
+            compiled = _compile_factor_code(code)
+            if compiled is None:
+                message = 'Cannot compile design factor "{}".'.format(code)
+                raise NotImplementedError(message)
+            if categories is not None:
+                categories = pd.Index(categories, dtype=object)
+            self._factors[code] = (compiled, factor_type, num_columns,
+                                   categories)
+
+        self._subterms = [
+            (tuple(codes), contrast_matrices, num_columns)
+            for codes, contrast_matrices, num_columns in subterms
+        ]
+        self._spec = None
+
+    @classmethod
+    def from_spec(cls, spec):
+        ''' Create a builder from a design spec.
+
+        Parameters
+        ----------
+        spec : dict
+            Design spec, as returned by :code:`.to_spec()`.
+
+        Returns
+        -------
+        builder : eemeter.modeling.design.DesignMatrixBuilder
+            Builder for the design, with :code:`.design_info` of
+            :code:`None`.
+        '''
+        factors = []
+        n_categories = {}
+        for factor in spec["factors"]:
+            categories = factor.get("categories")
+            if categories is not None:
+                n_categories[factor["code"]] = len(categories)
+            factors.append((factor["code"], factor["type"],
+                            factor.get("num_columns"), categories))
+
+        subterms = []
+        for subterm in spec["subterms"]:
+            contrast_matrices = dict(
+                (code, _contrast_from_spec(contrast, n_categories[code]))
+                for code, contrast in subterm["contrasts"].items()
+            )
+            subterms.append((subterm["factors"], contrast_matrices,
+                             subterm["num_columns"]))
+
+        builder = cls.__new__(cls)
+        builder._set_layout(list(spec["column_names"]), factors, subterms)
+        builder._spec = spec
+        return builder
+
+    def to_spec(self):
+        ''' Export the layout as a JSON-serializable design spec.
+
+        Returns
+        -------
+        spec : dict
+            Design spec, with keys
+
+            - :code:`"column_names"`: design matrix column names.
+            - :code:`"factors"`: for each factor, its :code:`"code"`
+              (e.g., :code:`"C(tempF.index.month)"`), :code:`"type"`
+              (:code:`"numerical"` or :code:`"categorical"`) and either
+              :code:`"num_columns"` or :code:`"categories"`.
+            - :code:`"subterms"`: for each group of columns, in order, the
+              codes of the :code:`"factors"` multiplied together, the
+              :code:`"contrasts"` coding each categorical factor, and
+              :code:`"num_columns"`.
+        '''
+        if self._spec is None:
+            factors = []
+            for code, (_, factor_type, num_columns, categories) in \
+                    self._factors.items():
+                if categories is None:
+                    factors.append({"code": code, "type": factor_type,
+                                    "num_columns": num_columns})
+                else:
+                    factors.append({
+                        "code": code,
+                        "type": factor_type,
+                        "categories": [_to_builtin(c) for c in categories],
+                    })
+            subterms = [
+                {
+                    "factors": list(codes),
+                    "contrasts": dict(
+                        (code, _contrast_to_spec(matrix))
+                        for code, matrix in contrast_matrices.items()
+                    ),
+                    "num_columns": num_columns,
+                }
+                for codes, contrast_matrices, num_columns in self._subterms
+            ]
+            self._spec = {
+                "column_names": list(self.column_names),
+                "factors": factors,
+                "subterms": subterms,
+            }
+        return self._spec
+
+    def __repr__(self):
+        return 'DesignMatrixBuilder({})'.format(self.column_names)
+
+    def evaluate(self, data):
+        ''' Evaluate each factor of the design against the data.
+
+        Parameters
+        ----------
+        data : pandas.DataFrame
+            Data containing the columns named by the design's factors.
+
+        Returns
+        -------
+        factor_values : dict
+            Raw value of each factor, keyed by factor code.
+        '''
+        namespace = _DataNamespace(data)
+        env = {"__builtins__": {}, "C": _categorical}
+        return dict(
+            (code, eval(compiled, env, namespace))
+            for code, (compiled, _, _, _) in self._factors.items()
+        )
+
+    def matches(self, factor_values):
+        ''' Whether patsy, building a design from scratch for this data,
+        would arrive at this builder's layout: categorical factors have
+        exactly the same levels and numerical factors are numeric.
+
+        Parameters
+        ----------
+        factor_values : dict
+            As returned by :code:`.evaluate(`.
+
+        Returns
+        -------
+        matches : bool
+        '''
+        for code, (_, _, _, categories) in self._factors.items():
+            value = factor_values[code]
+            if categories is None:
+                dtype = np.asarray(value).dtype
+                if not np.issubdtype(dtype, np.number) or dtype == bool:
+                    return False
+            else:
+                value = pd.Series(np.asarray(value, dtype=object))
+                if set(value.dropna().unique()) != set(categories):
+                    return False
+        return True
+
+    def _prepare(self, factor_values):
+        # numerical factors as 2-D float arrays, categorical factors as
+        # integer codes, plus the rows with missing values.
+        prepared = {}
+        missing = None
+        for code, (_, _, num_columns, categories) in self._factors.items():
+            value = factor_values[code]
+            if categories is None:
+                value = np.asarray(value, dtype=float)
+                if value.ndim == 1:
+                    value = value.reshape(-1, 1)
+                if value.shape[1] != num_columns:
+                    message = (
+                        'Factor "{}" has {} columns, expected {}.'
+                        .format(code, value.shape[1], num_columns)
+                    )
+                    raise _patsy().PatsyError(message)
+                factor_missing = np.isnan(value).any(axis=1)
+            else:
+                value = np.asarray(value, dtype=object)
+                factor_missing = pd.isnull(value)
+                codes = categories.get_indexer(value)
+                unknown = (codes < 0) & ~factor_missing
+                if unknown.any():
+                    message = (
+                        'Observation with value {!r} does not match any of'
+                        ' the expected levels of "{}".'
+                        .format(value[unknown][0], code)
+                    )
+                    raise _patsy().PatsyError(message)
+                value = codes
+            prepared[code] = value
+            missing = factor_missing if missing is None \
+                else missing | factor_missing
+        return prepared, missing
+
+    def _build_array(self, prepared, keep, n_rows):
+        out = np.empty((n_rows, len(self.column_names)))
+        start = 0
+        for codes, contrast_matrices, num_columns in self._subterms:
+            block = np.ones((n_rows, 1))
+            for code in codes:
+                value = prepared[code]
+                if keep is not None:
+                    value = value[keep]
+                if code in contrast_matrices:
+                    value = contrast_matrices[code][value]
+                # left-most factor iterates fastest, as in patsy.
+                block = (block[:, None, :] * value[:, :, None]) \
+                    .reshape(n_rows, -1)
+            out[:, start:start + num_columns] = block
+            start += num_columns
+        return out
+
+    def build(self, data, factor_values=None):
+        ''' Build a design matrix, dropping rows with missing values.
+
+        Parameters
+        ----------
+        data : pandas.DataFrame
+            Data containing the columns named by the design's factors.
+        factor_values : dict, default None
+            Factor values from :code:`.evaluate(`, if already computed.
+
+        Returns
+        -------
+        design_matrix : pandas.DataFrame
+            Design matrix with the design's column names, indexed by the
+            rows of :code:`data` which have no missing values.
+        '''
+        return build_design_matrices([self], data, [factor_values])[0]
+
+
+def build_design_matrices(builders, data, factor_values=None):
+    ''' Build several design matrices from the same data, dropping rows which
+    have missing values in any of them, like
+    :code:`patsy.build_design_matrices(..., return_type="dataframe")`.
+
+    Parameters
+    ----------
+    builders : list of eemeter.modeling.design.DesignMatrixBuilder
+        Builders for each design matrix.
+    data : pandas.DataFrame
+        Data containing the columns named by the designs' factors.
+    factor_values : list of dict, default None
+        Factor values from each builder's :code:`.evaluate(`, if already
+        computed.
+
+    Returns
+    -------
+    design_matrices : list of pandas.DataFrame
+        One design matrix per builder.
+    '''
+    if factor_values is None:
+        factor_values = [None] * len(builders)
+
+    prepared = []
+    missing = None
+    for builder, values in zip(builders, factor_values):
+        if values is None:
+            values = builder.evaluate(data)
+        builder_prepared, builder_missing = builder._prepare(values)
+        prepared.append(builder_prepared)
+        if builder_missing is not None:
+            missing = builder_missing if missing is None \
+                else missing | builder_missing
+
+    index = data.index
+    if missing is not None and missing.any():
+        keep = ~missing
+        index = index[keep]
+    else:
+        keep = None
+
+    return [
+        pd.DataFrame(
+            builder._build_array(builder_prepared, keep, len(index)),
+            columns=builder.column_names, index=index)
+        for builder, builder_prepared in zip(builders, prepared)
+    ]
+
+
+def _get_builder(design_info):
+    # compiled builder for a design info, or None if it can't be compiled.
+    with _lock:
+        try:
+            builder = _design_info_builders.get(design_info)
+        except TypeError:  # not weak-referenceable
+            builder = None
+        if builder is None:
+            try:
+                builder = DesignMatrixBuilder(design_info)
+            except NotImplementedError:
+                builder = False  # not compilable; always use patsy.
+            try:
+                _design_info_builders[design_info] = builder
+            except TypeError:
+                pass
+    return builder or None
+
+
+def design_spec(design_info):
+    ''' JSON-serializable design spec for a patsy :code:`DesignInfo`. See
+    :code:`DesignMatrixBuilder.to_spec`.
+
+    Parameters
+    ----------
+    design_info : patsy.DesignInfo
+        Column layout.
+
+    Returns
+    -------
+    spec : dict
+        Design spec, or :code:`None` if the design can't be compiled.
+    '''
+    builder = _get_builder(design_info)
+    if builder is None:
+        return None
+    return builder.to_spec()
+
+
+def build_design_matrix(design, data):
+    ''' Build a design matrix with the column layout of a patsy
+    :code:`DesignInfo` or of a design spec. Equivalent to
+    :code:`patsy.build_design_matrices([design_info], data,
+    return_type="dataframe")[0]`, but compiled once per design info and
+    built with numpy. Design specs are built without patsy.
+
+    Parameters
+    ----------
+    design : patsy.DesignInfo or dict
+        Column layout, e.g., as stored in the :code:`"X_design_info"` or
+        :code:`"design"` model parameters.
+    data : pandas.DataFrame
+        Data containing the columns named by the design's factors.
+
+    Returns
+    -------
+    design_matrix : pandas.DataFrame
+        Design matrix, indexed by the rows of :code:`data` which have no
+        missing values.
+    '''
+    if isinstance(design, dict):
+        return DesignMatrixBuilder.from_spec(design).build(data)
+
+    builder = _get_builder(design)
+
+    if builder is None:
+        (X,) = _patsy().build_design_matrices([design], data,
+                                              return_type='dataframe')
+        return X
+
+    return builder.build(data)
+
+
+def dmatrices(formula, data):
+    ''' Build response and design matrices for a formula. Equivalent to
+    :code:`patsy.dmatrices(formula, data, return_type="dataframe")`, but
+    patsy only parses the formula and determines the column layout the
+    first time a formula is used with a given set of categorical levels.
+    Later calls with the same formula and levels reuse compiled builders.
+
+    Parameters
+    ----------
+    formula : str
+        Patsy formula, e.g., :code:`"energy ~ 1 + CDD + HDD"`.
+    data : pandas.DataFrame
+        Data containing the columns named in the formula.
+
+    Returns
+    -------
+    y : pandas.DataFrame
+        Response matrix.
+    X : pandas.DataFrame
+        Design matrix.
+    X_design_info : patsy.DesignInfo
+        Column layout of :code:`X`, for building matrices for prediction.
+    '''
+    with _lock:
+        candidates = list(_formula_builders.get(formula, []))
+
+    for y_builder, X_builder in candidates:
+        y_values = y_builder.evaluate(data)
+        X_values = X_builder.evaluate(data)
+        if y_builder.matches(y_values) and X_builder.matches(X_values):
+            y, X = build_design_matrices([y_builder, X_builder], data,
+                                         [y_values, X_values])
+            return y, X, X_builder.design_info
+
+    y, X = _patsy().dmatrices(formula, data, return_type='dataframe')
+
+    try:
+        builders = (DesignMatrixBuilder(y.design_info),
+                    DesignMatrixBuilder(X.design_info))
+    except NotImplementedError:
+        pass
+    else:
+        with _lock:
+            _design_info_builders[X.design_info] = builders[1]
+            _formula_builders.setdefault(formula, []).append(builders)
+            _formula_builders[formula] = _formula_builders.pop(formula)
+            while sum(len(b) for b in _formula_builders.values()) > \
+                    MAX_COMPILED_FORMULAS:
+                oldest = next(iter(_formula_builders))
+                _formula_builders[oldest].pop(0)
+                if not _formula_builders[oldest]:
+                    del _formula_builders[oldest]
+
+    return y, X, X.design_info
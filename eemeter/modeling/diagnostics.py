@@ -0,0 +1,87 @@
+import warnings
+
+import pandas as pd
+
+
+def plot_fit(model, ax=None, show=False):
+    ''' Plots a fitted model's estimates, with 95% confidence bounds,
+    against the data it was fit to. Uses only outputs stored on the model
+    by its :code:`.fit(` method, so it can be called at any time afterward.
+    Requires matplotlib, which is imported only when this is called.
+
+    Parameters
+    ----------
+    model : eemeter.modeling.models.Model
+        Model on which :code:`.fit(` has been called, such as
+        :code:`SeasonalElasticNetCVModel` or :code:`BillingElasticNetCVModel`.
+    ax : matplotlib.axes.Axes, default None
+        Axes on which to plot. If :code:`None`, uses the current axes.
+    show : bool, default False
+        If :code:`True`, calls :code:`matplotlib.pyplot.show()`.
+
+    Returns
+    -------
+    ax : matplotlib.axes.Axes
+        Axes plotted on, or :code:`None` if matplotlib is not installed.
+    '''
+    if model.estimated is None:
+        raise ValueError("Cannot plot - model has not been fit.")
+
+    try:
+        import matplotlib.pyplot as plt
+    except ImportError:
+        warnings.warn("Cannot plot - no matplotlib.")
+        return None
+
+    if ax is None:
+        ax = plt.gca()
+
+    ax.set_title("actual v. estimated w/ 95% confidence")
+
+    model.estimated.plot(ax=ax, color='b', alpha=0.7)
+
+    ax.fill_between(model.estimated.index.to_pydatetime(),
+                    model.estimated + model.upper,
+                    model.estimated - model.lower,
+                    color='b', alpha=0.3)
+
+    pd.Series(model.y.values.ravel(), index=model.estimated.index).plot(
+        ax=ax, color='k', linewidth=1.5)
+
+    if show:
+        plt.show()
+
+    return ax
+
+
+def plot_modeled_energy_trace(modeled_energy_trace, modeling_period_label,
+                              ax=None, show=False):
+    ''' Plots the fit of one modeling period of a fitted modeled energy
+    trace. See :code:`plot_fit`.
+
+    Parameters
+    ----------
+    modeled_energy_trace : eemeter.modeling.split.SplitModeledEnergyTrace
+        Modeled energy trace on which :code:`.fit(` has been called.
+    modeling_period_label : str
+        Label of the modeling period whose fit should be plotted.
+    ax : matplotlib.axes.Axes, default None
+        Axes on which to plot. If :code:`None`, uses the current axes.
+    show : bool, default False
+        If :code:`True`, calls :code:`matplotlib.pyplot.show()`.
+
+    Returns
+    -------
+    ax : matplotlib.axes.Axes
+        Axes plotted on, or :code:`None` if matplotlib is not installed.
+    '''
+    outputs = modeled_energy_trace.fit_outputs[modeling_period_label]
+    if outputs["status"] == "FAILURE":
+        message = (
+            'Cannot plot - model fit failed for modeling_period "{}".'
+            .format(modeling_period_label)
+        )
+        raise ValueError(message)
+
+    model = modeled_energy_trace.model_mapping[modeling_period_label]
+    return plot_fit(model, ax=ax, show=show)
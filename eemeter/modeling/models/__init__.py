@@ -1,3 +1,7 @@
-from eemeter.modeling.models.seasonal import SeasonalElasticNetCVModel
+from eemeter._lazy import lazy_attributes
+
+__getattr__, __dir__ = lazy_attributes(__name__, {
+    'SeasonalElasticNetCVModel': 'eemeter.modeling.models.seasonal',
+})
 
 __all__ = ['SeasonalElasticNetCVModel', ]
@@ -1,11 +1,15 @@
-import warnings
-
-
 import numpy as np
 import pandas as pd
-import patsy
-from scipy.stats import chi2
-from sklearn import linear_model
+
+from eemeter.modeling.design import (
+    build_design_matrix,
+    design_spec,
+    dmatrices,
+)
+from eemeter.modeling.diagnostics import plot_fit
+from eemeter.modeling.params import predict_linear
+from eemeter.modeling.solvers import SOLVERS, get_estimator
+from eemeter.weather.noaa import NOAAWeatherSourceBase
 
 
 class BillingElasticNetCVModel():
@@ -18,12 +22,34 @@ class BillingElasticNetCVModel():
         Base temperature (degrees F) used in calculating cooling degree days.
     heating_base_temp : float
         Base temperature (degrees F) used in calculating heating degree days.
+    fit_cache : eemeter.modeling.cache.SqliteFitCache, default None
+        If given, regression fits are restored from (and saved to) this
+        cache.
+    solver : str, {"elastic_net_cv", "ols", "ridge"}
+        Regression solver. See :code:`eemeter.modeling.solvers.get_estimator`
+        for the speed and accuracy tradeoffs.
+    ridge_alpha : float, default 1.0
+        Regularization strength for the :code:`"ridge"` solver.
     '''
 
-    def __init__(self, cooling_base_temp, heating_base_temp):
+    # see eemeter.modeling.split.SplitModeledEnergyTrace.fit
+    fit_accepts_weather_source = True
+
+    def __init__(self, cooling_base_temp, heating_base_temp, fit_cache=None,
+                 solver="elastic_net_cv", ridge_alpha=1.0):
 
         self.cooling_base_temp = cooling_base_temp
         self.heating_base_temp = heating_base_temp
+        self.fit_cache = fit_cache
+
+        if solver not in SOLVERS:
+            message = (
+                'Solver "{}" not recognized. Use one of {}.'
+                .format(solver, SOLVERS)
+            )
+            raise ValueError(message)
+        self.solver = solver
+        self.ridge_alpha = ridge_alpha
 
         self.formula = 'energy ~ 1 + CDD + HDD + CDD:HDD'
 
@@ -39,25 +65,43 @@ class BillingElasticNetCVModel():
         self.cvrmse = None
         self.n = None
 
+    @staticmethod
+    def _temperature_sums(temperature_data):
+        # sums and counts of non-missing temperatures by period, and the
+        # number of temperatures per day; degree days for any base are
+        # (sums - base * counts) / per_day.
+        names = temperature_data.index.names
+        if 'hourly' in names:
+            per_day = 24.0
+        elif 'daily' in names:
+            per_day = 1.0
+        else:
+            message = (
+                'Temperature data must be indexed by "period" and "hourly"'
+                ' or "daily".'
+            )
+            raise ValueError(message)
+
+        codes, periods = pd.factorize(
+            temperature_data.index.get_level_values('period'), sort=True)
+        values = np.asarray(temperature_data.iloc[:, 0], dtype=float)
+        present = ~np.isnan(values)
+        sums = np.bincount(codes, weights=np.where(present, values, 0.),
+                           minlength=len(periods))
+        counts = np.bincount(codes, weights=present, minlength=len(periods))
+        return pd.Series(sums, index=periods), counts, per_day
+
     def _cdd(self, temperature_data):
-        if 'hourly' in temperature_data.index.names:
-            cdd = np.maximum((temperature_data - self.cooling_base_temp)
-                             .groupby(level='period').sum()[0] / 24.0, 0.0)
-        elif 'daily' in temperature_data.index.names:
-            cdd = np.maximum((temperature_data - self.cooling_base_temp)
-                             .groupby(level='period').sum()[0], 0.0)
-        return cdd
+        sums, counts, per_day = self._temperature_sums(temperature_data)
+        return np.maximum((sums - self.cooling_base_temp * counts) / per_day,
+                          0.0)
 
     def _hdd(self, temperature_data):
-        if 'hourly' in temperature_data.index.names:
-            hdd = np.maximum((self.heating_base_temp - temperature_data)
-                             .groupby(level='period').sum()[0] / 24.0, 0.0)
-        elif 'daily' in temperature_data.index.names:
-            hdd = np.maximum((self.heating_base_temp - temperature_data)
-                             .groupby(level='period').sum()[0], 0.0)
-        return hdd
-
-    def fit(self, input_data):
+        sums, counts, per_day = self._temperature_sums(temperature_data)
+        return np.maximum((self.heating_base_temp * counts - sums) / per_day,
+                          0.0)
+
+    def fit(self, input_data, weather_source=None):
         ''' Fits a model to the input data.
 
         Parameters
@@ -65,6 +109,13 @@ class BillingElasticNetCVModel():
         input_data : pandas.DataFrame
             Formatted input data as returned by
             :code:`ModelDataBillingFormatter.create_input()`
+        weather_source : eemeter.weather.WeatherSourceBase, default None
+            Weather source from which :code:`input_data` was created. NOAA
+            weather sources supply period degree days from their shared
+            degree day table (see
+            :code:`eemeter.weather.noaa.NOAAWeatherSourceBase.indexed_degree_days`);
+            otherwise, degree days are computed from the temperatures in
+            :code:`input_data`.
 
         Returns
         -------
@@ -79,6 +130,13 @@ class BillingElasticNetCVModel():
               - :code:`formula`: patsy formula used in creating design matrix.
               - :code:`coefficients`: ElasticNetCV coefficients.
               - :code:`intercept`: ElasticNetCV intercept.
+              - :code:`design`: JSON-serializable design spec, usable in
+                place of :code:`X_design_matrix`.
+              - :code:`cooling_base_temp`, :code:`heating_base_temp`: base
+                temperatures used.
+
+              See :code:`eemeter.modeling.params.portable_params` for a
+              compact, JSON-serializable version.
 
             - :code:`"rmse"`: Root mean square error
             - :code:`"cvrmse"`: Normalized root mean square error
@@ -89,20 +147,29 @@ class BillingElasticNetCVModel():
         '''
         trace_data, temperature_data = input_data
 
-        cdd = self._cdd(temperature_data)
-        hdd = self._hdd(temperature_data)
+        if isinstance(weather_source, NOAAWeatherSourceBase):
+            degree_days = weather_source.indexed_degree_days(
+                trace_data.index, self.cooling_base_temp,
+                self.heating_base_temp)
+            cdd, hdd = degree_days.CDD, degree_days.HDD
+        else:
+            cdd = self._cdd(temperature_data)
+            hdd = self._hdd(temperature_data)
         model_data = pd.DataFrame(
             {'energy': trace_data.iloc[:-1], 'CDD': cdd, 'HDD': hdd},
             columns=['energy', 'CDD', 'HDD'])
 
         model_data = model_data.dropna()
 
-        y, X = patsy.dmatrices(self.formula, model_data,
-                               return_type='dataframe')
+        y, X, X_design_info = dmatrices(self.formula, model_data)
 
-        model_obj = linear_model.ElasticNetCV(l1_ratio=self.l1_ratio,
-                                              fit_intercept=False)
-        model_obj.fit(X, y.values.ravel())
+        model_obj = get_estimator(self.solver, self.l1_ratio,
+                                  self.ridge_alpha)
+        if self.fit_cache is None:
+            model_obj.fit(X, y.values.ravel())
+        else:
+            self.fit_cache.fit(model_obj, X, y.values.ravel(),
+                               context=repr(self))
 
         estimated = pd.Series(model_obj.predict(X),
                               index=model_data.energy.index)
@@ -142,17 +209,20 @@ class BillingElasticNetCVModel():
 
         n = self.estimated.shape[0]
 
+        from scipy.stats import chi2
+
         c1, c2 = chi2.ppf([0.025, 1-0.025], n)
         self.lower = np.sqrt(n/c2) * self.rmse
         self.upper = np.sqrt(n/c1) * self.rmse
         self.n = n
 
-        self.plot()
-
         self.params = {
             "coefficients": model_obj.coef_,
             "intercept": model_obj.intercept_,
-            "X_design_info": X.design_info,
+            "X_design_info": X_design_info,
+            "design": design_spec(X_design_info),
+            "cooling_base_temp": self.cooling_base_temp,
+            "heating_base_temp": self.heating_base_temp,
             "formula": self.formula,
         }
 
@@ -185,6 +255,12 @@ class BillingElasticNetCVModel():
               - :code:`coefficients`: ElasticNetCV coefficients.
               - :code:`intercept`: ElasticNetCV intercept.
 
+            Portable parameters (see
+            :code:`eemeter.modeling.params.portable_params`), which have a
+            :code:`design` spec instead of :code:`X_design_matrix`, are also
+            accepted. Base temperatures in the parameters, if given,
+            override those of this model.
+
         Returns
         -------
         output : pandas.DataFrame
@@ -198,24 +274,25 @@ class BillingElasticNetCVModel():
         model_data = demand_fixture_data.resample(
             pd.tseries.frequencies.Day()).agg({'tempF': np.mean})
 
+        cooling_base_temp = params.get("cooling_base_temp")
+        if cooling_base_temp is None:
+            cooling_base_temp = self.cooling_base_temp
+        heating_base_temp = params.get("heating_base_temp")
+        if heating_base_temp is None:
+            heating_base_temp = self.heating_base_temp
+
         model_data.loc[:, 'CDD'] = np.maximum(model_data.tempF -
-                                              self.cooling_base_temp, 0.)
-        model_data.loc[:, 'HDD'] = np.maximum(self.heating_base_temp -
+                                              cooling_base_temp, 0.)
+        model_data.loc[:, 'HDD'] = np.maximum(heating_base_temp -
                                               model_data.tempF, 0.)
 
-        design_info = params["X_design_info"]
+        design = params.get("X_design_info")
+        if design is None:
+            design = params["design"]
 
-        (X,) = patsy.build_design_matrices([design_info],
-                                           model_data,
-                                           return_type='dataframe')
+        X = build_design_matrix(design, model_data)
 
-        model_obj = linear_model.ElasticNetCV(l1_ratio=self.l1_ratio,
-                                              fit_intercept=False)
-
-        model_obj.coef_ = params["coefficients"]
-        model_obj.intercept_ = params["intercept"]
-
-        predicted = pd.Series(model_obj.predict(X), index=X.index)
+        predicted = pd.Series(predict_linear(X, params), index=X.index)
 
         # add NaNs back in
         predicted = predicted.reindex(model_data.index)
@@ -224,25 +301,7 @@ class BillingElasticNetCVModel():
 
     def plot(self):
         ''' Plots fit against input data. Should not be run before the
-        :code:`.fit(` method.
+        :code:`.fit(` method. See
+        :code:`eemeter.modeling.diagnostics.plot_fit`.
         '''
-
-        try:
-            import matplotlib.pyplot as plt
-        except ImportError:
-            warnings.warn("Cannot plot - no matplotlib.")
-            return None
-
-        plt.title("actual v. estimated w/ 95% confidence")
-
-        self.estimated.plot(color='b', alpha=0.7)
-
-        plt.fill_between(self.estimated.index.to_datetime(),
-                         self.estimated + self.upper,
-                         self.estimated - self.lower,
-                         color='b', alpha=0.3)
-
-        pd.Series(self.y.values.ravel(), index=self.estimated.index).plot(
-                  color='k', linewidth=1.5)
-
-        plt.show()
+        return plot_fit(self, show=True)
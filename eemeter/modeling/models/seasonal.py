@@ -1,11 +1,16 @@
-import warnings
-
-import holidays
 import numpy as np
 import pandas as pd
-import patsy
-from scipy.stats import chi2
-from sklearn import linear_model
+
+from eemeter.modeling.calendars import get_holiday_calendar
+from eemeter.modeling.design import (
+    build_design_matrix,
+    design_spec,
+    dmatrices,
+)
+from eemeter.modeling.diagnostics import plot_fit
+from eemeter.modeling.params import predict_linear
+from eemeter.modeling.solvers import SOLVERS, get_estimator
+from eemeter.weather.noaa import NOAAWeatherSourceBase
 
 
 class SeasonalElasticNetCVModel(object):
@@ -19,17 +24,39 @@ class SeasonalElasticNetCVModel(object):
         Base temperature (degrees F) used in calculating cooling degree days.
     heating_base_temp : float
         Base temperature (degrees F) used in calculating heating degree days.
+    fit_cache : eemeter.modeling.cache.SqliteFitCache, default None
+        If given, regression fits are restored from (and saved to) this
+        cache.
+    solver : str, {"elastic_net_cv", "ols", "ridge"}
+        Regression solver. See :code:`eemeter.modeling.solvers.get_estimator`
+        for the speed and accuracy tradeoffs.
+    ridge_alpha : float, default 1.0
+        Regularization strength for the :code:`"ridge"` solver.
     '''
 
-    def __init__(self, cooling_base_temp, heating_base_temp):
+    # see eemeter.modeling.split.SplitModeledEnergyTrace.fit
+    fit_accepts_weather_source = True
+
+    def __init__(self, cooling_base_temp, heating_base_temp, fit_cache=None,
+                 solver="elastic_net_cv", ridge_alpha=1.0):
 
         self.cooling_base_temp = cooling_base_temp
         self.heating_base_temp = heating_base_temp
+        self.fit_cache = fit_cache
+
+        if solver not in SOLVERS:
+            message = (
+                'Solver "{}" not recognized. Use one of {}.'
+                .format(solver, SOLVERS)
+            )
+            raise ValueError(message)
+        self.solver = solver
+        self.ridge_alpha = ridge_alpha
 
         self.model_freq = pd.tseries.frequencies.Day()
         self.base_formula = 'energy ~ 1 + CDD + HDD + CDD:HDD'
         self.l1_ratio = 0.5
-        self.holidays = holidays.UnitedStates()
+        self.holidays = get_holiday_calendar("UnitedStates")
         self.params = None
         self.X = None
         self.y = None
@@ -47,18 +74,26 @@ class SeasonalElasticNetCVModel(object):
         )
 
     def _holidays_indexed(self, dt_index):
-        def clean_holiday_name(dt):
-            raw_name = self.holidays.get(dt, "none")
-            if raw_name.endswith(" (Observed)"):
-                return raw_name[:-11]
-            else:
-                return raw_name
-
-        holiday_names = pd.Series(dt_index.map(clean_holiday_name),
-                                  index=dt_index)
-        return holiday_names
-
-    def fit(self, input_data):
+        return self.holidays.holiday_names(dt_index)
+
+    def _daily_degree_days(self, index, weather_source):
+        # daily degree days from the weather source's shared degree day
+        # table, for daily input at midnight UTC (as created by
+        # ModelDataFormatter("D")). Other input may cover days only in
+        # part, so its daily mean temperatures are computed from the input.
+        if not isinstance(weather_source, NOAAWeatherSourceBase):
+            return None
+        if index.shape[0] == 0 or index.freq != self.model_freq:
+            return None
+        if (index.asi8 % self.model_freq.nanos != 0).any():
+            return None
+
+        boundaries = pd.date_range(index[0], periods=index.shape[0] + 1,
+                                   freq=self.model_freq)
+        return weather_source.degree_day_table().daily_degree_days(
+            boundaries, self.cooling_base_temp, self.heating_base_temp)
+
+    def fit(self, input_data, weather_source=None):
         ''' Fits a model to the input data.
 
         Parameters
@@ -66,6 +101,13 @@ class SeasonalElasticNetCVModel(object):
         input_data : pandas.DataFrame
             Formatted input data as returned by
             :code:`ModelDataFormatter.create_input()`
+        weather_source : eemeter.weather.WeatherSourceBase, default None
+            Weather source from which :code:`input_data` was created. For
+            daily input, NOAA weather sources supply daily degree days from
+            their shared degree day table (see
+            :code:`eemeter.weather.noaa.NOAAWeatherSourceBase.degree_day_table`);
+            otherwise, degree days are computed from the temperatures in
+            :code:`input_data`.
 
         Returns
         -------
@@ -80,6 +122,13 @@ class SeasonalElasticNetCVModel(object):
               - :code:`formula`: patsy formula used in creating design matrix.
               - :code:`coefficients`: ElasticNetCV coefficients.
               - :code:`intercept`: ElasticNetCV intercept.
+              - :code:`design`: JSON-serializable design spec, usable in
+                place of :code:`X_design_matrix`.
+              - :code:`cooling_base_temp`, :code:`heating_base_temp`: base
+                temperatures used.
+
+              See :code:`eemeter.modeling.params.portable_params` for a
+              compact, JSON-serializable version.
 
             - :code:`"rmse"`: Root mean square error
             - :code:`"cvrmse"`: Normalized root mean square error
@@ -92,15 +141,23 @@ class SeasonalElasticNetCVModel(object):
         model_data = input_data.resample(self.model_freq).agg(
                 {'energy': np.sum, 'tempF': np.mean})
 
+        degree_days = self._daily_degree_days(model_data.index,
+                                              weather_source)
+
         model_data = model_data.dropna()
 
         if model_data.empty:
             raise ValueError("No model data (consumption + weather)")
 
-        model_data.loc[:, 'CDD'] = np.maximum(model_data.tempF -
-                                              self.cooling_base_temp, 0.)
-        model_data.loc[:, 'HDD'] = np.maximum(self.heating_base_temp -
-                                              model_data.tempF, 0.)
+        if degree_days is None:
+            model_data.loc[:, 'CDD'] = np.maximum(model_data.tempF -
+                                                  self.cooling_base_temp, 0.)
+            model_data.loc[:, 'HDD'] = np.maximum(self.heating_base_temp -
+                                                  model_data.tempF, 0.)
+        else:
+            degree_days = degree_days.reindex(model_data.index)
+            model_data.loc[:, 'CDD'] = degree_days.CDD
+            model_data.loc[:, 'HDD'] = degree_days.HDD
 
         formula = self.base_formula
 
@@ -126,11 +183,15 @@ class SeasonalElasticNetCVModel(object):
             model_data.loc[:, 'holiday_name'] = holiday_names
             formula += " + C(holiday_name)"
 
-        y, X = patsy.dmatrices(formula, model_data, return_type='dataframe')
+        y, X, X_design_info = dmatrices(formula, model_data)
 
-        model_obj = linear_model.ElasticNetCV(l1_ratio=self.l1_ratio,
-                                              fit_intercept=False)
-        model_obj.fit(X, y.values.ravel())
+        model_obj = get_estimator(self.solver, self.l1_ratio,
+                                  self.ridge_alpha)
+        if self.fit_cache is None:
+            model_obj.fit(X, y.values.ravel())
+        else:
+            self.fit_cache.fit(model_obj, X, y.values.ravel(),
+                               context=repr(self))
 
         estimated = pd.Series(model_obj.predict(X),
                               index=model_data.tempF.index)
@@ -170,17 +231,20 @@ class SeasonalElasticNetCVModel(object):
 
         n = self.estimated.shape[0]
 
+        from scipy.stats import chi2
+
         c1, c2 = chi2.ppf([0.025, 1-0.025], n)
         self.lower = np.sqrt(n/c2) * self.rmse
         self.upper = np.sqrt(n/c1) * self.rmse
         self.n = n
 
-        self.plot()
-
         self.params = {
             "coefficients": model_obj.coef_,
             "intercept": model_obj.intercept_,
-            "X_design_info": X.design_info,
+            "X_design_info": X_design_info,
+            "design": design_spec(X_design_info),
+            "cooling_base_temp": self.cooling_base_temp,
+            "heating_base_temp": self.heating_base_temp,
             "formula": formula,
         }
 
@@ -213,6 +277,12 @@ class SeasonalElasticNetCVModel(object):
               - :code:`coefficients`: ElasticNetCV coefficients.
               - :code:`intercept`: ElasticNetCV intercept.
 
+            Portable parameters (see
+            :code:`eemeter.modeling.params.portable_params`), which have a
+            :code:`design` spec instead of :code:`X_design_matrix`, are also
+            accepted. Base temperatures in the parameters, if given,
+            override those of this model.
+
         Returns
         -------
         output : pandas.DataFrame
@@ -226,28 +296,29 @@ class SeasonalElasticNetCVModel(object):
         model_data = demand_fixture_data.resample(self.model_freq).agg(
                 {'tempF': np.mean})
 
+        cooling_base_temp = params.get("cooling_base_temp")
+        if cooling_base_temp is None:
+            cooling_base_temp = self.cooling_base_temp
+        heating_base_temp = params.get("heating_base_temp")
+        if heating_base_temp is None:
+            heating_base_temp = self.heating_base_temp
+
         model_data.loc[:, 'CDD'] = np.maximum(model_data.tempF -
-                                              self.cooling_base_temp, 0.)
-        model_data.loc[:, 'HDD'] = np.maximum(self.heating_base_temp -
+                                              cooling_base_temp, 0.)
+        model_data.loc[:, 'HDD'] = np.maximum(heating_base_temp -
                                               model_data.tempF, 0.)
 
         holiday_names = self._holidays_indexed(model_data.index)
 
         model_data.loc[:, 'holiday_name'] = holiday_names
 
-        design_info = params["X_design_info"]
-
-        (X,) = patsy.build_design_matrices([design_info],
-                                           model_data,
-                                           return_type='dataframe')
-
-        model_obj = linear_model.ElasticNetCV(l1_ratio=self.l1_ratio,
-                                              fit_intercept=False)
+        design = params.get("X_design_info")
+        if design is None:
+            design = params["design"]
 
-        model_obj.coef_ = params["coefficients"]
-        model_obj.intercept_ = params["intercept"]
+        X = build_design_matrix(design, model_data)
 
-        predicted = pd.Series(model_obj.predict(X), index=X.index)
+        predicted = pd.Series(predict_linear(X, params), index=X.index)
 
         # add NaNs back in
         predicted = predicted.reindex(model_data.index)
@@ -256,25 +327,7 @@ class SeasonalElasticNetCVModel(object):
 
     def plot(self):
         ''' Plots fit against input data. Should not be run before the
-        :code:`.fit(` method.
+        :code:`.fit(` method. See
+        :code:`eemeter.modeling.diagnostics.plot_fit`.
         '''
-
-        try:
-            import matplotlib.pyplot as plt
-        except ImportError:
-            warnings.warn("Cannot plot - no matplotlib.")
-            return None
-
-        plt.title("actual v. estimated w/ 95% confidence")
-
-        self.estimated.plot(color='b', alpha=0.7)
-
-        plt.fill_between(self.estimated.index.to_datetime(),
-                         self.estimated + self.upper,
-                         self.estimated - self.lower,
-                         color='b', alpha=0.3)
-
-        pd.Series(self.y.values.ravel(), index=self.estimated.index).plot(
-                  color='k', linewidth=1.5)
-
-        plt.show()
+        return plot_fit(self, show=True)
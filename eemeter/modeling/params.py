@@ -0,0 +1,75 @@
+import numpy as np
+
+from eemeter.modeling.design import design_spec
+
+
+def portable_params(model_params):
+    ''' Compact, JSON-serializable copy of fitted linear model parameters,
+    without patsy or sklearn objects. Predictions can be made from these
+    with a model's :code:`.predict(` method, or directly with
+    :code:`build_design_matrix` and :code:`predict_linear`.
+
+    Basic usage is as follows:
+
+    .. code-block:: python
+
+        >>> import json
+        >>> output = model.fit(input_data)
+        >>> params = json.loads(json.dumps(
+        ...     portable_params(output["model_params"])))
+        >>> model.predict(demand_fixture_data, params=params)
+
+    Parameters
+    ----------
+    model_params : dict
+        Model parameters, as found in the :code:`"model_params"` output of a
+        model's :code:`.fit(` method.
+
+    Returns
+    -------
+    params : dict
+        Parameters with keys
+
+        - :code:`"coefficients"`: list of coefficients, one per design
+          matrix column.
+        - :code:`"intercept"`: intercept.
+        - :code:`"formula"`: patsy formula used to fit the model.
+        - :code:`"design"`: design spec (see
+          :code:`eemeter.modeling.design.DesignMatrixBuilder.to_spec`), or
+          :code:`None` if the design could not be compiled.
+        - :code:`"cooling_base_temp"`, :code:`"heating_base_temp"`: base
+          temperatures (degrees F) for degree day calculations.
+    '''
+    design = model_params.get("design")
+    if design is None and model_params.get("X_design_info") is not None:
+        design = design_spec(model_params["X_design_info"])
+
+    return {
+        "coefficients": [float(c) for c in model_params["coefficients"]],
+        "intercept": float(model_params["intercept"]),
+        "formula": model_params.get("formula"),
+        "design": design,
+        "cooling_base_temp": model_params.get("cooling_base_temp"),
+        "heating_base_temp": model_params.get("heating_base_temp"),
+    }
+
+
+def predict_linear(design_matrix, model_params):
+    ''' Predict from a design matrix and fitted linear model parameters with
+    a single matrix-vector product.
+
+    Parameters
+    ----------
+    design_matrix : pandas.DataFrame or numpy.ndarray
+        Design matrix with the column layout the model was fit with.
+    model_params : dict
+        Parameters with :code:`"coefficients"` and :code:`"intercept"`.
+
+    Returns
+    -------
+    predicted : numpy.ndarray
+        Predicted value for each row of the design matrix.
+    '''
+    coefficients = np.asarray(model_params["coefficients"], dtype=float)
+    X = np.asarray(design_matrix, dtype=float)
+    return X.dot(coefficients) + model_params["intercept"]
@@ -45,7 +45,11 @@ class SplitModeledEnergyTrace(object):
         Parameters
         ----------
         weather_source : eemeter.weather.ISDWeatherSource
-            Weather source to use in creating covariate data.
+            Weather source to use in creating covariate data. It is also
+            given to the :code:`.fit()` method of models with a true
+            :code:`fit_accepts_weather_source` attribute (see, e.g.,
+            :code:`eemeter.modeling.models.SeasonalElasticNetCVModel.fit`);
+            other models are fitted with the input data only.
         '''
 
         for modeling_period_label, modeling_period in \
@@ -85,8 +89,14 @@ class SplitModeledEnergyTrace(object):
                     "n_rows": input_description.get('n_rows'),
                 }
 
+            # models declaring fit_accepts_weather_source take the weather
+            # source as well, e.g., to read its shared degree day table.
+            fit_kwargs = {}
+            if getattr(model, "fit_accepts_weather_source", False):
+                fit_kwargs["weather_source"] = weather_source
+
             try:
-                outputs.update(model.fit(input_data))
+                outputs.update(model.fit(input_data, **fit_kwargs))
             except:
                 logger.warn(
                     'For trace "{}" and modeling_period "{}", {} was not'
@@ -1,8 +1,10 @@
-from eemeter.processors.interventions import get_modeling_period_set
-from eemeter.processors.location import (
-    get_weather_source,
-    get_weather_normal_source,
-)
+from eemeter._lazy import lazy_attributes
+
+__getattr__, __dir__ = lazy_attributes(__name__, {
+    'get_modeling_period_set': 'eemeter.processors.interventions',
+    'get_weather_source': 'eemeter.processors.location',
+    'get_weather_normal_source': 'eemeter.processors.location',
+})
 
 
 __all__ = [
@@ -60,7 +60,8 @@ ENERGY_MODEL_CLASS_MAPPING = {
 }
 
 
-def get_energy_modeling_dispatches(modeling_period_set, trace_set):
+def get_energy_modeling_dispatches(modeling_period_set, trace_set,
+                                   fit_cache=None, solver=None):
     ''' Dispatches a set of applicable models and formatters for each
     pairing of modeling period sets and trace sets given.
 
@@ -71,6 +72,11 @@ def get_energy_modeling_dispatches(modeling_period_set, trace_set):
         :code:`ModelingPeriod` s to dispatch.
     trace_set : eemeter.structures.EnergyTraceSet
         :code:`EnergyTrace` s to dispatch.
+    fit_cache : eemeter.modeling.cache.SqliteFitCache, default None
+        Fit cache given to each dispatched model.
+    solver : str, default None
+        Regression solver given to each dispatched model, if not
+        :code:`None`. See :code:`eemeter.modeling.solvers.get_estimator`.
     '''
 
     dispatches = {}
@@ -108,6 +114,12 @@ def get_energy_modeling_dispatches(modeling_period_set, trace_set):
             )
             continue
 
+        if fit_cache is not None:
+            model_settings = dict(model_settings, fit_cache=fit_cache)
+
+        if solver is not None:
+            model_settings = dict(model_settings, solver=solver)
+
         formatter = FormatterClass(**formatter_settings)
         model = ModelClass(**model_settings)
 
@@ -10,13 +10,16 @@ from eemeter.weather.tmy3 import TMY3WeatherSource
 logger = logging.getLogger(__name__)
 
 
-def get_weather_source(project):
+def get_weather_source(project, weather_source_registry=None):
     ''' Finds most relevant WeatherSource given project site.
 
     Parameters
     ----------
     project : eemeter.structures.Project
         Project for which to find weather source data.
+    weather_source_registry : eemeter.weather.WeatherSourceRegistry
+        If given, the weather source is drawn from (and shared through) this
+        registry instead of being created anew.
 
     Returns
     -------
@@ -41,7 +44,11 @@ def get_weather_source(project):
     )
 
     try:
-        weather_source = ISDWeatherSource(station)
+        if weather_source_registry is None:
+            weather_source = ISDWeatherSource(station)
+        else:
+            weather_source = weather_source_registry.get(
+                ISDWeatherSource, station)
     except ValueError:
         logger.error(
             "Could not create ISDWeatherSource for station {}."
@@ -54,13 +61,16 @@ def get_weather_source(project):
     return weather_source
 
 
-def get_weather_normal_source(project):
+def get_weather_normal_source(project, weather_source_registry=None):
     ''' Finds most relevant WeatherSource given project site.
 
     Parameters
     ----------
     project : eemeter.structures.Project
         Project for which to find weather source data.
+    weather_source_registry : eemeter.weather.WeatherSourceRegistry
+        If given, the weather source is drawn from (and shared through) this
+        registry instead of being created anew.
 
     Returns
     -------
@@ -85,7 +95,11 @@ def get_weather_normal_source(project):
     )
 
     try:
-        weather_normal_source = TMY3WeatherSource(station)
+        if weather_source_registry is None:
+            weather_normal_source = TMY3WeatherSource(station)
+        else:
+            weather_normal_source = weather_source_registry.get(
+                TMY3WeatherSource, station)
     except ValueError:
         logger.error(
             "Could not create TMY3WeatherSource for station {}."
@@ -1,3 +1,3 @@
-from .mocks import MockWeatherClient
+from .mocks import MockFTPServer, MockWeatherClient, VaryingWeatherClient
 
-__all__ = ["MockWeatherClient"]
+__all__ = ["MockFTPServer", "MockWeatherClient", "VaryingWeatherClient"]
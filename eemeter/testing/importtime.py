@@ -0,0 +1,126 @@
+import argparse
+import re
+import subprocess
+import sys
+
+# Main entry points, and dependencies which they should leave to be imported
+# on first use.
+ENTRY_POINTS = [
+    "eemeter.ee.meter",
+    "eemeter.io.parsers",
+    "eemeter.weather.location",
+    "eemeter.weather",
+]
+DEFERRED_MODULES = [
+    "holidays",
+    "patsy",
+    "pkg_resources",
+    "requests",
+    "scipy.linalg",
+    "scipy.spatial",
+    "scipy.stats",
+    "sklearn",
+]
+
+_line = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|( *)(\S+)\s*$")
+
+
+def measure_import_time(module, python=None):
+    ''' Measure the cost of importing a module in a fresh interpreter with
+    :code:`python -X importtime` (Python 3.7+).
+
+    Parameters
+    ----------
+    module : str
+        Module to import, e.g., :code:`"eemeter.ee.meter"`.
+    python : str, default None
+        Python executable; defaults to the running one.
+
+    Returns
+    -------
+    total : int
+        Cumulative import time in microseconds.
+    imports : dict
+        Cumulative import time in microseconds of each module imported,
+        including :code:`module` itself.
+    '''
+    if python is None:
+        python = sys.executable
+    output = subprocess.check_output(
+        [python, "-X", "importtime", "-c", "import {}".format(module)],
+        stderr=subprocess.STDOUT).decode("utf-8")
+
+    # imports are listed after the imports nested in them. Only top level
+    # imports of the module or its parent packages are counted, leaving out
+    # interpreter startup.
+    parts = module.split(".")
+    packages = set(".".join(parts[:i + 1]) for i in range(len(parts)))
+
+    total, imports, nested = 0, {}, []
+    for line in output.splitlines():
+        match = _line.match(line)
+        if match is None:
+            continue
+        name, cumulative = match.group(4), int(match.group(2))
+        nested.append((name, cumulative))
+        if len(match.group(3)) > 1:
+            continue
+        if name in packages:
+            total += cumulative
+            for name, cumulative in nested:
+                imports[name] = max(imports.get(name, 0), cumulative)
+        nested = []
+    return total, imports
+
+
+def imported_modules(module, python=None):
+    ''' Names of all modules loaded by importing a module in a fresh
+    interpreter.
+
+    Parameters
+    ----------
+    module : str
+        Module to import.
+    python : str, default None
+        Python executable; defaults to the running one.
+
+    Returns
+    -------
+    modules : set of str
+        Names in :code:`sys.modules` after the import.
+    '''
+    if python is None:
+        python = sys.executable
+    code = "import sys, {}; print('\\n'.join(sys.modules))".format(module)
+    output = subprocess.check_output([python, "-c", code]).decode("utf-8")
+    return set(output.split())
+
+
+def main(argv=None):
+    ''' Command line entry point; prints the import time of each entry
+    point, its heaviest imports and any deferred dependencies it loaded.
+    '''
+    parser = argparse.ArgumentParser(
+        description="Measure eemeter import times with python -X importtime."
+    )
+    parser.add_argument(
+        "modules", nargs="*", default=ENTRY_POINTS,
+        help="Modules to import (default: the main entry points).")
+    parser.add_argument(
+        "--top", type=int, default=10,
+        help="Number of heaviest imports to list (default: 10).")
+    args = parser.parse_args(argv)
+
+    for module in args.modules:
+        total, imports = measure_import_time(module)
+        print("{}: {:.1f} ms".format(module, total / 1000.))
+        heaviest = sorted(imports.items(), key=lambda item: -item[1])
+        for name, microseconds in heaviest[:args.top]:
+            print("    {:>9.1f} ms  {}".format(microseconds / 1000., name))
+        loaded = [name for name in DEFERRED_MODULES if name in imports]
+        if loaded:
+            print("    loaded deferred modules: {}".format(", ".join(loaded)))
+
+
+if __name__ == "__main__":
+    main()
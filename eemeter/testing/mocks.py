@@ -1,6 +1,15 @@
+import socket
+import threading
+
+import numpy as np
 import pandas as pd
 import pytz
 
+try:
+    import socketserver
+except ImportError:  # python 2
+    import SocketServer as socketserver
+
 
 class MockWeatherClient(object):
 
@@ -23,6 +32,19 @@ class MockWeatherClient(object):
         return pd.Series(0, index=index, dtype=float)
 
 
+class VaryingWeatherClient(MockWeatherClient):
+    ''' Mock weather client with ISD temperatures varying by season and
+    hour of day, and some missing values. '''
+
+    def get_isd_data(self, station, year):
+        series = super(VaryingWeatherClient, self).get_isd_data(station, year)
+        hours = np.arange(series.shape[0])
+        values = 15 + 12 * np.sin(2 * np.pi * hours / (24 * 365.)) + \
+            6 * np.sin(2 * np.pi * hours / 24.)
+        values[::37] = np.nan
+        return pd.Series(values, index=series.index)
+
+
 class MockModel(object):
 
     def __init__(self):
@@ -35,3 +57,144 @@ class MockModel(object):
 
     def predict(self, df, params=None):
         return pd.Series(1, index=df.index)
+
+
+class _MockFTPHandler(socketserver.StreamRequestHandler):
+
+    def _reply(self, message):
+        self.wfile.write("{}\r\n".format(message).encode("ascii"))
+        self.wfile.flush()
+
+    def handle(self):
+        server = self.server.mock_ftp_server
+        server._connection_opened()
+        passive = None
+        try:
+            self._reply("220 MockFTPServer ready.")
+            while True:
+                line = self.rfile.readline()
+                if not line:
+                    break
+                command, _, argument = \
+                    line.decode("ascii").strip().partition(" ")
+                command = command.upper()
+
+                if command == "USER":
+                    self._reply("331 Password required.")
+                elif command == "PASS":
+                    self._reply("230 Logged in.")
+                elif command == "TYPE":
+                    self._reply("200 Type set.")
+                elif command == "PASV":
+                    passive = socket.socket(socket.AF_INET,
+                                            socket.SOCK_STREAM)
+                    passive.bind(("127.0.0.1", 0))
+                    passive.listen(1)
+                    host, port = passive.getsockname()
+                    self._reply(
+                        "227 Entering Passive Mode ({},{},{})."
+                        .format(host.replace(".", ","), port >> 8,
+                                port & 0xff)
+                    )
+                elif command == "RETR":
+                    status, data = server._retrieve(argument)
+                    if status == "drop":
+                        self._reply("421 Service not available.")
+                        break
+                    elif status == "missing":
+                        self._reply("550 No such file.")
+                    else:
+                        self._reply("150 Opening data connection.")
+                        connection, _ = passive.accept()
+                        connection.sendall(data)
+                        connection.close()
+                        self._reply("226 Transfer complete.")
+                    passive.close()
+                    passive = None
+                elif command == "QUIT":
+                    self._reply("221 Goodbye.")
+                    break
+                else:
+                    self._reply("502 Command not implemented.")
+        finally:
+            if passive is not None:
+                passive.close()
+            server._connection_closed()
+
+
+class _ThreadingTCPServer(socketserver.ThreadingMixIn,
+                          socketserver.TCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class MockFTPServer(object):
+    ''' Minimal local FTP server, serving files from memory, for testing
+    FTP clients without network access. Supports anonymous login and
+    passive mode :code:`RETR`.
+
+    Basic usage is as follows:
+
+    .. code-block:: python
+
+        >>> with MockFTPServer({"/pub/file.gz": data}) as server:
+        ...     client = NOAAClient(host=server.host, port=server.port)
+
+    Parameters
+    ----------
+    files : dict
+        File contents (bytes), by path.
+    '''
+
+    def __init__(self, files):
+        self.files = files
+        self.retrieved = []
+        self.n_connections = 0
+        self.max_concurrent_connections = 0
+        self._n_drops = 0
+        self._open_connections = 0
+        self._lock = threading.Lock()
+
+        self._server = _ThreadingTCPServer(("127.0.0.1", 0), _MockFTPHandler)
+        self._server.mock_ftp_server = self
+        self.host, self.port = self._server.server_address
+        self._thread = threading.Thread(target=self._server.serve_forever)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def drop_connections(self, n):
+        ''' Drop the connection (421) on each of the next :code:`n` file
+        requests. '''
+        with self._lock:
+            self._n_drops += n
+
+    def _retrieve(self, path):
+        with self._lock:
+            if self._n_drops > 0:
+                self._n_drops -= 1
+                return "drop", None
+            self.retrieved.append(path)
+        if path not in self.files:
+            return "missing", None
+        return "ok", self.files[path]
+
+    def _connection_opened(self):
+        with self._lock:
+            self.n_connections += 1
+            self._open_connections += 1
+            self.max_concurrent_connections = max(
+                self.max_concurrent_connections, self._open_connections)
+
+    def _connection_closed(self):
+        with self._lock:
+            self._open_connections -= 1
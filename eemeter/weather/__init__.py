@@ -1,10 +1,19 @@
-from .base import WeatherSourceBase
-from .noaa import GSODWeatherSource, ISDWeatherSource
-from .tmy3 import TMY3WeatherSource
+from eemeter._lazy import lazy_attributes
+
+__getattr__, __dir__ = lazy_attributes(__name__, {
+    'ArchiveWeatherSource': '.archive',
+    'WeatherSourceBase': '.base',
+    'GSODWeatherSource': '.noaa',
+    'ISDWeatherSource': '.noaa',
+    'TMY3WeatherSource': '.tmy3',
+    'WeatherSourceRegistry': '.registry',
+})
 
 __all__ = [
+    'ArchiveWeatherSource',
     'WeatherSourceBase',
     'GSODWeatherSource',
     'ISDWeatherSource',
     'TMY3WeatherSource',
+    'WeatherSourceRegistry',
 ]
@@ -0,0 +1,475 @@
+import logging
+import os
+import struct
+import threading
+
+import numpy as np
+import pandas as pd
+
+from .base import WeatherSourceBase
+from .grid import window_means
+
+logger = logging.getLogger(__name__)
+
+# Temperature archive format, version 1. Little-endian:
+#
+#   header (64 bytes):
+#     magic            4s  b"EEWA"
+#     version          B   1
+#     (padding)        3x
+#     start            q   first hour of the grid, seconds since 1970 UTC
+#     n_hours          q   hours in the grid
+#     n_stations       q   number of stations
+#     station_id_size  q   bytes per (null padded, ASCII) station id
+#     index_offset     q   byte offset of the station index
+#     (padding)        16x
+#   rows: for each station, n_hours float32 temperatures (degC), NaN where
+#     missing, starting at byte 64.
+#   station index: n_stations sorted station ids, then the n_stations int64
+#     byte offsets of their rows.
+#
+ARCHIVE_MAGIC = b"EEWA"
+ARCHIVE_VERSION = 1
+ARCHIVE_FILENAME = "weather_archive.bin"
+
+_header = struct.Struct("<4sB3xqqqqq16x")
+_HOUR = 3600
+
+_archives = {}
+_archives_lock = threading.Lock()
+
+
+def _hour_grid_start(start):
+    start = pd.Timestamp(start)
+    if start.tzinfo is None:
+        start = start.tz_localize("UTC")
+    return start.tz_convert("UTC").floor("H")
+
+
+def write_archive(path, series_by_station, start, end):
+    ''' Write a temperature archive: a fixed hourly UTC grid of float32
+    temperatures for each station, which
+    :code:`TemperatureArchive` memory-maps. Stations are written one at a
+    time, so :code:`series_by_station` may be a generator. The archive is
+    written to a temporary file and moved into place, so processes with the
+    previous archive open keep reading it undisturbed.
+
+    Parameters
+    ----------
+    path : str
+        Archive filename.
+    series_by_station : dict or iterable of (str, pandas.Series)
+        Hourly (or finer) temperature series (degC) with a timezone-aware
+        :code:`DatetimeIndex`, by station. Values are averaged by hour.
+    start : datetime-like
+        Start of the grid; naive values are taken as UTC.
+    end : datetime-like
+        End of the grid (exclusive).
+
+    Returns
+    -------
+    archive : eemeter.weather.archive.TemperatureArchive
+        The newly written archive.
+    '''
+    start = _hour_grid_start(start)
+    end = _hour_grid_start(end)
+    n_hours = int((end - start).total_seconds()) // _HOUR
+    if n_hours <= 0:
+        raise ValueError("Archive end must be after start.")
+
+    if isinstance(series_by_station, dict):
+        series_by_station = series_by_station.items()
+
+    tmp_path = "{}.{}.tmp".format(path, os.getpid())
+    offsets = {}
+    with open(tmp_path, "wb") as f:
+        f.write(b"\x00" * _header.size)
+
+        for station, series in series_by_station:
+            station = str(station)
+            if station in offsets:
+                message = 'Duplicate station "{}".'.format(station)
+                raise ValueError(message)
+
+            row = np.full(n_hours, np.nan, dtype="<f4")
+            series = series.dropna()
+            if series.shape[0] > 0:
+                series = series.resample("H").mean().dropna()
+                positions = (series.index.asi8 // 10**9 - start.value //
+                             10**9) // _HOUR
+                in_grid = (positions >= 0) & (positions < n_hours)
+                row[positions[in_grid]] = series.values[in_grid]
+
+            offsets[station] = f.tell()
+            f.write(row.tobytes())
+
+        stations = sorted(offsets)
+        station_id_size = max([len(s) for s in stations] + [1])
+        index_offset = f.tell()
+        f.write(np.array(stations, dtype="S{}".format(station_id_size))
+                .tobytes())
+        f.write(np.array([offsets[s] for s in stations], dtype="<i8")
+                .tobytes())
+
+        f.seek(0)
+        f.write(_header.pack(ARCHIVE_MAGIC, ARCHIVE_VERSION,
+                             start.value // 10**9, n_hours, len(stations),
+                             station_id_size, index_offset))
+
+    os.rename(tmp_path, path)
+    logger.info(
+        "Wrote temperature archive {} ({} stations, {} hours from {})."
+        .format(path, len(stations), n_hours, start)
+    )
+    return TemperatureArchive(path)
+
+
+def build_archive(path, stations, start_year, end_year,
+                  weather_source_class=None, cache_directory=None):
+    ''' Build a temperature archive from NOAA weather sources, fetching
+    (and caching) any years not already in the weather cache.
+
+    Parameters
+    ----------
+    path : str
+        Archive filename.
+    stations : list of str
+        Station identifiers.
+    start_year : int
+        First year of the archive.
+    end_year : int
+        Last year of the archive (inclusive).
+    weather_source_class : class, default None
+        NOAA weather source class; defaults to
+        :code:`eemeter.weather.ISDWeatherSource`.
+    cache_directory : str, default None
+        Weather cache directory, passed to the weather sources.
+
+    Returns
+    -------
+    archive : eemeter.weather.archive.TemperatureArchive
+        The newly written archive.
+    '''
+    if weather_source_class is None:
+        from .noaa import ISDWeatherSource
+        weather_source_class = ISDWeatherSource
+
+    def _series_by_station():
+        for station in stations:
+            ws = weather_source_class(station, cache_directory)
+            ws.add_year_range(start_year, end_year)
+            yield station, ws.tempC
+
+    start = pd.Timestamp("{}-01-01".format(start_year), tz="UTC")
+    end = pd.Timestamp("{}-01-01".format(end_year + 1), tz="UTC")
+    return write_archive(path, _series_by_station(), start, end)
+
+
+class TemperatureArchive(object):
+    ''' Read-only, memory-mapped archive of hourly temperatures for many
+    stations on one fixed UTC grid, as written by :code:`write_archive`.
+    Station rows are slices of a single :code:`numpy.memmap`, so all
+    processes reading an archive share the operating system's page cache
+    instead of each loading their own copy. Use :code:`open_archive` to
+    share one instance per file within a process.
+
+    Parameters
+    ----------
+    path : str
+        Archive filename.
+    '''
+
+    def __init__(self, path):
+        self.path = path
+
+        with open(path, "rb") as f:
+            header = f.read(_header.size)
+            if len(header) < _header.size:
+                raise ValueError("Not a temperature archive: {}".format(path))
+            magic, version, start, n_hours, n_stations, station_id_size, \
+                index_offset = _header.unpack(header)
+            if magic != ARCHIVE_MAGIC or version != ARCHIVE_VERSION:
+                raise ValueError("Not a temperature archive: {}".format(path))
+
+            f.seek(index_offset)
+            self.stations = np.frombuffer(
+                f.read(n_stations * station_id_size),
+                dtype="S{}".format(station_id_size))
+            offsets = np.frombuffer(f.read(n_stations * 8), dtype="<i8")
+
+        self.start = pd.Timestamp(start, unit="s", tz="UTC")
+        self.n_hours = n_hours
+        self._start_seconds = start
+
+        self._rows = (offsets - _header.size) // (4 * n_hours) \
+            if n_hours > 0 else offsets
+        if n_stations > 0:
+            self.data = np.memmap(path, dtype="<f4", mode="r",
+                                  offset=_header.size,
+                                  shape=(n_stations, n_hours))
+        else:
+            self.data = np.empty((0, n_hours), dtype="<f4")
+
+    def __repr__(self):
+        return 'TemperatureArchive("{}")'.format(self.path)
+
+    def __reduce__(self):
+        # reopen (and share the page cache) instead of copying the data.
+        return (open_archive, (self.path,))
+
+    def __len__(self):
+        return self.stations.shape[0]
+
+    def __contains__(self, station):
+        return self._find(station) is not None
+
+    @property
+    def end(self):
+        ''' End of the grid (exclusive). '''
+        return self.start + pd.Timedelta(hours=self.n_hours)
+
+    def _find(self, station):
+        key = str(station).encode("ascii")
+        i = np.searchsorted(self.stations, key)
+        if i < self.stations.shape[0] and self.stations[i] == key:
+            return self._rows[i]
+        return None
+
+    def station_data(self, station):
+        ''' Hourly temperatures (degC) of one station over the whole grid.
+
+        Parameters
+        ----------
+        station : str
+            Station identifier.
+
+        Returns
+        -------
+        data : numpy.ndarray
+            Read-only float32 view into the memory-mapped archive.
+        '''
+        row = self._find(station)
+        if row is None:
+            message = 'Station "{}" not in {}.'.format(station, self)
+            raise KeyError(message)
+        return self.data[row]
+
+    def hour_positions(self, index):
+        ''' Grid positions of timestamps, which must fall on the hour.
+
+        Parameters
+        ----------
+        index : pandas.DatetimeIndex
+            Timezone-aware timestamps.
+
+        Returns
+        -------
+        positions : numpy.ndarray
+            Integer hour offsets from the start of the grid; may be out of
+            the grid's bounds.
+        '''
+        seconds = index.asi8 // 10**9 - self._start_seconds
+        if np.any(seconds % _HOUR != 0) or np.any(index.asi8 % 10**9 != 0):
+            message = "Timestamps must fall on the hour."
+            raise ValueError(message)
+        return seconds // _HOUR
+
+
+def open_archive(path):
+    ''' Open a temperature archive, sharing one memory map per file within
+    the process. Archives rewritten since they were opened are reopened.
+
+    Parameters
+    ----------
+    path : str
+        Archive filename.
+
+    Returns
+    -------
+    archive : eemeter.weather.archive.TemperatureArchive
+        Shared archive.
+    '''
+    path = os.path.abspath(path)
+    stat = os.stat(path)
+    version = (stat.st_ino, stat.st_mtime)
+    with _archives_lock:
+        archive, archive_version = _archives.get(path, (None, None))
+        if archive is None or archive_version != version:
+            # new or rewritten (see write_archive) since it was opened.
+            archive = TemperatureArchive(path)
+            _archives[path] = (archive, version)
+    return archive
+
+
+class ArchiveWeatherSource(WeatherSourceBase):
+    ''' The :code:`ArchiveWeatherSource` serves hourly weather data from a
+    memory-mapped temperature archive (see
+    :code:`eemeter.weather.archive.write_archive`) without loading or
+    deserializing it. Hourly temperatures are zero-copy slices of the
+    archive, so every weather source and every process reading an archive
+    shares a single page-cached copy of it. Temperatures are float32.
+
+    Basic usage is as follows:
+
+    .. code-block:: python
+
+        >>> from eemeter.weather import ArchiveWeatherSource
+        >>> ws = ArchiveWeatherSource("722880", "/path/to/archive.bin")
+
+    or, using :code:`weather_archive.bin` in the weather cache directory,
+    which also lets :code:`WeatherSourceRegistry` create it:
+
+    .. code-block:: python
+
+        >>> ws = ArchiveWeatherSource("722880")
+
+    Parameters
+    ----------
+    station : str
+        Station identifier.
+    archive : str or eemeter.weather.archive.TemperatureArchive, default None
+        Archive, archive filename, or directory containing
+        :code:`weather_archive.bin`. Defaults to the weather cache
+        directory (see :code:`EEMETER_WEATHER_CACHE_DIRECTORY`).
+    '''
+
+    freq = "H"
+
+    def __init__(self, station, archive=None):
+        self.station = station
+
+        if not isinstance(archive, TemperatureArchive):
+            archive = open_archive(self._get_archive_path(archive))
+        self.archive = archive
+
+        if station not in archive:
+            message = (
+                "`{}` not found in temperature archive {}."
+                .format(station, archive.path)
+            )
+            raise ValueError(message)
+
+        self._data = archive.station_data(station)
+        self._tempC = None
+
+    def __repr__(self):
+        return 'ArchiveWeatherSource("{}")'.format(self.station)
+
+    def __getstate__(self):
+        return {"station": self.station, "archive": self.archive}
+
+    def __setstate__(self, state):
+        self.__init__(state["station"], state["archive"])
+
+    @staticmethod
+    def _get_archive_path(archive):
+        if archive is None:
+            archive = os.environ.get(
+                "EEMETER_WEATHER_CACHE_DIRECTORY",
+                os.path.expanduser('~/.eemeter/cache'))
+        if os.path.isdir(archive):
+            archive = os.path.join(archive, ARCHIVE_FILENAME)
+        return archive
+
+    @property
+    def tempC(self):
+        ''' Hourly temperatures over the whole archive, as a series backed
+        by the archive. '''
+        if self._tempC is None:
+            index = pd.date_range(self.archive.start,
+                                  periods=self.archive.n_hours, freq='H')
+            self._tempC = pd.Series(self._data, index=index, copy=False)
+        return self._tempC
+
+    def _values(self, start, stop):
+        # hourly values for grid positions [start, stop); a view if entirely
+        # within the grid, NaN padded otherwise.
+        n_hours = self._data.shape[0]
+        if 0 <= start and stop <= n_hours:
+            return self._data[start:stop]
+        values = np.full(max(stop - start, 0), np.nan, dtype="<f4")
+        lo, hi = max(start, 0), min(stop, n_hours)
+        if lo < hi:
+            values[lo - start:hi - start] = self._data[lo:hi]
+        return values
+
+    def indexed_temperatures(self, index, unit, allow_mixed_frequency=False):
+        ''' Return average temperatures over the given index.
+
+        Parameters
+        ----------
+        index : pandas.DatetimeIndex
+            Index over which to supply average temperatures.
+            The :code:`index` should be given as either an hourly ('H') or
+            daily ('D') frequency, on the hour.
+        unit : str, {"degF", "degC"}
+            Target temperature unit for returned temperature series.
+        allow_mixed_frequency : bool, default False
+            If :code:`True`, :code:`index` may instead give the boundaries
+            of arbitrary periods, for which hourly temperatures are returned
+            with a :code:`("period", "hourly")` MultiIndex.
+
+        Returns
+        -------
+        temperatures : pandas.Series with DatetimeIndex
+            Average temperatures over series indexed by :code:`index`.
+            Hourly temperatures in degC are a read-only view of the
+            archive.
+        '''
+        if index.shape == (0,):
+            return pd.Series([], index=index, dtype=float)
+
+        if index.freq == 'D':
+            return self._daily_indexed_temperatures(index, unit)
+        elif index.freq == 'H':
+            return self._hourly_indexed_temperatures(index, unit)
+        elif allow_mixed_frequency:
+            return self._mixed_frequency_indexed_temperatures(index, unit)
+        else:
+            message = 'DatetimeIndex with mixed frequency not supported.'
+            raise ValueError(message)
+
+    def _hourly_indexed_temperatures(self, index, unit):
+        start = int(self.archive.hour_positions(index[:1])[0])
+        values = self._values(start, start + index.shape[0])
+        tempC = pd.Series(values, index=index, copy=False)
+        return self._unit_convert(tempC, unit)
+
+    def _daily_indexed_temperatures(self, index, unit):
+        positions = self.archive.hour_positions(index)
+        start = int(positions[0])
+        values = self._values(start, int(positions[-1]) + 24)
+
+        means = window_means(values, positions - start, 24)
+        tempC = pd.Series(means.astype("<f4"), index=index)
+        return self._unit_convert(tempC, unit)
+
+    def _mixed_frequency_indexed_temperatures(self, index, unit):
+        if (np.diff(index.asi8) < _HOUR * 10**9).any():
+            message = (
+                'DatetimeIndex with a period below "{}" not supported.'
+                .format(pd.Timedelta('1 hours'))
+            )
+            raise ValueError(message)
+
+        # hours p with period_start <= p < period_end, for each period.
+        seconds = index.asi8 // 10**9 - self.archive._start_seconds
+        bounds = -(-seconds // _HOUR)  # ceil
+        lengths = np.diff(bounds)
+        if lengths.sum() == 0:
+            message = 'Could not create partitioned mulitindex.'
+            raise ValueError(message)
+
+        period_index = np.repeat(np.arange(lengths.shape[0]), lengths)
+        positions = np.arange(lengths.sum()) - \
+            np.repeat(np.cumsum(lengths) - lengths, lengths) + \
+            np.repeat(bounds[:-1], lengths)
+
+        values = self._values(int(bounds[0]), int(bounds[-1]))
+        values = values[positions - bounds[0]]
+
+        hourly = self.archive.start + pd.to_timedelta(positions, unit='h')
+        index_ = pd.MultiIndex.from_arrays(
+            [index[:-1][period_index], hourly], names=["period", "hourly"])
+        tempC = pd.DataFrame(values, index=index_)
+        return self._unit_convert(tempC, unit)
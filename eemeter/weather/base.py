@@ -7,6 +7,37 @@ class WeatherSourceBase(object):
         self.station = station
         self.tempC = pd.Series(dtype=float)
 
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state.pop("_resampled_views", None)  # rebuilt on demand
+        return state
+
+    @property
+    def tempC(self):
+        return self._tempC
+
+    @tempC.setter
+    def tempC(self, tempC):
+        self._tempC = tempC
+        self._invalidate_resampled()
+
+    def _invalidate_resampled(self):
+        # must be called after modifying tempC in place.
+        self._resampled_views = {}
+
+    def _resampled(self, freq, loffset=None):
+        # mean of tempC by freq, memoized until tempC changes.
+        views = self.__dict__.setdefault("_resampled_views", {})
+        key = (freq, loffset)
+        view = views.get(key)
+        if view is None:
+            if loffset is None:
+                view = self.tempC.resample(freq).mean()
+            else:
+                view = self.tempC.resample(freq, loffset=loffset).mean()
+            views[key] = view
+        return view
+
     @staticmethod
     def _unit_convert(x, unit):
         if unit is None or unit == "degC":
@@ -1,25 +1,64 @@
+from contextlib import contextmanager
 import os
 import json
 import sqlite3
+import threading
 
 
-class SqliteJSONStore(object):
+# UPSERT (INSERT ... ON CONFLICT DO UPDATE) requires SQLite 3.24.
+_UPSERT = sqlite3.sqlite_version_info >= (3, 24, 0)
 
-    def __init__(self, directory=None):
 
-        # creates the self.conn attribute
+class SqliteJSONStore(object):
+    """ Key-value store of JSON and binary items in a SQLite database,
+    used as the weather cache.
+
+    The store can be shared by many threads and processes: each thread
+    (and each forked process) gets its own connection, the database uses
+    write-ahead logging so that readers don't block the writer, and writers
+    wait up to :code:`timeout` seconds for each other rather than failing
+    with "database is locked". Group writes with :code:`.transaction()` to
+    commit them together.
+
+    Parameters
+    ----------
+    directory : str, default None
+        Directory in which to store the database. Defaults to
+        :code:`EEMETER_WEATHER_CACHE_DIRECTORY` or :code:`~/.eemeter/cache`.
+    timeout : float, default 60
+        Seconds to wait for a lock held by another connection.
+    """
+
+    filename = "weather_cache.db"
+
+    def __init__(self, directory=None, timeout=60.0):
+        self.timeout = timeout
+
+        # creates the database and the self.conn attribute
         self._prepare_db(directory)
 
     def __repr__(self):
         return 'SqliteJSONStore("{}")'.format(self.directory)
 
+    def __getstate__(self):
+        # sqlite connections can't be pickled; reconnect on unpickling.
+        return {"directory": self.directory, "timeout": self.timeout}
+
+    def __setstate__(self, state):
+        self.timeout = state.get("timeout", 60.0)
+        self._prepare_db(state["directory"])
+
     def _get_directory(self):
         """ Returns a directory to be used for caching.
         """
         directory = os.environ.get("EEMETER_WEATHER_CACHE_DIRECTORY",
                                    os.path.expanduser('~/.eemeter/cache'))
         if not os.path.exists(directory):
-            os.makedirs(directory)
+            try:
+                os.makedirs(directory)
+            except OSError:  # created concurrently
+                if not os.path.isdir(directory):
+                    raise
         return directory
 
     def _prepare_db(self, directory=None):
@@ -29,23 +68,84 @@ class SqliteJSONStore(object):
 
         self.directory = directory
 
-        self.db_filename = os.path.join(directory, "weather_cache.db")
-
-        exists = os.path.exists(self.db_filename)
-        conn = sqlite3.connect(self.db_filename,
-                               detect_types=sqlite3.PARSE_DECLTYPES)
-
-        if not exists:
-            conn.execute(
-                'CREATE TABLE IF NOT EXISTS items('
-                'id INTEGER PRIMARY KEY AUTOINCREMENT NOT NULL, '
-                'data TEXT NOT NULL, '
-                'key TEXT UNIQUE NOT NULL, '
-                'dt TIMESTAMP DEFAULT CURRENT_TIMESTAMP NOT NULL);'
-            )
-            conn.commit()
-
-        self.conn = conn
+        self.db_filename = os.path.join(directory, self.filename)
+
+        self._local = threading.local()
+
+        conn = self.conn
+        exists = conn.execute(
+            'SELECT name FROM sqlite_master'
+            ' WHERE type=\'table\' AND name=\'items\';').fetchone()
+        if exists is None:
+            with self.transaction():
+                conn.execute(
+                    'CREATE TABLE IF NOT EXISTS items('
+                    'id INTEGER PRIMARY KEY AUTOINCREMENT NOT NULL, '
+                    'data TEXT NOT NULL, '
+                    'key TEXT UNIQUE NOT NULL, '
+                    'dt TIMESTAMP DEFAULT CURRENT_TIMESTAMP NOT NULL);'
+                )
+
+        # persistent, so only set once per database (including databases
+        # created by earlier versions); left as is where WAL isn't supported.
+        journal_mode = conn.execute('PRAGMA journal_mode;').fetchone()[0]
+        if journal_mode.lower() != 'wal':
+            conn.execute('PRAGMA journal_mode=WAL;')
+
+    def _connect(self):
+        # autocommit mode: transactions are managed by .transaction().
+        conn = sqlite3.connect(self.db_filename, timeout=self.timeout,
+                               detect_types=sqlite3.PARSE_DECLTYPES,
+                               isolation_level=None)
+        conn.execute('PRAGMA synchronous=NORMAL;')
+        return conn
+
+    @property
+    def conn(self):
+        """ Connection of the current thread in the current process. """
+        local = self._local
+        pid = os.getpid()
+        if getattr(local, "pid", None) != pid:
+            # new thread, or a connection inherited across fork, which
+            # mustn't be used.
+            local.conn = self._connect()
+            local.pid = pid
+            local.depth = 0
+        return local.conn
+
+    @contextmanager
+    def transaction(self):
+        """ Context manager grouping writes of the current thread into a
+        single transaction, which is committed on exit or rolled back on
+        error. Transactions may be nested; only the outermost commits.
+
+        .. code-block:: python
+
+            >>> with store.transaction():
+            ...     store.save_json("a", 1)
+            ...     store.save_json("b", 2)
+        """
+        conn = self.conn
+        local = self._local
+        if local.depth > 0:
+            local.depth += 1
+            try:
+                yield conn
+            finally:
+                local.depth -= 1
+            return
+
+        # take the write lock up front, so that the busy timeout applies.
+        conn.execute('BEGIN IMMEDIATE;')
+        local.depth = 1
+        try:
+            yield conn
+        except BaseException:
+            local.depth = 0
+            conn.execute('ROLLBACK;')
+            raise
+        local.depth = 0
+        conn.execute('COMMIT;')
 
     def key_exists(self, key):
         cursor = self.conn.cursor()
@@ -54,23 +154,40 @@ class SqliteJSONStore(object):
         return key is not None
 
     def save_json(self, key, data):
-        data = json.dumps(data)
+        self._save(key, json.dumps(data))
 
-        if self.key_exists(key):
-            sql = (
-                'UPDATE items SET'
-                ' data=?,'
-                ' dt=datetime(\'now\')'
-                ' WHERE key=?'
-            )
-        else:
+    def save_blob(self, key, data):
+        self._save(key, sqlite3.Binary(data))
+
+    def save_blobs(self, items):
+        """ Saves many :code:`(key, data)` blobs in a single transaction,
+        which is rolled back if any of them fails.
+        """
+        with self.transaction():
+            for key, data in items:
+                self._save(key, sqlite3.Binary(data))
+
+    def _save(self, key, data):
+        if _UPSERT:
             sql = (
                 'INSERT INTO items'
                 ' (data, key)'
                 ' VALUES (?, ?)'
+                ' ON CONFLICT(key) DO UPDATE SET'
+                ' data=excluded.data,'
+                ' dt=datetime(\'now\')'
             )
-        self.conn.execute(sql, (data, key))
-        self.conn.commit()
+            with self.transaction() as conn:
+                conn.execute(sql, (data, key))
+        else:
+            with self.transaction() as conn:
+                cursor = conn.execute(
+                    'UPDATE items SET data=?, dt=datetime(\'now\')'
+                    ' WHERE key=?;', (data, key))
+                if cursor.rowcount == 0:
+                    conn.execute(
+                        'INSERT INTO items (data, key) VALUES (?, ?);',
+                        (data, key))
 
     def retrieve_json(self, key):
         cursor = self.conn.cursor()
@@ -80,6 +197,28 @@ class SqliteJSONStore(object):
             return None
         return json.loads(data[0])
 
+    def retrieve_blob(self, key):
+        cursor = self.conn.cursor()
+        cursor.execute('SELECT data FROM items WHERE key=?;', (key,))
+        data = cursor.fetchone()
+        if data is None:
+            return None
+        return bytes(data[0])
+
+    def move_to_blob(self, old_key, new_key, data):
+        """ Replaces the item stored under :code:`old_key` with a blob
+        stored under :code:`new_key`, keeping the original timestamp. If
+        :code:`new_key` already exists, the old item is just deleted.
+        """
+        with self.transaction() as conn:
+            try:
+                conn.execute(
+                    'UPDATE items SET key=?, data=? WHERE key=?;',
+                    (new_key, sqlite3.Binary(data), old_key))
+            except sqlite3.IntegrityError:
+                # only the failed statement is undone
+                conn.execute('DELETE FROM items WHERE key=?;', (old_key,))
+
     def retrieve_datetime(self, key):
         cursor = self.conn.cursor()
         cursor.execute('SELECT dt FROM items WHERE key=?;', (key,))
@@ -89,9 +228,8 @@ class SqliteJSONStore(object):
         return data[0]
 
     def clear(self, key=None):
-        if key is None:
-            self.conn.execute('DELETE FROM items;')
-            self.conn.commit()
-        else:
-            self.conn.execute('DELETE FROM items WHERE key=?;', (key,))
-            self.conn.commit()
+        with self.transaction() as conn:
+            if key is None:
+                conn.execute('DELETE FROM items;')
+            else:
+                conn.execute('DELETE FROM items WHERE key=?;', (key,))
@@ -1,35 +1,317 @@
 import ftplib
 import gzip
-from io import BytesIO
-import json
+from io import BytesIO, StringIO
 import logging
-from pkg_resources import resource_stream
+import threading
+import time
 import warnings
-from datetime import datetime, timedelta
 
+import numpy as np
 import pytz
 import pandas as pd
-import requests
+
+from .resource_pack import load_resource
 
 logger = logging.getLogger(__name__)
 
 
+def _fixed_width_column(lines, start, end):
+    # bytes start:end of each line as an (n_lines, end - start) uint8 array,
+    # null padded where lines are short.
+    width = end - start
+    column = np.array([line[start:end] for line in lines],
+                      dtype="S{}".format(width))
+    return column.view(np.uint8).reshape(-1, width)
+
+
+def _parse_digits(chars):
+    # integers from a uint8 array of ASCII digits, one number per row.
+    digits = chars.astype(np.int64) - ord("0")
+    if ((digits < 0) | (digits > 9)).any():
+        message = "Expected only digits in date column."
+        raise ValueError(message)
+    return digits.dot(10 ** np.arange(chars.shape[1] - 1, -1, -1))
+
+
+def _parse_utc_datetimes(chars):
+    # UTC DatetimeIndex from a uint8 array of YYYYMMDD[HH[MM]] digits, one
+    # date per row.
+    return _utc_datetimes(
+        _parse_digits(chars[:, 0:4]),
+        _parse_digits(chars[:, 4:6]),
+        _parse_digits(chars[:, 6:8]),
+        _parse_digits(chars[:, 8:10]) if chars.shape[1] >= 10 else 0,
+        _parse_digits(chars[:, 10:12]) if chars.shape[1] >= 12 else 0,
+    )
+
+
+def _utc_datetimes(year, month, day, hour=0, minute=0):
+    # UTC DatetimeIndex from arrays of date parts; invalid dates raise a
+    # ValueError, as with strptime.
+    year, month, day, hour, minute = np.broadcast_arrays(
+        year, month, day, hour, minute)
+
+    months = ((year - 1970) * 12 + month - 1).astype("M8[M]")
+    days = months.astype("M8[D]") + (day - 1).astype("m8[D]")
+    valid = (
+        (month >= 1) & (month <= 12) & (day >= 1) &
+        (days.astype("M8[M]") == months) &
+        (hour >= 0) & (hour < 24) & (minute >= 0) & (minute < 60)
+    )
+    if not valid.all():
+        i = np.argmin(valid)
+        message = (
+            "Invalid date: {:04d}-{:02d}-{:02d} {:02d}:{:02d}"
+            .format(year[i], month[i], day[i], hour[i], minute[i])
+        )
+        raise ValueError(message)
+
+    nanoseconds = days.astype("M8[ns]").view(np.int64) + \
+        (hour * 3600 + minute * 60) * 10**9
+    return pd.DatetimeIndex(nanoseconds.view("M8[ns]")).tz_localize(pytz.UTC)
+
+
+def _assign_series(index, timestamps, values):
+    # Equivalent to
+    #
+    #     series = pd.Series(None, index=index, dtype=float)
+    #     for dt, value in zip(timestamps, values):
+    #         series[dt] = value
+    #
+    # in bulk: later values replace earlier ones and timestamps not in the
+    # index are appended, in order of first appearance.
+    codes, uniques = pd.factorize(timestamps)
+    _, last_reversed = np.unique(codes[::-1], return_index=True)
+    unique_values = values[codes.shape[0] - 1 - last_reversed]
+
+    positions = index.get_indexer(uniques)
+    in_index = positions >= 0
+    data = np.full(index.shape[0], np.nan)
+    data[positions[in_index]] = unique_values[in_index]
+
+    if in_index.all():
+        return pd.Series(data, index=index)
+    return pd.Series(
+        np.concatenate([data, unique_values[~in_index]]),
+        index=index.append(uniques[~in_index]),
+    )
+
+
+def parse_isd_data(lines, year):
+    ''' Parse hourly temperatures from the lines of an ISD data file.
+
+    Parameters
+    ----------
+    lines : list of bytes
+        Lines of the (decompressed) ISD fixed-width data file.
+    year : {int, str}
+        Year of the data file.
+
+    Returns
+    -------
+    series : pandas.Series
+        Temperatures (degC) on an hourly grid for :code:`year` and the
+        following year, indexed by UTC timestamp; off-grid observation
+        times are appended after the grid.
+    '''
+    dates = pd.date_range("{}-01-01 00:00".format(year),
+                          "{}-12-31 23:00".format(int(year) + 1),
+                          freq='H', tz=pytz.UTC)
+    if len(lines) == 0:
+        return pd.Series(None, index=dates, dtype=float)
+
+    timestamps = _parse_utc_datetimes(_fixed_width_column(lines, 15, 27))
+
+    temp_chars = np.array([line[87:92] for line in lines], dtype="S5")
+    temp_C = temp_chars.astype(float) / 10.
+    temp_C[temp_chars == b"+9999"] = np.nan
+
+    return _assign_series(dates, timestamps, temp_C)
+
+
+def parse_gsod_data(lines, year):
+    ''' Parse daily mean temperatures from the lines of a GSOD data file.
+
+    Parameters
+    ----------
+    lines : list of bytes
+        Lines of the (decompressed) GSOD data file, including its header.
+    year : {int, str}
+        Year of the data file.
+
+    Returns
+    -------
+    series : pandas.Series
+        Temperatures (degC) on a daily grid for :code:`year`, indexed by UTC
+        date.
+    '''
+    dates = pd.date_range("{}-01-01 00:00".format(year),
+                          "{}-12-31 00:00".format(year),
+                          freq='D', tz=pytz.UTC)
+    if len(lines) <= 1:
+        return pd.Series(None, index=dates, dtype=float)
+
+    columns = [line.split()[2:4] for line in lines[1:]]
+    date_strs = np.array([c[0] for c in columns])
+    if date_strs.dtype.itemsize != 8:
+        message = "Expected YYYYMMDD dates in GSOD data."
+        raise ValueError(message)
+    timestamps = _parse_utc_datetimes(
+        date_strs.view(np.uint8).reshape(-1, 8))
+
+    temp_F = np.array([c[1] for c in columns]).astype(float)
+    temp_C = (5./9.) * (temp_F - 32.)
+
+    return _assign_series(dates, timestamps, temp_C)
+
+
+def parse_tmy3_data(text):
+    ''' Parse hourly temperatures from a TMY3 CSV file.
+
+    Parameters
+    ----------
+    text : str
+        Contents of the TMY3 CSV file.
+
+    Returns
+    -------
+    series : pandas.Series
+        Temperatures (degC) on an hourly grid for the year 1900, indexed by
+        UTC timestamp. Timestamps are converted from local standard time and
+        wrapped around to stay within 1900.
+    '''
+    index = pd.date_range("1900-01-01 00:00", "1900-12-31 23:00",
+                          freq='H', tz=pytz.UTC)
+
+    first_line, _, data = text.partition("\n")
+    utc_offset_str = first_line.split(',')[3]
+    utc_offset = int(round(3600 * 10**9 * float(utc_offset_str)))
+
+    df = pd.read_csv(StringIO(data), header=None, skiprows=1,
+                     usecols=[0, 1, 31], dtype={0: str, 1: str, 31: float})
+    if df.shape[0] == 0:
+        return pd.Series(None, index=index, dtype=float)
+
+    # dates are MM/DD/YYYY and times HH:MM, with hours ending 01 to 24.
+    timestamps = _utc_datetimes(
+        1900,
+        df[0].str[0:2].astype(int).values,
+        df[0].str[3:5].astype(int).values,
+        df[1].str[0:2].astype(int).values - 1,
+    )
+    nanoseconds = timestamps.asi8 - utc_offset
+
+    # make year 1900 again - matters for the first or last few hours of the
+    # year, depending on the UTC offset. 1899 to 1901 have no leap days.
+    year = nanoseconds.view("M8[ns]").astype("M8[Y]").astype(int) + 1970
+    nanoseconds = nanoseconds + (1900 - year) * 365 * 86400 * 10**9
+    timestamps = pd.DatetimeIndex(nanoseconds.view("M8[ns]")) \
+        .tz_localize(pytz.UTC)
+
+    return _assign_series(index, timestamps, df[31].values)
+
+
+def _close_ftp(ftp):
+    try:
+        ftp.close()
+    except ftplib.all_errors:
+        pass
+
+
+class FTPConnectionPool(object):
+    ''' Bounded, thread-safe pool of FTP connections. At most
+    :code:`max_size` connections are open or in use at once; callers of
+    :code:`.get()` block until one is available. Connections idle for more
+    than :code:`max_idle` seconds are assumed to have been dropped by the
+    server and are replaced.
+
+    Parameters
+    ----------
+    connect : callable
+        Returns a new, logged in :code:`ftplib.FTP` connection.
+    max_size : int, default 4
+        Maximum number of connections.
+    max_idle : float, default 60
+        Seconds after which idle connections are replaced.
+    '''
+
+    def __init__(self, connect, max_size=4, max_idle=60):
+        self.connect = connect
+        self.max_size = max_size
+        self.max_idle = max_idle
+        self._idle = []  # (ftp, last used)
+        self._slots = threading.BoundedSemaphore(max_size)
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return 'FTPConnectionPool(max_size={})'.format(self.max_size)
+
+    def get(self):
+        ''' Take a connection from the pool, connecting if no idle
+        connection is available. Return it with :code:`.put()` or, if it is
+        no longer usable, :code:`.discard()`.
+        '''
+        self._slots.acquire()
+        try:
+            while True:
+                with self._lock:
+                    if not self._idle:
+                        break
+                    ftp, last_used = self._idle.pop()
+                if time.time() - last_used < self.max_idle:
+                    return ftp
+                _close_ftp(ftp)
+            return self.connect()
+        except BaseException:
+            self._slots.release()
+            raise
+
+    def put(self, ftp):
+        ''' Return a connection to the pool. '''
+        with self._lock:
+            self._idle.append((ftp, time.time()))
+        self._slots.release()
+
+    def discard(self, ftp):
+        ''' Close a connection taken from the pool instead of returning it.
+        '''
+        _close_ftp(ftp)
+        self._slots.release()
+
+    def close(self):
+        ''' Close all idle connections. '''
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for ftp, _ in idle:
+            _close_ftp(ftp)
+
+
 class NOAAClient(object):
 
-    def __init__(self, n_tries=3):
+    gsod_filename_format = '/pub/data/gsod/{year}/{station}-{year}.op.gz'
+    isd_filename_format = '/pub/data/noaa/{year}/{station}-{year}.gz'
+
+    def __init__(self, n_tries=3, max_connections=4,
+                 host="ftp.ncdc.noaa.gov", port=21):
         self.n_tries = n_tries
-        self.ftp = None  # lazily load
+        self.max_connections = max_connections
+        self.host = host
+        self.port = port
+        self.pool = FTPConnectionPool(self._get_ftp_connection,
+                                      max_connections)
         self.station_index = None  # lazily load
 
     def _get_ftp_connection(self):
         for _ in range(self.n_tries):
             try:
-                ftp = ftplib.FTP("ftp.ncdc.noaa.gov")
+                ftp = ftplib.FTP()
+                ftp.connect(self.host, self.port)
             except ftplib.all_errors as e:
                 logger.warn("FTP connection issue: %s", e)
             else:
                 logger.info(
-                    "Successfully established connection to ftp.ncdc.noaa.gov."
+                    "Successfully established connection to {}."
+                    .format(self.host)
                 )
                 try:
                     ftp.login()
@@ -37,16 +319,14 @@ class NOAAClient(object):
                     logger.warn("FTP login issue: %s", e)
                 else:
                     logger.info(
-                        "Successfully logged in to ftp.ncdc.noaa.gov."
+                        "Successfully logged in to {}.".format(self.host)
                     )
                     return ftp
         raise RuntimeError("Couldn't establish an FTP connection.")
 
     def _load_station_index(self):
         if self.station_index is None:
-            with resource_stream('eemeter.resources',
-                                 'GSOD-ISD_station_index.json') as f:
-                self.station_index = json.loads(f.read().decode("utf-8"))
+            self.station_index = load_resource('GSOD-ISD_station_index.json')
         return self.station_index
 
     def _get_potential_station_ids(self, station):
@@ -59,47 +339,54 @@ class NOAAClient(object):
         return potential_station_ids
 
     def _retreive_file_lines(self, filename_format, station, year):
+        # Safe to call from multiple threads; each call uses its own pooled
+        # connection, reconnecting it if it goes bad.
         string = BytesIO()
 
-        if self.ftp is None:
-            self.ftp = self._get_ftp_connection()
-
-        for station_id in self._get_potential_station_ids(station):
-            filename = filename_format.format(station=station_id, year=year)
-            try:
-                self.ftp.retrbinary('RETR {}'.format(filename), string.write)
-            except (IOError, ftplib.error_perm) as e1:
-                logger.warn(
-                    "Failed FTP RETR for station {}: {}."
-                    " Not attempting reconnect."
-                    .format(station_id, e1)
-                )
-            except (ftplib.error_temp, EOFError) as e2:
-                # Bad connection. attempt to reconnect.
-                logger.warn(
-                    "Failed FTP RETR for station {}: {}."
-                    " Attempting reconnect."
-                    .format(station_id, e2)
-                )
-                self.ftp.close()
-                self.ftp = self._get_ftp_connection()
+        ftp = self.pool.get()
+        try:
+            for station_id in self._get_potential_station_ids(station):
+                filename = filename_format.format(station=station_id,
+                                                  year=year)
                 try:
-                    self.ftp.retrbinary('RETR {}'.format(filename),
-                                        string.write)
-                except (IOError, ftplib.error_perm) as e3:
+                    ftp.retrbinary('RETR {}'.format(filename), string.write)
+                except (IOError, ftplib.error_perm) as e1:
                     logger.warn(
                         "Failed FTP RETR for station {}: {}."
-                        " Trying another station id."
-                        .format(station_id, e3)
+                        " Not attempting reconnect."
+                        .format(station_id, e1)
                     )
+                except (ftplib.error_temp, EOFError) as e2:
+                    # Bad connection. attempt to reconnect.
+                    logger.warn(
+                        "Failed FTP RETR for station {}: {}."
+                        " Attempting reconnect."
+                        .format(station_id, e2)
+                    )
+                    _close_ftp(ftp)
+                    ftp = self._get_ftp_connection()
+                    string.seek(0)
+                    string.truncate()  # drop any partial transfer
+                    try:
+                        ftp.retrbinary('RETR {}'.format(filename),
+                                       string.write)
+                    except (IOError, ftplib.error_perm) as e3:
+                        logger.warn(
+                            "Failed FTP RETR for station {}: {}."
+                            " Trying another station id."
+                            .format(station_id, e3)
+                        )
+                    else:
+                        break
                 else:
                     break
-            else:
-                break
+        except BaseException:
+            self.pool.discard(ftp)
+            raise
+        self.pool.put(ftp)
 
         logger.info(
-            'Successfully retrieved ftp://ftp.ncdc.noaa.gov{}'
-            .format(filename)
+            'Successfully retrieved ftp://{}{}'.format(self.host, filename)
         )
 
         string.seek(0)
@@ -110,44 +397,15 @@ class NOAAClient(object):
 
     def get_gsod_data(self, station, year):
 
-        filename_format = '/pub/data/gsod/{year}/{station}-{year}.op.gz'
-        lines = self._retreive_file_lines(filename_format, station, year)
-
-        dates = pd.date_range("{}-01-01 00:00".format(year),
-                              "{}-12-31 00:00".format(year),
-                              freq='D', tz=pytz.UTC)
-        series = pd.Series(None, index=dates, dtype=float)
-
-        for line in lines[1:]:
-            columns = line.split()
-            date_str = columns[2].decode('utf-8')
-            temp_F = float(columns[3])
-            temp_C = (5./9.) * (temp_F - 32.)
-            dt = pytz.UTC.localize(datetime.strptime(date_str, "%Y%m%d"))
-            series[dt] = temp_C
-
-        return series
+        lines = self._retreive_file_lines(self.gsod_filename_format, station,
+                                          year)
+        return parse_gsod_data(lines, year)
 
     def get_isd_data(self, station, year):
 
-        filename_format = '/pub/data/noaa/{year}/{station}-{year}.gz'
-        lines = self._retreive_file_lines(filename_format, station, year)
-
-        dates = pd.date_range("{}-01-01 00:00".format(year),
-                              "{}-12-31 23:00".format(int(year) + 1),
-                              freq='H', tz=pytz.UTC)
-        series = pd.Series(None, index=dates, dtype=float)
-
-        for line in lines:
-            if line[87:92].decode('utf-8') == "+9999":
-                temp_C = float("nan")
-            else:
-                temp_C = float(line[87:92]) / 10.
-            date_str = line[15:27].decode('utf-8')
-            dt = pytz.UTC.localize(datetime.strptime(date_str, "%Y%m%d%H%M"))
-            series[dt] = temp_C
-
-        return series
+        lines = self._retreive_file_lines(self.isd_filename_format, station,
+                                          year)
+        return parse_isd_data(lines, year)
 
 
 class TMY3Client(object):
@@ -157,9 +415,7 @@ class TMY3Client(object):
 
     def _load_station_index(self):
         if self.station_index is None:
-            with resource_stream('eemeter.resources',
-                                 'supported_tmy3_stations.json') as f:
-                self.station_index = set(json.loads(f.read().decode("utf-8")))
+            self.station_index = load_resource('supported_tmy3_stations.json')
         return self.station_index
 
     def get_tmy3_data(self, station):
@@ -179,41 +435,18 @@ class TMY3Client(object):
             "http://rredc.nrel.gov/solar/old_data/nsrdb/"
             "1991-2005/data/tmy3/{}TYA.CSV".format(station)
         )
-        r = requests.get(url)
+        import requests
 
-        index = pd.date_range("1900-01-01 00:00", "1900-12-31 23:00",
-                              freq='H', tz=pytz.UTC)
-        series = pd.Series(None, index=index, dtype=float)
+        r = requests.get(url)
 
         if r.status_code == 200:
+            return parse_tmy3_data(r.text)
 
-            lines = r.text.splitlines()
-
-            utc_offset_str = lines[0].split(',')[3]
-            utc_offset = timedelta(seconds=3600 * float(utc_offset_str))
-
-            for line in lines[2:]:
-                row = line.split(",")
-                month = row[0][0:2]
-                day = row[0][3:5]
-                hour = int(row[1][0:2]) - 1
-
-                # YYYYMMDDHH
-                date_string = "1900{}{}{:02d}".format(month, day, hour)
-
-                dt = datetime.strptime(date_string, "%Y%m%d%H") - utc_offset
-
-                # Only a little redundant to make year 1900 again - matters for
-                # first or last few hours of the year depending UTC on offset
-                dt = pytz.UTC.localize(dt.replace(year=1900))
-                temp_C = float(row[31])
-
-                series[dt] = temp_C
-
-        else:
-            message = (
-                "Station {} was not found. Tried url {}.".format(station, url)
-            )
-            warnings.warn(message)
+        message = (
+            "Station {} was not found. Tried url {}.".format(station, url)
+        )
+        warnings.warn(message)
 
-        return series
+        index = pd.date_range("1900-01-01 00:00", "1900-12-31 23:00",
+                              freq='H', tz=pytz.UTC)
+        return pd.Series(None, index=index, dtype=float)
@@ -0,0 +1,380 @@
+import hashlib
+import struct
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from .serialization import FREQS
+
+# Base temperatures (degF) with precomputed daily degree day sums.
+DEFAULT_BASE_TEMPS = (50, 55, 60, 65, 70, 75, 80)
+
+# Degree day table format, version 1. Little-endian:
+#
+#   magic        4s   b"EEDD"
+#   version      B    1
+#   freq         1s   b"H" (hourly) or b"D" (daily)
+#   (padding)    2x
+#   start        q    first grid timestamp, seconds since 1970 UTC
+#   n            q    grid periods
+#   day_start    q    first day, seconds since 1970 UTC
+#   n_days       q    days
+#   n_bases      q    base temperatures
+#   fingerprint  20s  sha1 of the temperatures the table was built from
+#   sums         <f8  n + 1 cumulative sums of temperatures (degF)
+#   counts       <i8  n + 1 cumulative counts of temperatures
+#   bases        <f8  n_bases base temperatures (degF)
+#   cdd, hdd     <f8  for each base, n_days + 1 cumulative sums of daily
+#                     cooling degree days, then of heating degree days
+#
+MAGIC = b"EEDD"
+VERSION = 1
+
+_header = struct.Struct("<4sB1s2xqqqqq20s")
+_DAY = FREQS["D"]
+
+
+def temperature_fingerprint(tempC, freq):
+    ''' Fingerprint of temperatures on a regular grid, identifying the
+    degree day tables built from them.
+
+    Parameters
+    ----------
+    tempC : pandas.Series
+        Temperatures (degC) on a regular UTC grid.
+    freq : str, {"H", "D"}
+        Grid frequency.
+
+    Returns
+    -------
+    fingerprint : bytes
+        sha1 digest.
+    '''
+    h = hashlib.sha1(freq.encode("ascii"))
+    if tempC.shape[0] > 0:
+        h.update(struct.pack("<q", tempC.index[0].value // 10**9))
+    h.update(np.ascontiguousarray(tempC.values, dtype="<f8").tobytes())
+    return h.digest()
+
+
+class DegreeDayTable(object):
+    ''' Cumulative temperature and degree day sums of one station, so that
+    degree days over any period are a difference of two cumulative sums.
+
+    Two kinds of degree days are served:
+
+    - :code:`.period_degree_days(`: degree days of the mean temperature of
+      each period, as used by the billing model. These are derived for
+      any base temperature from cumulative sums and counts of the
+      temperatures themselves.
+    - :code:`.daily_degree_days(`: sums of the degree days of each day's
+      mean temperature. Cumulative sums are precomputed for a grid of base
+      temperatures; other bases are computed (and kept) on first use.
+
+    NOAA weather sources build and share one table per station; see
+    :code:`eemeter.weather.noaa.NOAAWeatherSourceBase.degree_day_table`.
+
+    Parameters
+    ----------
+    tempC : pandas.Series
+        Temperatures (degC) on a regular UTC grid, with NaN where missing.
+    freq : str, {"H", "D"}
+        Grid frequency.
+    base_temps : iterable of float, default :code:`DEFAULT_BASE_TEMPS`
+        Base temperatures (degF) of the precomputed daily degree day sums.
+    '''
+
+    def __init__(self, tempC, freq, base_temps=DEFAULT_BASE_TEMPS):
+        if freq not in FREQS:
+            message = 'Frequency "{}" not supported.'.format(freq)
+            raise ValueError(message)
+        self.freq = freq
+        self.step = FREQS[freq]
+        self.fingerprint = temperature_fingerprint(tempC, freq)
+
+        tempF = 1.8 * np.asarray(tempC.values, dtype=float) + 32
+        present = ~np.isnan(tempF)
+        self.start = tempC.index[0].value // 10**9 if tempF.shape[0] else 0
+        self.sums = np.concatenate(
+            [[0.], np.cumsum(np.where(present, tempF, 0.))])
+        self.counts = np.concatenate([[0], np.cumsum(present)])
+
+        # whole UTC days covering the grid
+        self.day_start = self.start - self.start % _DAY
+        offset = (self.start - self.day_start) // self.step
+        per_day = _DAY // self.step
+        self._set_daily_means(-(-(offset + self.n) // per_day))
+
+        self.daily = {}
+        for base_temp in base_temps:
+            self.add_base_temp(base_temp)
+
+    def __repr__(self):
+        return 'DegreeDayTable("{}", n={}, base_temps={})'.format(
+            self.freq, self.n, self.base_temps)
+
+    @property
+    def n(self):
+        ''' Number of grid periods. '''
+        return self.sums.shape[0] - 1
+
+    @property
+    def base_temps(self):
+        ''' Base temperatures (degF) with precomputed daily sums. '''
+        return sorted(self.daily)
+
+    def _set_daily_means(self, n_days):
+        per_day = _DAY // self.step
+        offset = (self.start - self.day_start) // self.step
+        positions = np.clip(np.arange(n_days + 1) * per_day - offset, 0,
+                            self.n)
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")  # days without data are NaN
+            self.daily_means = np.diff(self.sums[positions]) / \
+                np.diff(self.counts[positions])
+
+    def add_base_temp(self, base_temp):
+        ''' Precompute daily degree day sums for a base temperature.
+
+        Parameters
+        ----------
+        base_temp : float
+            Base temperature (degF).
+
+        Returns
+        -------
+        cdd, hdd : numpy.ndarray
+            Cumulative sums of daily cooling and heating degree days.
+        '''
+        base_temp = float(base_temp)
+        if base_temp in self.daily:
+            return self.daily[base_temp]
+        means = self.daily_means
+        present = ~np.isnan(means)
+        cdd = np.where(present, np.maximum(means - base_temp, 0.), 0.)
+        hdd = np.where(present, np.maximum(base_temp - means, 0.), 0.)
+        self.daily[base_temp] = (np.concatenate([[0.], np.cumsum(cdd)]),
+                                 np.concatenate([[0.], np.cumsum(hdd)]))
+        return self.daily[base_temp]
+
+    @staticmethod
+    def _positions(index, start, step, n):
+        # first grid position at or after each timestamp, within [0, n].
+        seconds = index.asi8 // 10**9 - start
+        return np.clip(-(-seconds // step), 0, n)
+
+    def temperature_sums(self, index):
+        ''' Sums and counts of the temperatures in the periods between
+        consecutive timestamps.
+
+        Parameters
+        ----------
+        index : pandas.DatetimeIndex
+            Period boundaries; period :code:`i` is
+            :code:`[index[i], index[i + 1])`.
+
+        Returns
+        -------
+        sums : numpy.ndarray
+            Sums of non-missing temperatures (degF) in each period.
+        counts : numpy.ndarray
+            Numbers of non-missing temperatures in each period.
+        sizes : numpy.ndarray
+            Numbers of grid periods in each period.
+        '''
+        positions = self._positions(index, self.start, self.step, self.n)
+        return (np.diff(self.sums[positions]),
+                np.diff(self.counts[positions]),
+                np.diff(positions))
+
+    def period_degree_days(self, index, cooling_base_temp,
+                           heating_base_temp):
+        ''' Cooling and heating degree days of the mean temperature of each
+        period between consecutive timestamps, i.e., the positive part of
+        the summed differences from the base temperature over days.
+
+        Parameters
+        ----------
+        index : pandas.DatetimeIndex
+            Period boundaries; period :code:`i` is
+            :code:`[index[i], index[i + 1])`.
+        cooling_base_temp : float
+            Base temperature (degF) of cooling degree days.
+        heating_base_temp : float
+            Base temperature (degF) of heating degree days.
+
+        Returns
+        -------
+        degree_days : pandas.DataFrame
+            Columns :code:`"CDD"` and :code:`"HDD"`, indexed by period
+            start; NaN for periods without any grid periods.
+        '''
+        sums, counts, sizes = self.temperature_sums(index)
+        per_day = float(_DAY // self.step)
+        cdd = np.maximum((sums - cooling_base_temp * counts) / per_day, 0.)
+        hdd = np.maximum((heating_base_temp * counts - sums) / per_day, 0.)
+        empty = sizes == 0
+        cdd[empty] = hdd[empty] = np.nan
+        return pd.DataFrame({"CDD": cdd, "HDD": hdd}, index=index[:-1],
+                            columns=["CDD", "HDD"])
+
+    def daily_degree_days(self, index, cooling_base_temp,
+                          heating_base_temp):
+        ''' Sums of the cooling and heating degree days of the mean
+        temperature of each (UTC) day in the periods between consecutive
+        timestamps. Days without data count as zero degree days.
+
+        Parameters
+        ----------
+        index : pandas.DatetimeIndex
+            Period boundaries, at midnight UTC; period :code:`i` is
+            :code:`[index[i], index[i + 1])`.
+        cooling_base_temp : float
+            Base temperature (degF) of cooling degree days.
+        heating_base_temp : float
+            Base temperature (degF) of heating degree days.
+
+        Returns
+        -------
+        degree_days : pandas.DataFrame
+            Columns :code:`"CDD"` and :code:`"HDD"`, indexed by period
+            start.
+        '''
+        if (index.asi8 % (_DAY * 10**9) != 0).any():
+            message = "Period boundaries must fall on midnight UTC."
+            raise ValueError(message)
+        positions = self._positions(index, self.day_start, _DAY,
+                                    self.daily_means.shape[0])
+        cdd = self.daily.get(float(cooling_base_temp))
+        if cdd is None:
+            cdd = self.add_base_temp(cooling_base_temp)
+        hdd = self.daily.get(float(heating_base_temp))
+        if hdd is None:
+            hdd = self.add_base_temp(heating_base_temp)
+        return pd.DataFrame({"CDD": np.diff(cdd[0][positions]),
+                             "HDD": np.diff(hdd[1][positions])},
+                            index=index[:-1], columns=["CDD", "HDD"])
+
+    @classmethod
+    def concatenate(cls, tables):
+        ''' Join tables of consecutive stretches of one temperature grid,
+        e.g., of consecutive years, into one table. Every table but the
+        last must end at midnight UTC.
+
+        Parameters
+        ----------
+        tables : list of eemeter.weather.degree_days.DegreeDayTable
+            Tables in order; each must start where the previous one ends.
+
+        Returns
+        -------
+        table : eemeter.weather.degree_days.DegreeDayTable
+            Table of the whole stretch, with the daily sums of every base
+            temperature of any of :code:`tables`. Its fingerprint is a sha1
+            of the fingerprints of :code:`tables`.
+        '''
+        first = tables[0]
+        for previous, table in zip(tables[:-1], tables[1:]):
+            end = previous.start + previous.n * previous.step
+            if table.freq != first.freq or table.start != end or \
+                    end % _DAY != 0:
+                message = "Degree day tables are not consecutive."
+                raise ValueError(message)
+
+        base_temps = sorted(set(
+            base_temp for table in tables for base_temp in table.daily))
+
+        def _join(arrays):
+            # cumulative sums, each starting at zero
+            parts, offset = [arrays[0]], arrays[0][-1]
+            for array in arrays[1:]:
+                parts.append(array[1:] + offset)
+                offset = parts[-1][-1] if array.shape[0] > 1 else offset
+            return np.concatenate(parts)
+
+        joined = cls.__new__(cls)
+        joined.freq = first.freq
+        joined.step = first.step
+        joined.start = first.start
+        joined.day_start = first.day_start
+        joined.sums = _join([table.sums for table in tables])
+        joined.counts = _join([table.counts for table in tables])
+        joined.daily = {}
+        for base_temp in base_temps:
+            daily = [table.add_base_temp(base_temp) for table in tables]
+            joined.daily[base_temp] = (_join([cdd for cdd, _ in daily]),
+                                       _join([hdd for _, hdd in daily]))
+        h = hashlib.sha1()
+        for table in tables:
+            h.update(table.fingerprint)
+        joined.fingerprint = h.digest()
+        joined._set_daily_means(
+            sum(table.daily_means.shape[0] for table in tables))
+        return joined
+
+    def serialize(self):
+        ''' Serialize the table as a compact binary blob.
+
+        Returns
+        -------
+        data : bytes
+            Serialized table.
+        '''
+        bases = self.base_temps
+        header = _header.pack(MAGIC, VERSION, self.freq.encode("ascii"),
+                              self.start, self.n, self.day_start,
+                              self.daily_means.shape[0], len(bases),
+                              self.fingerprint)
+        parts = [header, self.sums.astype("<f8").tobytes(),
+                 self.counts.astype("<i8").tobytes(),
+                 np.array(bases, dtype="<f8").tobytes()]
+        for base in bases:
+            cdd, hdd = self.daily[base]
+            parts.append(cdd.astype("<f8").tobytes())
+            parts.append(hdd.astype("<f8").tobytes())
+        return b"".join(parts)
+
+    @classmethod
+    def deserialize(cls, data):
+        ''' Deserialize a table serialized with :code:`.serialize(`.
+
+        Parameters
+        ----------
+        data : bytes
+            Serialized table.
+
+        Returns
+        -------
+        table : eemeter.weather.degree_days.DegreeDayTable
+            Deserialized table.
+        '''
+        magic, version, freq, start, n, day_start, n_days, n_bases, \
+            fingerprint = _header.unpack_from(data)
+        if magic != MAGIC or version != VERSION:
+            message = "Unrecognized degree day table format."
+            raise ValueError(message)
+
+        def _read(dtype, count, offset):
+            array = np.frombuffer(data, dtype=dtype, count=count,
+                                  offset=offset)
+            return array, offset + array.nbytes
+
+        table = cls.__new__(cls)
+        table.freq = freq.decode("ascii")
+        table.step = FREQS[table.freq]
+        table.fingerprint = fingerprint
+        table.start = start
+        table.day_start = day_start
+
+        offset = _header.size
+        table.sums, offset = _read("<f8", n + 1, offset)
+        table.counts, offset = _read("<i8", n + 1, offset)
+        bases, offset = _read("<f8", n_bases, offset)
+        table.daily = {}
+        for base in bases:
+            cdd, offset = _read("<f8", n_days + 1, offset)
+            hdd, offset = _read("<f8", n_days + 1, offset)
+            table.daily[float(base)] = (cdd, hdd)
+        table._set_daily_means(n_days)
+        return table
@@ -0,0 +1,233 @@
+from datetime import datetime, timedelta
+import logging
+import threading
+
+try:
+    import queue
+except ImportError:  # python 2
+    import Queue as queue
+
+logger = logging.getLogger(__name__)
+
+
+class FreshnessPolicy(object):
+    ''' Decides whether cached recent weather data is stale and how to
+    refresh it. Weather sources consult their policy for the current
+    year's data when they are created.
+
+    Parameters
+    ----------
+    max_age : datetime.timedelta, default 1 day
+        Age after which cached data is stale.
+    '''
+
+    def __init__(self, max_age=timedelta(days=1)):
+        self.max_age = max_age
+
+    def __repr__(self):
+        return '{}(max_age={!r})'.format(self.__class__.__name__,
+                                         self.max_age)
+
+    def is_stale(self, fetched, now=None):
+        ''' Whether data fetched at :code:`fetched` is stale.
+
+        Parameters
+        ----------
+        fetched : datetime.datetime or None
+            When the data was fetched, or :code:`None` if it isn't cached
+            (in which case there is nothing to refresh).
+        now : datetime.datetime, default None
+            Current time; defaults to :code:`datetime.now()`.
+        '''
+        if fetched is None:
+            return False
+        if now is None:
+            now = datetime.now()
+        return now - fetched > self.max_age
+
+    def check(self, weather_source, year, fetched):
+        ''' Refresh a year of data for a weather source if it is stale.
+
+        Parameters
+        ----------
+        weather_source : eemeter.weather.noaa.NOAAWeatherSourceBase
+            Weather source.
+        year : int
+            Year of data.
+        fetched : datetime.datetime or None
+            When the cached data was fetched.
+
+        Returns
+        -------
+        refreshed : bool
+            Whether the data was (or will be) refreshed.
+        '''
+        if not self.is_stale(fetched):
+            logger.info(
+                "{} will not update {} data (fetched {}): not stale under"
+                " {}.".format(weather_source, year, fetched, self)
+            )
+            return False
+        logger.info(
+            "{} will update {} data (fetched {}): stale under {}."
+            .format(weather_source, year, fetched, self)
+        )
+        self.refresh(weather_source, year)
+        return True
+
+    def refresh(self, weather_source, year):
+        ''' Refresh a year of data for a weather source. '''
+        message = "The `refresh()` method must be implemented."
+        raise NotImplementedError(message)
+
+
+class MaxAgePolicy(FreshnessPolicy):
+    ''' Refetches stale data synchronously, before the weather source is
+    used. This is the default.
+
+    Parameters
+    ----------
+    max_age : datetime.timedelta, default 1 day
+        Age after which cached data is stale.
+    '''
+
+    def refresh(self, weather_source, year):
+        weather_source.add_year(year, force_fetch=True)
+
+
+class NeverRefreshPolicy(FreshnessPolicy):
+    ''' Never refetches cached data, e.g., for use without network access.
+    '''
+
+    def __init__(self):
+        super(NeverRefreshPolicy, self).__init__(max_age=None)
+
+    def __repr__(self):
+        return 'NeverRefreshPolicy()'
+
+    def is_stale(self, fetched, now=None):
+        return False
+
+
+class BackgroundRefreshPolicy(FreshnessPolicy):
+    ''' Refetches stale data on a background thread (see
+    :code:`BackgroundRefresher`), so that creating a weather source and
+    using its historical data never waits on the network. Until the
+    refetch completes, the weather source serves the stale cached data;
+    afterwards, it is updated the next time it is used.
+
+    Basic usage is as follows:
+
+    .. code-block:: python
+
+        >>> from eemeter.weather import ISDWeatherSource
+        >>> from eemeter.weather.freshness import BackgroundRefreshPolicy
+        >>> ISDWeatherSource.freshness_policy = BackgroundRefreshPolicy()
+
+    Parameters
+    ----------
+    max_age : datetime.timedelta, default 1 day
+        Age after which cached data is stale.
+    refresher : eemeter.weather.freshness.BackgroundRefresher, default None
+        Refresher to use; defaults to a refresher shared by the process
+        (see :code:`get_background_refresher`).
+    '''
+
+    def __init__(self, max_age=timedelta(days=1), refresher=None):
+        super(BackgroundRefreshPolicy, self).__init__(max_age)
+        self.refresher = refresher
+
+    def refresh(self, weather_source, year):
+        refresher = self.refresher
+        if refresher is None:
+            refresher = get_background_refresher()
+        refresher.submit(weather_source, year)
+
+
+class BackgroundRefresher(object):
+    ''' Refetches years of weather data on a single daemon thread, started
+    on first use. Each refetched year is saved to the weather source's cache
+    and handed back to the weather source, which applies it on its own
+    thread the next time it is used. Requests for a year that is already
+    queued are ignored.
+    '''
+
+    def __init__(self):
+        self._queue = queue.Queue()
+        self._pending = set()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def __repr__(self):
+        return 'BackgroundRefresher(pending={})'.format(len(self._pending))
+
+    def submit(self, weather_source, year):
+        ''' Queue a year of data for a weather source to be refetched.
+
+        Parameters
+        ----------
+        weather_source : eemeter.weather.noaa.NOAAWeatherSourceBase
+            Weather source.
+        year : int
+            Year of data.
+
+        Returns
+        -------
+        queued : bool
+            :code:`False` if the year was already queued.
+        '''
+        key = (weather_source.__class__.__name__, weather_source.station,
+               weather_source.json_store.directory, year)
+        with self._lock:
+            if key in self._pending:
+                return False
+            self._pending.add(key)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._run, name="eemeter-weather-refresher")
+                self._thread.daemon = True
+                self._thread.start()
+        self._queue.put((key, weather_source, year))
+        return True
+
+    def join(self):
+        ''' Block until all queued refetches are done. '''
+        self._queue.join()
+
+    def _run(self):
+        while True:
+            key, weather_source, year = self._queue.get()
+            try:
+                self._refresh(weather_source, year)
+            except Exception as e:
+                logger.warn(
+                    "{} failed to refresh {} data in the background: {}"
+                    .format(weather_source, year, e)
+                )
+            finally:
+                with self._lock:
+                    self._pending.discard(key)
+                self._queue.task_done()
+
+    def _refresh(self, weather_source, year):
+        series = weather_source._fetch_year(year)
+        weather_source.save_series(year, series)
+
+        weather_source._refreshed.append((year, series))
+        logger.info(
+            "{} refreshed {} data in the background."
+            .format(weather_source, year)
+        )
+
+
+_background_refresher = None
+_background_refresher_lock = threading.Lock()
+
+
+def get_background_refresher():
+    ''' The :code:`BackgroundRefresher` shared by the process. '''
+    global _background_refresher
+    with _background_refresher_lock:
+        if _background_refresher is None:
+            _background_refresher = BackgroundRefresher()
+    return _background_refresher
@@ -0,0 +1,200 @@
+import warnings
+
+import numpy as np
+import pandas as pd
+import pytz
+
+from .serialization import FREQS
+
+
+def _year_start(year):
+    # nanoseconds since 1970 UTC at the start of a year.
+    return np.array(year - 1970).astype("M8[Y]").astype("M8[ns]") \
+        .astype(np.int64).item()
+
+
+def _year(nanoseconds):
+    return np.array(nanoseconds).astype("M8[ns]").astype("M8[Y]") \
+        .astype(np.int64).item() + 1970
+
+
+def window_means(values, starts, size):
+    ''' Means of the non-missing values in windows of :code:`values`, using
+    cumulative sums.
+
+    Parameters
+    ----------
+    values : numpy.ndarray
+        Values, with NaN where missing.
+    starts : numpy.ndarray
+        Start position of each window; windows must lie within
+        :code:`values`.
+    size : int
+        Window size.
+
+    Returns
+    -------
+    means : numpy.ndarray
+        Mean of each window, or NaN if all its values are missing.
+    '''
+    present = ~np.isnan(values)
+    sums = np.concatenate([[0.], np.cumsum(np.where(present, values, 0.),
+                                           dtype=float)])
+    counts = np.concatenate([[0], np.cumsum(present)])
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")  # windows without data are NaN
+        return (sums[starts + size] - sums[starts]) / \
+            (counts[starts + size] - counts[starts])
+
+
+class TemperatureGrid(object):
+    ''' Temperatures on a fixed UTC grid, stored in a single preallocated
+    array made of whole years. Writing a year of data touches only that
+    year; the array is reallocated (with room to spare) only when data
+    falls outside the years allocated so far. Values are looked up by
+    integer offset from the start of the grid.
+
+    Parameters
+    ----------
+    freq : str, {"H", "D"}
+        Grid frequency.
+    '''
+
+    def __init__(self, freq):
+        if freq not in FREQS:
+            message = 'Frequency "{}" not supported.'.format(freq)
+            raise ValueError(message)
+        self.freq = freq
+        self.step = FREQS[freq] * 10**9  # nanoseconds
+        self.clear()
+
+    def __repr__(self):
+        return 'TemperatureGrid("{}", years={})'.format(
+            self.freq, (self.start_year, self.end_year))
+
+    def clear(self):
+        ''' Remove all data and deallocate the grid. '''
+        self.start_year = self.end_year = None  # allocated [start, end)
+        self.start = 0  # nanoseconds since 1970 at position 0
+        self.values = np.empty(0)
+        self.lo = self.hi = 0  # covered positions [lo, hi)
+
+    def _allocate(self, first_year, last_year):
+        # make sure years [first_year, last_year] are allocated, at least
+        # doubling the allocation when it has to grow.
+        if self.start_year is None:
+            start_year, end_year = first_year, last_year + 1
+        else:
+            if self.start_year <= first_year and last_year < self.end_year:
+                return
+            n_years = self.end_year - self.start_year
+            start_year, end_year = self.start_year, self.end_year
+            if first_year < start_year:
+                start_year = min(first_year, end_year - 2 * n_years)
+            if last_year >= end_year:
+                end_year = max(last_year + 1, start_year + 2 * n_years)
+
+        start = _year_start(start_year)
+        n = (_year_start(end_year) - start) // self.step
+        values = np.full(n, np.nan)
+        if self.start_year is not None:
+            shift = (self.start - start) // self.step
+            values[shift:shift + self.values.shape[0]] = self.values
+            self.lo += shift
+            self.hi += shift
+        self.start_year, self.end_year = start_year, end_year
+        self.start = start
+        self.values = values
+
+    def write(self, series):
+        ''' Write temperatures to the grid. Values are averaged by grid
+        period and replace existing values wherever they are not missing.
+        The covered range is extended to the full range of the series'
+        index, even where its values are missing.
+
+        Parameters
+        ----------
+        series : pandas.Series
+            Temperatures with a timezone-aware :code:`DatetimeIndex`.
+        '''
+        series = series.sort_index()
+        if series.shape[0] == 0:
+            return
+
+        nanoseconds = series.index.asi8
+        self._allocate(_year(nanoseconds[0]), _year(nanoseconds[-1]))
+
+        positions = (nanoseconds - self.start) // self.step
+        first = positions[0]
+        n = positions[-1] - first + 1
+
+        values = series.values.astype(float)
+        present = ~np.isnan(values)
+        offsets = positions[present] - first
+        counts = np.bincount(offsets, minlength=n)
+        sums = np.bincount(offsets, weights=values[present], minlength=n)
+        written = counts > 0
+        self.values[first:first + n][written] = \
+            sums[written] / counts[written]
+
+        if self.lo == self.hi:
+            self.lo, self.hi = first, first + n
+        else:
+            self.lo = min(self.lo, first)
+            self.hi = max(self.hi, first + n)
+
+    def series(self):
+        ''' Covered temperatures as a series backed by the grid (not a
+        copy). '''
+        if self.lo == self.hi:
+            return pd.Series(dtype=float)
+        index = pd.date_range(
+            pd.Timestamp(self.start + self.lo * self.step, tz=pytz.UTC),
+            periods=self.hi - self.lo, freq=self.freq)
+        return pd.Series(self.values[self.lo:self.hi], index=index,
+                         copy=False)
+
+    def positions(self, index):
+        ''' Grid positions of timestamps, or :code:`None` if any of them
+        are not on the grid.
+
+        Parameters
+        ----------
+        index : pandas.DatetimeIndex
+            Timezone-aware timestamps.
+        '''
+        if index.tz is None or self.start_year is None:
+            return None
+        offsets = index.asi8 - self.start
+        if (offsets % self.step != 0).any():
+            return None
+        return offsets // self.step
+
+    def lookup(self, positions):
+        ''' Values at grid positions; NaN outside the covered range. '''
+        values = np.full(positions.shape[0], np.nan)
+        covered = (positions >= self.lo) & (positions < self.hi)
+        values[covered] = self.values[positions[covered]]
+        return values
+
+    def window_means(self, positions, size):
+        ''' Means of non-missing values in the windows of :code:`size`
+        periods starting at grid positions; NaN outside the covered range.
+        '''
+        lo = max(min(positions.min(), self.hi), self.lo)
+        hi = min(max(positions.max() + size, self.lo), self.hi)
+        values = self.values[lo:hi]
+        covered = (positions >= lo) & (positions + size <= hi)
+        means = np.full(positions.shape[0], np.nan)
+        if covered.any():
+            means[covered] = window_means(values, positions[covered] - lo,
+                                          size)
+        # windows partly outside the covered range
+        for i in np.nonzero(~covered & (positions < hi) &
+                            (positions + size > lo))[0]:
+            window = self.values[max(positions[i], lo):
+                                 min(positions[i] + size, hi)]
+            window = window[~np.isnan(window)]
+            if window.shape[0] > 0:
+                means[i] = window.mean()
+        return means
@@ -0,0 +1,290 @@
+import argparse
+import gzip
+import logging
+from multiprocessing import Pool
+import os
+import re
+
+from .cache import SqliteJSONStore
+from .clients import NOAAClient, parse_gsod_data, parse_isd_data
+from .noaa import GSODWeatherSource, ISDWeatherSource
+from .serialization import serialize_series
+
+logger = logging.getLogger(__name__)
+
+DATASETS = {
+    "isd": (NOAAClient.isd_filename_format, ISDWeatherSource,
+            parse_isd_data),
+    "gsod": (NOAAClient.gsod_filename_format, GSODWeatherSource,
+             parse_gsod_data),
+}
+
+
+def _find_files(mirror_directory, dataset, years=None, stations=None):
+    # (station, year, path) of the file a NOAAClient would have retrieved
+    # for each station-year found in the mirror.
+    filename_format, _, _ = DATASETS[dataset]
+    year_directory = os.path.join(
+        mirror_directory,
+        os.path.dirname(filename_format).lstrip("/").format(year=""))
+    filename_pattern = re.compile("^{}$".format(
+        re.escape(os.path.basename(filename_format))
+        .replace(re.escape("{station}"), "(?P<station>.+)")
+        .replace(re.escape("{year}"), "(?P<year>\\d{4})")
+    ))
+
+    # station file ids, in the order the client tries them, by station
+    station_ids = {}
+    for station, ids in NOAAClient()._load_station_index().items():
+        for rank, station_id in enumerate(ids):
+            station_ids[station_id] = (station, rank)
+
+    if not os.path.isdir(year_directory):
+        return []
+
+    found = {}
+    for year_name in sorted(os.listdir(year_directory)):
+        if not year_name.isdigit():
+            continue
+        year = int(year_name)
+        if years is not None and year not in years:
+            continue
+
+        directory = os.path.join(year_directory, year_name)
+        for filename in os.listdir(directory):
+            match = filename_pattern.match(filename)
+            if match is None or int(match.group("year")) != year:
+                continue
+            station, rank = station_ids.get(match.group("station"),
+                                            (None, None))
+            if station is None:
+                continue
+            if stations is not None and station not in stations:
+                continue
+            key = (station, year)
+            if key not in found or rank < found[key][0]:
+                found[key] = (rank, os.path.join(directory, filename))
+
+    return [
+        (station, year, path)
+        for (station, year), (_, path) in sorted(found.items())
+    ]
+
+
+def _parse_file(task):
+    # parses a mirrored data file in a worker process; returns the cache key
+    # and cache blob, or None and the error if the file can't be parsed
+    # (e.g., if it is truncated), so that one bad file doesn't stop the
+    # import.
+    dataset, station, year, path = task
+    _, weather_source_class, parse = DATASETS[dataset]
+    try:
+        with gzip.open(path, "rb") as f:
+            lines = f.readlines()
+        series = parse(lines, year)
+        data = serialize_series(series, weather_source_class.freq)
+    except Exception as e:
+        return None, "{}: {}".format(type(e).__name__, e)
+    key = weather_source_class.cache_key_format.format(station, year)
+    return key, data
+
+
+def import_noaa_mirror(mirror_directory, cache_directory=None,
+                       datasets=("isd", "gsod"), years=None, stations=None,
+                       n_processes=None, batch_size=100, overwrite=False):
+    ''' Import station-years from a local mirror of the NOAA FTP site into
+    the weather cache, so that :code:`ISDWeatherSource` and
+    :code:`GSODWeatherSource` can load them without network access.
+
+    The mirror must use the layout of the FTP site
+    (:code:`pub/data/noaa/{year}/{station}-{year}.gz` for ISD,
+    :code:`pub/data/gsod/{year}/{station}-{year}.op.gz` for GSOD). Where a
+    station has several files for a year, the one the weather sources would
+    have fetched is imported. Files are parsed in parallel worker processes
+    and saved in one transaction per batch. Files which can't be parsed,
+    e.g., because they are truncated, are logged and skipped.
+
+    Imported data is cached like fetched data, so with the default
+    :code:`MaxAgePolicy` the weather sources refetch recent years from the
+    network once they are older than its :code:`max_age`. To use the
+    imported data offline, create weather sources with
+    :code:`NeverRefreshPolicy`:
+
+    .. code-block:: python
+
+        >>> from eemeter.weather import ISDWeatherSource
+        >>> from eemeter.weather.freshness import NeverRefreshPolicy
+        >>> ws = ISDWeatherSource("722880",
+        ...                       freshness_policy=NeverRefreshPolicy())
+
+    Basic usage is as follows:
+
+    .. code-block:: python
+
+        >>> from eemeter.weather.importer import import_noaa_mirror
+        >>> import_noaa_mirror("/mnt/noaa", years=range(2010, 2017))
+
+    or, from the command line:
+
+    .. code-block:: bash
+
+        $ eemeter-import-noaa /mnt/noaa --years 2010-2016
+
+    Parameters
+    ----------
+    mirror_directory : str
+        Root directory of the mirror, containing :code:`pub/data`.
+    cache_directory : str, default None
+        Weather cache directory (see :code:`SqliteJSONStore`).
+    datasets : list of str, default ("isd", "gsod")
+        Datasets to import.
+    years : list of int, default None
+        Years to import; all years found if :code:`None`.
+    stations : list of str, default None
+        USAF station identifiers to import; all stations found if
+        :code:`None`.
+    n_processes : int, default None
+        Number of worker processes; defaults to the number of CPUs. If 1,
+        files are parsed in this process.
+    batch_size : int, default 100
+        Number of station-years saved per transaction.
+    overwrite : bool, default False
+        If :code:`True`, replaces station-years that are already cached.
+
+    Returns
+    -------
+    n_imported : dict
+        Number of station-years imported, by dataset.
+    n_failed : dict
+        Number of station-years skipped because their files couldn't be
+        parsed, by dataset.
+    '''
+    json_store = SqliteJSONStore(cache_directory)
+    if years is not None:
+        years = set(int(year) for year in years)
+    if stations is not None:
+        stations = set(stations)
+
+    tasks = []
+    for dataset in datasets:
+        weather_source_class = DATASETS[dataset][1]
+        for station, year, path in _find_files(mirror_directory, dataset,
+                                               years, stations):
+            key = weather_source_class.cache_key_format.format(station, year)
+            json_key = weather_source_class.json_cache_key_format.format(
+                station, year)
+            if not overwrite and (json_store.key_exists(key) or
+                                  json_store.key_exists(json_key)):
+                continue
+            tasks.append((dataset, station, year, path))
+
+    logger.info(
+        "Importing {} station-years from {} into {}."
+        .format(len(tasks), mirror_directory, json_store)
+    )
+
+    n_imported = dict((dataset, 0) for dataset in datasets)
+    n_failed = dict((dataset, 0) for dataset in datasets)
+    if len(tasks) == 0:
+        return n_imported, n_failed
+
+    if n_processes == 1:
+        pool = None
+        results = map(_parse_file, tasks)
+    else:
+        pool = Pool(n_processes)
+        results = pool.imap(_parse_file, tasks, chunksize=4)
+
+    try:
+        batch = []
+        for task, (key, data) in zip(tasks, results):
+            if key is None:
+                logger.warning(
+                    "Skipped {}, which could not be parsed ({})."
+                    .format(task[3], data)
+                )
+                n_failed[task[0]] += 1
+                continue
+            batch.append((key, data))
+            n_imported[task[0]] += 1
+            if len(batch) >= batch_size:
+                json_store.save_blobs(batch)
+                batch = []
+        if batch:
+            json_store.save_blobs(batch)
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+
+    logger.info(
+        "Imported {} station-years from {} ({} failed)."
+        .format(sum(n_imported.values()), mirror_directory,
+                sum(n_failed.values()))
+    )
+    return n_imported, n_failed
+
+
+def _parse_years(value):
+    years = []
+    for part in value.split(","):
+        start, _, end = part.partition("-")
+        years.extend(range(int(start), int(end or start) + 1))
+    return years
+
+
+def main(argv=None):
+    ''' Command line entry point for :code:`import_noaa_mirror`. '''
+    parser = argparse.ArgumentParser(
+        description=(
+            "Import a local mirror of the NOAA ISD and GSOD FTP directories"
+            " into the eemeter weather cache."
+        )
+    )
+    parser.add_argument(
+        "mirror_directory",
+        help="Root directory of the mirror, containing pub/data.")
+    parser.add_argument(
+        "--cache-directory", default=None,
+        help=(
+            "Weather cache directory (default: "
+            "$EEMETER_WEATHER_CACHE_DIRECTORY or ~/.eemeter/cache)."
+        ))
+    parser.add_argument(
+        "--dataset", action="append", choices=sorted(DATASETS),
+        help="Dataset to import; may be repeated (default: all).")
+    parser.add_argument(
+        "--years", type=_parse_years, default=None,
+        help="Years to import, e.g. 2010-2016 or 2012,2014 (default: all).")
+    parser.add_argument(
+        "--station", action="append", dest="stations",
+        help="USAF station to import; may be repeated (default: all).")
+    parser.add_argument(
+        "--processes", type=int, default=None,
+        help="Number of worker processes (default: number of CPUs).")
+    parser.add_argument(
+        "--batch-size", type=int, default=100,
+        help="Station-years saved per transaction (default: 100).")
+    parser.add_argument(
+        "--overwrite", action="store_true",
+        help="Replace station-years that are already cached.")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    n_imported, n_failed = import_noaa_mirror(
+        args.mirror_directory,
+        cache_directory=args.cache_directory,
+        datasets=args.dataset or sorted(DATASETS),
+        years=args.years,
+        stations=args.stations,
+        n_processes=args.processes,
+        batch_size=args.batch_size,
+        overwrite=args.overwrite,
+    )
+    for dataset, n in sorted(n_imported.items()):
+        print("{}: imported {} station-years, {} failed"
+              .format(dataset, n, n_failed[dataset]))
+
+
+if __name__ == "__main__":
+    main()
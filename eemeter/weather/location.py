@@ -1,21 +1,21 @@
-import json
 import numpy as np
-from pkg_resources import resource_stream
+import pandas as pd
 
+from .resource_pack import load_resource
 
-resources = {}
+EARTH_RADIUS_KM = 6371
+
+# candidate points re-ranked by exact distance in batch nearest queries
+N_BATCH_CANDIDATES = 4
 
 
-def _get_json_resource(filename):
-    with resource_stream('eemeter.resources', filename) as f:
-        resource = json.loads(f.read().decode('utf-8'))
-    return resource
+resources = {}
 
 
 def _load_resource(name, filename):
     global resources
     if resources.get(name, None) is None:
-        resources[name] = _get_json_resource(filename)
+        resources[name] = load_resource(filename)
     return resources[name]
 
 
@@ -132,10 +132,196 @@ def haversine(lat1, lng1, lat2, lng2):
     dlat = lat2 - lat1
     a = np.sin(dlat/2)**2 + np.cos(lat1) * np.cos(lat2) * np.sin(dlng/2)**2
     c = 2 * np.arcsin(np.sqrt(a))
-    r = 6371  # Radius of earth in kilometers. Use 3959 for miles
+    r = EARTH_RADIUS_KM  # Use 3959 for miles
     return c * r
 
 
+def _unit_vectors(lats, lngs):
+    # points on the unit sphere; the straight-line (chord) distance between
+    # them increases with their great circle distance.
+    lats, lngs = np.radians(lats), np.radians(lngs)
+    return np.stack([np.cos(lats) * np.cos(lngs),
+                     np.cos(lats) * np.sin(lngs),
+                     np.sin(lats)], axis=-1)
+
+
+class SpatialIndex(object):
+    """Index of named points on the earth's surface for nearest-neighbor
+    and radius queries. Points are stored as unit vectors in a k-d tree;
+    exact (haversine) distances are computed only for candidate results.
+
+    Basic usage is as follows:
+
+    .. code-block:: python
+
+        >>> from eemeter.weather.location import get_usaf_station_index
+        >>> index = get_usaf_station_index()
+        >>> index.nearest(38.5, -122.4, k=2)  # [(station, km), ...]
+        >>> index.within(38.5, -122.4, 50)
+        >>> stations, distances = index.nearest_many(lats, lngs)
+
+    Parameters
+    ----------
+    lat_lng_index : dict or eemeter.weather.resource_pack.PackedMapping
+        Latitude and longitude coordinates by name. Where points are
+        equally distant, the one listed first is nearest.
+    """
+
+    def __init__(self, lat_lng_index):
+        from scipy.spatial import cKDTree
+
+        if hasattr(lat_lng_index, 'value_array'):  # packed; skip decoding
+            self.keys = list(lat_lng_index)
+            lat_lngs = lat_lng_index.value_array()
+        else:
+            items = list(lat_lng_index.items())
+            self.keys = [key for key, _ in items]
+            lat_lngs = [lat_lng for _, lat_lng in items]
+        self._key_array = np.empty(len(self.keys), dtype=object)
+        self._key_array[:] = self.keys
+        lat_lngs = np.array(lat_lngs, dtype=float).reshape(-1, 2)
+        self.lats, self.lngs = lat_lngs[:, 0], lat_lngs[:, 1]
+        self.tree = cKDTree(_unit_vectors(self.lats, self.lngs))
+
+    def __repr__(self):
+        return 'SpatialIndex(n={})'.format(len(self))
+
+    def __len__(self):
+        return len(self.keys)
+
+    def _candidates(self, lat, lng, chord):
+        # points within a chord distance, allowing for rounding error.
+        return self.tree.query_ball_point(
+            _unit_vectors(lat, lng), chord * (1 + 1e-9) + 1e-12)
+
+    def _by_distance(self, lat, lng, positions):
+        positions = np.sort(np.asarray(positions, dtype=int))
+        distances = haversine(lat, lng, self.lats[positions],
+                              self.lngs[positions])
+        order = np.argsort(distances, kind='mergesort')  # ties by position
+        return [(self.keys[positions[i]], float(distances[i]))
+                for i in order]
+
+    def nearest(self, lat, lng, k=1):
+        """Return the :code:`k` points nearest to a latitude and longitude.
+
+        Parameters
+        ----------
+        lat : float
+            Latitude coordinate.
+        lng : float
+            Longitude coordinate.
+        k : int, default 1
+            Number of points.
+
+        Returns
+        -------
+        nearest : list of (str, float) tuples
+            Names of the nearest points and their distances in kilometers,
+            nearest first.
+        """
+        k = min(k, len(self))
+        if k < 1:
+            return []
+        chords, _ = self.tree.query(_unit_vectors(lat, lng), k)
+        candidates = self._candidates(lat, lng, np.max(chords))
+        return self._by_distance(lat, lng, candidates)[:k]
+
+    def nearest_many(self, lats, lngs):
+        """Return the point nearest to each of an array of latitudes and
+        longitudes in a single vectorized pass.
+
+        Parameters
+        ----------
+        lats : array-like of float
+            Latitude coordinates. Missing values may be None or NaN.
+        lngs : array-like of float
+            Longitude coordinates. Missing values may be None or NaN.
+
+        Returns
+        -------
+        keys : numpy.ndarray of object
+            Name of the nearest point to each coordinate, or None where the
+            coordinate is missing.
+        distances : numpy.ndarray of float
+            Distance in kilometers to each nearest point, or NaN where the
+            coordinate is missing.
+        """
+        lats = np.asarray(lats, dtype=float).ravel()
+        lngs = np.asarray(lngs, dtype=float).ravel()
+        keys = np.full(lats.shape, None, dtype=object)
+        distances = np.full(lats.shape, np.nan)
+        valid = np.isfinite(lats) & np.isfinite(lngs)
+        if len(self) == 0 or not valid.any():
+            return keys, distances
+
+        lats, lngs = lats[valid], lngs[valid]
+        k = min(N_BATCH_CANDIDATES, len(self))
+        _, positions = self.tree.query(_unit_vectors(lats, lngs), k)
+        positions = positions.reshape(-1, k)
+        candidates = haversine(lats[:, np.newaxis], lngs[:, np.newaxis],
+                               self.lats[positions], self.lngs[positions])
+        best = np.lexsort((positions, candidates))[:, 0]  # ties by position
+        rows = np.arange(len(positions))
+        keys[valid] = self._key_array[positions[rows, best]]
+        distances[valid] = candidates[rows, best]
+        return keys, distances
+
+    def within(self, lat, lng, radius):
+        """Return the points within a distance of a latitude and longitude.
+
+        Parameters
+        ----------
+        lat : float
+            Latitude coordinate.
+        lng : float
+            Longitude coordinate.
+        radius : float
+            Distance in kilometers.
+
+        Returns
+        -------
+        within : list of (str, float) tuples
+            Names of the points and their distances in kilometers, nearest
+            first.
+        """
+        angle = min(max(radius, 0) / EARTH_RADIUS_KM, np.pi)
+        candidates = self._candidates(lat, lng, 2 * np.sin(angle / 2))
+        return [(key, distance) for key, distance
+                in self._by_distance(lat, lng, candidates)
+                if distance <= radius]
+
+
+def _load_spatial_index(name, load_lat_lng_index):
+    if resources.get(name, None) is None:
+        resources[name] = SpatialIndex(load_lat_lng_index())
+    return resources[name]
+
+
+def get_usaf_station_index():
+    """Return the :code:`SpatialIndex` of USAF station locations, which is
+    built once per process.
+    """
+    return _load_spatial_index('usaf_station_spatial_index',
+                               _load_usaf_station_to_lat_lng_index)
+
+
+def get_tmy3_station_index():
+    """Return the :code:`SpatialIndex` of TMY3 station locations, which is
+    built once per process.
+    """
+    return _load_spatial_index('tmy3_station_spatial_index',
+                               _load_tmy3_station_to_lat_lng_index)
+
+
+def get_zipcode_index():
+    """Return the :code:`SpatialIndex` of ZIP code centroids, which is built
+    once per process.
+    """
+    return _load_spatial_index('zipcode_spatial_index',
+                               _load_zipcode_to_lat_lng_index)
+
+
 def lat_lng_to_usaf_station(lat, lng):
     """Return the closest USAF station ID using latitude and
     longitude coordinates.
@@ -155,11 +341,7 @@ def lat_lng_to_usaf_station(lat, lng):
     """
     if lat is None or lng is None:
         return None
-    usaf_station_to_lat_lng_index = _load_usaf_station_to_lat_lng_index()
-    index_list = list(usaf_station_to_lat_lng_index.items())
-    dists = [haversine(lat, lng, stat_lat, stat_lng)
-             for _, (stat_lat, stat_lng) in index_list]
-    return index_list[np.argmin(dists)][0]
+    return get_usaf_station_index().nearest(lat, lng)[0][0]
 
 
 def lat_lng_to_tmy3_station(lat, lng):
@@ -181,11 +363,7 @@ def lat_lng_to_tmy3_station(lat, lng):
     """
     if lat is None or lng is None:
         return None
-    tmy3_station_to_lat_lng_index = _load_tmy3_station_to_lat_lng_index()
-    index_list = list(tmy3_station_to_lat_lng_index.items())
-    dists = [haversine(lat, lng, stat_lat, stat_lng)
-             for _, (stat_lat, stat_lng) in index_list]
-    return index_list[np.argmin(dists)][0]
+    return get_tmy3_station_index().nearest(lat, lng)[0][0]
 
 
 def lat_lng_to_zipcode(lat, lng):
@@ -208,11 +386,7 @@ def lat_lng_to_zipcode(lat, lng):
 
     if lat is None or lng is None:
         return None
-    zipcode_to_lat_lng_index = _load_zipcode_to_lat_lng_index()
-    index_list = list(zipcode_to_lat_lng_index.items())
-    dists = [haversine(lat, lng, zip_lat, zip_lng)
-             for _, (zip_lat, zip_lng) in index_list]
-    return index_list[np.argmin(dists)][0]
+    return get_zipcode_index().nearest(lat, lng)[0][0]
 
 
 def lat_lng_to_climate_zone(lat, lng):
@@ -237,6 +411,105 @@ def lat_lng_to_climate_zone(lat, lng):
     return zipcode_to_climate_zone_index.get(zipcode, None)
 
 
+def _like(values, template):
+    # batch results follow the index of a pandas input
+    if isinstance(template, pd.Series):
+        return pd.Series(values, index=template.index)
+    return values
+
+
+def _lookup_many(index, keys):
+    values = np.empty(len(keys), dtype=object)
+    values[:] = [index.get(key, None) for key in keys]
+    return _like(values, keys)
+
+
+def lat_lngs_to_usaf_stations(lats, lngs):
+    """Return the closest USAF station ID for each of an array of latitude
+    and longitude coordinates.
+
+    Parameters
+    ----------
+    lats : array-like of float
+        Latitude coordinates.
+    lngs : array-like of float
+        Longitude coordinates.
+
+    Returns
+    -------
+    stations : numpy.ndarray or pandas.Series of str, None
+        Strings representing USAF weather station IDs, None where a
+        coordinate is missing. A Series if :code:`lats` is a Series.
+    """
+    stations, _ = get_usaf_station_index().nearest_many(lats, lngs)
+    return _like(stations, lats)
+
+
+def lat_lngs_to_tmy3_stations(lats, lngs):
+    """Return the closest TMY3 station ID for each of an array of latitude
+    and longitude coordinates.
+
+    Parameters
+    ----------
+    lats : array-like of float
+        Latitude coordinates.
+    lngs : array-like of float
+        Longitude coordinates.
+
+    Returns
+    -------
+    stations : numpy.ndarray or pandas.Series of str, None
+        Strings representing TMY3 weather station IDs, None where a
+        coordinate is missing. A Series if :code:`lats` is a Series.
+    """
+    stations, _ = get_tmy3_station_index().nearest_many(lats, lngs)
+    return _like(stations, lats)
+
+
+def lat_lngs_to_zipcodes(lats, lngs):
+    """Return the closest ZIP code for each of an array of latitude and
+    longitude coordinates.
+
+    Parameters
+    ----------
+    lats : array-like of float
+        Latitude coordinates.
+    lngs : array-like of float
+        Longitude coordinates.
+
+    Returns
+    -------
+    zipcodes : numpy.ndarray or pandas.Series of str, None
+        Strings representing USPS ZIP codes, None where a coordinate is
+        missing. A Series if :code:`lats` is a Series.
+    """
+    zipcodes, _ = get_zipcode_index().nearest_many(lats, lngs)
+    return _like(zipcodes, lats)
+
+
+def lat_lngs_to_climate_zones(lats, lngs):
+    """Return the climate zone of the closest ZIP code for each of an array
+    of latitude and longitude coordinates.
+
+    Parameters
+    ----------
+    lats : array-like of float
+        Latitude coordinates.
+    lngs : array-like of float
+        Longitude coordinates.
+
+    Returns
+    -------
+    climate_zones : numpy.ndarray or pandas.Series of str, None
+        Strings representing climate zones. A Series if :code:`lats` is a
+        Series.
+    """
+    zipcodes, _ = get_zipcode_index().nearest_many(lats, lngs)
+    climate_zones = _lookup_many(_load_zipcode_to_climate_zone_index(),
+                                 zipcodes)
+    return _like(climate_zones, lats)
+
+
 def usaf_station_to_lat_lng(station):
     """Return the latitude and longitude coordinates of the given USAF station.
 
@@ -416,6 +689,81 @@ def zipcode_to_climate_zone(zipcode):
     return _load_zipcode_to_climate_zone_index().get(zipcode, None)
 
 
+def zipcodes_to_lat_lngs(zipcodes):
+    """Return the latitude and longitude centroids of an array of ZIP codes.
+
+    Parameters
+    ----------
+    zipcodes : array-like of str
+        Strings representing USPS ZIP codes.
+
+    Returns
+    -------
+    lats : numpy.ndarray or pandas.Series of float
+        Latitude coordinates, NaN for unknown ZIP codes. A Series if
+        :code:`zipcodes` is a Series.
+    lngs : numpy.ndarray or pandas.Series of float
+        Longitude coordinates, NaN for unknown ZIP codes.
+    """
+    index = _load_zipcode_to_lat_lng_index()
+    lat_lngs = np.array([index.get(zipcode, (np.nan, np.nan))
+                         for zipcode in zipcodes], dtype=float).reshape(-1, 2)
+    return _like(lat_lngs[:, 0], zipcodes), _like(lat_lngs[:, 1], zipcodes)
+
+
+def zipcodes_to_usaf_stations(zipcodes):
+    """Return the nearest USAF station (by latitude and longitude centroid)
+    of each of an array of ZIP codes.
+
+    Parameters
+    ----------
+    zipcodes : array-like of str
+        Strings representing USPS ZIP codes.
+
+    Returns
+    -------
+    stations : numpy.ndarray or pandas.Series of str, None
+        Strings representing USAF weather station IDs, None for unknown ZIP
+        codes. A Series if :code:`zipcodes` is a Series.
+    """
+    return _lookup_many(_load_zipcode_to_usaf_station_index(), zipcodes)
+
+
+def zipcodes_to_tmy3_stations(zipcodes):
+    """Return the nearest TMY3 station (by latitude and longitude centroid)
+    of each of an array of ZIP codes.
+
+    Parameters
+    ----------
+    zipcodes : array-like of str
+        Strings representing USPS ZIP codes.
+
+    Returns
+    -------
+    stations : numpy.ndarray or pandas.Series of str, None
+        Strings representing TMY3 weather station IDs, None for unknown ZIP
+        codes. A Series if :code:`zipcodes` is a Series.
+    """
+    return _lookup_many(_load_zipcode_to_tmy3_station_index(), zipcodes)
+
+
+def zipcodes_to_climate_zones(zipcodes):
+    """Return the climate zone of each of an array of ZIP codes.
+
+    Parameters
+    ----------
+    zipcodes : array-like of str
+        Strings representing USPS ZIP codes.
+
+    Returns
+    -------
+    climate_zones : numpy.ndarray or pandas.Series of str, None
+        Strings representing climate zones, None for unknown ZIP codes. A
+        Series if :code:`zipcodes` is a Series.
+    """
+    return _lookup_many(_load_zipcode_to_climate_zone_index(), zipcodes)
+
+
 def climate_zone_to_zipcodes(climate_zone):
     """Return ZIP codes with centroids in the given climate zone.
 
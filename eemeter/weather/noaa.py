@@ -1,24 +1,40 @@
+from collections import deque
 from datetime import datetime, timedelta
 import logging
+from multiprocessing.pool import ThreadPool
+import struct
+import threading
 
 import pandas as pd
 
 from .base import WeatherSourceBase
 from .clients import NOAAClient
 from .cache import SqliteJSONStore
+from .degree_days import DegreeDayTable, temperature_fingerprint
+from .freshness import MaxAgePolicy
+from .grid import TemperatureGrid
+from .serialization import FREQS, deserialize_series, serialize_series
 
 logger = logging.getLogger(__name__)
 
+# Guards building and memoizing degree day tables of weather sources shared
+# between threads.
+_degree_day_table_lock = threading.Lock()
+
 
 class NOAAWeatherSourceBase(WeatherSourceBase):
 
     client = NOAAClient()
+    freshness_policy = MaxAgePolicy()
 
-    def __init__(self, station, cache_directory=None):
+    def __init__(self, station, cache_directory=None, freshness_policy=None):
         super(NOAAWeatherSourceBase, self).__init__(station)
 
         self.json_store = SqliteJSONStore(cache_directory)
         self.loaded_years = set()
+        self._refreshed = deque()  # (year, series) refreshed in background
+        if freshness_policy is not None:
+            self.freshness_policy = freshness_policy
         self._check_station(station)
         logger.info(
             "Created {} using cache: {}"
@@ -26,6 +42,30 @@ class NOAAWeatherSourceBase(WeatherSourceBase):
         )
         self._check_for_recent_data()
 
+    def __getstate__(self):
+        state = super(NOAAWeatherSourceBase, self).__getstate__()
+        state["_tempC"] = None  # a view of the grid
+        return state
+
+    @property
+    def tempC(self):
+        ''' Loaded temperatures (degC) on a regular UTC grid, as a series
+        backed by the preallocated grid (see
+        :code:`eemeter.weather.grid.TemperatureGrid`). '''
+        if self._tempC is None:
+            self._tempC = self._grid.series()
+        return self._tempC
+
+    @tempC.setter
+    def tempC(self, tempC):
+        self._grid = TemperatureGrid(self.freq)
+        self._grid.write(tempC)
+        self._invalidate_resampled()
+
+    def _invalidate_resampled(self):
+        super(NOAAWeatherSourceBase, self)._invalidate_resampled()
+        self._tempC = None
+
     def _check_station(self, station):
         index = self.client._load_station_index()
         if station not in index:
@@ -38,33 +78,30 @@ class NOAAWeatherSourceBase(WeatherSourceBase):
         target = datetime.now() - timedelta(days=days_ago)
         most_recent_fetch = self.json_store.retrieve_datetime(
             self._get_cache_key(target.year))
-        if most_recent_fetch is not None:
-
-            if target > most_recent_fetch:
-                logger.info(
-                    "{} will update {} data because the most recent fetch"
-                    " of that data occurred on {}, but the target date for"
-                    " getting recent data is {}."
-                    .format(self, target.year,
-                            most_recent_fetch.strftime("%Y-%m-%d"),
-                            target.strftime("%Y-%m-%d"))
-                )
-                self.add_year(target.year, force_fetch=True)
-            else:
-                logger.info(
-                    "{} will not update {} data because the most recent"
-                    " fetch of that data occurred on {}, which is more recent"
-                    " than the target date {}."
-                    .format(self, target.year,
-                            most_recent_fetch.strftime("%Y-%m-%d"),
-                            target.strftime("%Y-%m-%d"))
-                )
-        else:
+        if most_recent_fetch is None:
+            most_recent_fetch = self.json_store.retrieve_datetime(
+                self._get_json_cache_key(target.year))
+        if most_recent_fetch is None:
             logger.info(
                 "{self} will not update {year} data because {year} data is"
                 " not cached."
                 .format(self=self, year=target.year)
             )
+            return
+        self.freshness_policy.check(self, target.year, most_recent_fetch)
+
+    def _apply_refreshed(self):
+        # applies data refetched in the background (see
+        # eemeter.weather.freshness.BackgroundRefresher) on this thread.
+        while self._refreshed:
+            year, series = self._refreshed.popleft()
+            self.loaded_years.add(year)
+            self._grid.write(series)
+            self._invalidate_resampled()
+            logger.info(
+                "{} applied {} data refreshed in the background."
+                .format(self, year)
+            )
 
     def add_year_range(self, start_year, end_year, force_fetch=False):
         """Adds temperature data to internal pandas timeseries across a
@@ -88,6 +125,88 @@ class NOAAWeatherSourceBase(WeatherSourceBase):
         for year in range(start_year, end_year + 1):
             self.add_year(year, force_fetch)
 
+    @classmethod
+    def prefetch(cls, stations, years, cache_directory=None,
+                 force_fetch=False, n_threads=None):
+        """Fetches and caches data for many stations and years concurrently,
+        so that weather sources created later load it from the cache.
+
+        Basic usage is as follows:
+
+        .. code-block:: python
+
+            >>> ISDWeatherSource.prefetch(["722880", "725300"],
+            ...                           range(2010, 2016))
+
+        Downloads share the client's bounded pool of FTP connections (see
+        :code:`eemeter.weather.clients.FTPConnectionPool`); results are
+        cached from the calling thread as they arrive. Failed downloads are
+        logged and skipped.
+
+        Parameters
+        ----------
+        stations : list of str
+            Station identifiers.
+        years : list of {int, string}
+            Years for which data should be fetched.
+        cache_directory : str, default None
+            Cache directory, as for the weather source constructor.
+        force_fetch : bool, default=False
+            If :code:`True`, fetches even station-years that are already
+            cached.
+        n_threads : int, default None
+            Number of concurrent downloads. Defaults to the client's
+            :code:`max_connections`.
+
+        Returns
+        -------
+        fetched : list of (str, int) tuples
+            Station and year of each station-year fetched and cached.
+        """
+        weather_sources = [cls(station, cache_directory)
+                           for station in stations]
+        tasks = [
+            (weather_source, year)
+            for weather_source in weather_sources for year in years
+            if force_fetch or not weather_source._year_saved(year)
+        ]
+        if len(tasks) == 0:
+            return []
+
+        if n_threads is None:
+            n_threads = getattr(cls.client, "max_connections", 1)
+
+        def _fetch(task):
+            weather_source, year = task
+            try:
+                return weather_source, year, \
+                    weather_source._fetch_year(year), None
+            except Exception as e:
+                return weather_source, year, None, e
+
+        fetched = []
+        pool = ThreadPool(min(n_threads, len(tasks)))
+        try:
+            results = pool.imap_unordered(_fetch, tasks)
+            for weather_source, year, series, error in results:
+                if error is not None:
+                    logger.warn(
+                        "{} failed to prefetch {} data: {}"
+                        .format(weather_source, year, error)
+                    )
+                    continue
+                weather_source.save_series(year, series)
+                fetched.append((weather_source.station, year))
+        finally:
+            pool.close()
+            pool.join()
+
+        logger.info(
+            "{} prefetched {} of {} station-years."
+            .format(cls.__name__, len(fetched), len(tasks))
+        )
+        return fetched
+
     def add_year(self, year, force_fetch=False):
         """Adds temperature data to internal pandas timeseries
 
@@ -104,13 +223,15 @@ class NOAAWeatherSourceBase(WeatherSourceBase):
             If :code:`True`, forces the fetch; if :code:`False`, checks to see
             if locally available before actually fetching.
         """
+        self._apply_refreshed()
         is_loaded = year in self.loaded_years
         self.loaded_years.add(year)
         if is_loaded:
             if force_fetch:  # it's loaded, but fetch anyway
                 new_series = self._fetch_year(year)
                 self.save_series(year, new_series)
-                self.tempC.update(new_series)
+                self._grid.write(new_series)
+                self._invalidate_resampled()
                 logger.info(
                     "{} forced refetch of loaded {} data."
                     .format(self, year)
@@ -143,18 +264,24 @@ class NOAAWeatherSourceBase(WeatherSourceBase):
                         .format(self, year)
                     )
 
-            self.tempC = self._merge_series(self.tempC, new_series)
+            self._grid.write(new_series)
+            self._invalidate_resampled()
 
     def _get_cache_key(self, year):
         return self.cache_key_format.format(self.station, year)
 
+    def _get_json_cache_key(self, year):
+        # key of data cached as JSON by earlier versions; migrated on load.
+        return self.json_cache_key_format.format(self.station, year)
+
     def _fetch_year(self, year):
         # get year from remote source
         message = "The `_fetch_year()` method must be implemented."
         raise NotImplementedError(message)
 
     def _year_saved(self, year):
-        return self.json_store.key_exists(self._get_cache_key(year))
+        return self.json_store.key_exists(self._get_cache_key(year)) or \
+            self.json_store.key_exists(self._get_json_cache_key(year))
 
     def indexed_temperatures(self, index, unit, allow_mixed_frequency=False):
         ''' Return average temperatures over the given index.
@@ -176,6 +303,7 @@ class NOAAWeatherSourceBase(WeatherSourceBase):
         if index.shape == (0,):
             return pd.Series([], index=index, dtype=float)
 
+        self._apply_refreshed()
         self._verify_index_presence(index)
 
         if index.freq == 'D':
@@ -188,8 +316,116 @@ class NOAAWeatherSourceBase(WeatherSourceBase):
             message = 'DatetimeIndex with mixed frequency not supported.'
             raise ValueError(message)
 
+    def degree_day_table(self, base_temps=()):
+        ''' Cumulative degree day table of the loaded temperatures, shared
+        by every caller until temperatures change. It is joined from
+        tables of each year, which are stored in the cache next to that
+        year's temperatures, so that other processes (and later runs)
+        evaluating traces at this station load them instead of building
+        them again.
+
+        Parameters
+        ----------
+        base_temps : iterable of float, default ()
+            Base temperatures (degF) for which daily degree day sums should
+            be precomputed, in addition to
+            :code:`eemeter.weather.degree_days.DEFAULT_BASE_TEMPS`.
+
+        Returns
+        -------
+        table : eemeter.weather.degree_days.DegreeDayTable
+            Degree day table.
+        '''
+        self._apply_refreshed()
+        with _degree_day_table_lock:
+            views = self.__dict__.setdefault("_resampled_views", {})
+            table = views.get("degree_days")
+            if table is None:
+                table = views["degree_days"] = \
+                    self._build_degree_day_table()
+            for base_temp in base_temps:
+                table.add_base_temp(base_temp)
+        return table
+
+    def indexed_degree_days(self, index, cooling_base_temp,
+                            heating_base_temp):
+        ''' Return cooling and heating degree days of the mean temperature
+        of each period between consecutive timestamps of an index, as the
+        billing model computes them; see
+        :code:`eemeter.weather.degree_days.DegreeDayTable.period_degree_days`.
+        Years of the index not yet loaded are loaded first.
+
+        Parameters
+        ----------
+        index : pandas.DatetimeIndex
+            Period boundaries, e.g., billing period start dates followed by
+            the end date of the last period.
+        cooling_base_temp : float
+            Base temperature (degF) of cooling degree days.
+        heating_base_temp : float
+            Base temperature (degF) of heating degree days.
+
+        Returns
+        -------
+        degree_days : pandas.DataFrame
+            Columns :code:`"CDD"` and :code:`"HDD"`, indexed by period
+            start.
+        '''
+        if index.shape == (0,):
+            return pd.DataFrame({"CDD": [], "HDD": []}, index=index,
+                                columns=["CDD", "HDD"])
+
+        self._verify_index_presence(index)
+        return self.degree_day_table().period_degree_days(
+            index, cooling_base_temp, heating_base_temp)
+
+    def _build_degree_day_table(self):
+        # joined from a table of each year, so that adding a year only
+        # builds the table of that year, and processes which loaded
+        # different years share the tables of the years they have in common.
+        tempC = self.tempC
+        if tempC.shape[0] == 0:
+            return DegreeDayTable(tempC, self.freq)
+
+        years = list(range(tempC.index[0].year, tempC.index[-1].year + 1))
+        positions = [0] + [
+            tempC.index.searchsorted(
+                pd.Timestamp(datetime(year, 1, 1), tz="UTC"))
+            for year in years[1:]
+        ] + [tempC.shape[0]]
+        return DegreeDayTable.concatenate([
+            self._year_degree_day_table(year, tempC.iloc[lo:hi])
+            for year, lo, hi in zip(years, positions[:-1], positions[1:])
+        ])
+
+    def _year_degree_day_table(self, year, tempC):
+        # stored next to the cached temperatures of the year, and reused
+        # until they change.
+        key = self._get_cache_key("{}-degree-days".format(year))
+        fingerprint = temperature_fingerprint(tempC, self.freq)
+        data = self.json_store.retrieve_blob(key)
+        if data is not None:
+            try:
+                table = DegreeDayTable.deserialize(data)
+            except (ValueError, struct.error):
+                table = None
+            if table is not None and table.fingerprint == fingerprint:
+                return table
+
+        table = DegreeDayTable(tempC, self.freq)
+        self.json_store.save_blob(key, table.serialize())
+        return table
+
     def _daily_indexed_temperatures(self, index, unit):
-        tempC = self.tempC.resample('D').mean()[index]
+        positions = self._grid.positions(index)
+        if positions is None:  # not on the grid
+            tempC = self._resampled('D')[index]
+        elif self.freq == 'D':
+            tempC = pd.Series(self._grid.lookup(positions), index=index)
+        else:
+            size = FREQS['D'] // FREQS[self.freq]
+            tempC = pd.Series(self._grid.window_means(positions, size),
+                              index=index)
         return self._unit_convert(tempC, unit)
 
     def _hourly_indexed_temperatures(self, index, unit):
@@ -274,18 +510,16 @@ class NOAAWeatherSourceBase(WeatherSourceBase):
 
     def save_series(self, year, series):
         key = self._get_cache_key(year)
-        data = [
-            [
-                d.strftime(self.cache_date_format), t
-                if pd.notnull(t) else None
-            ]
-            for d, t in series.iteritems()
-        ]
-        self.json_store.save_json(key, data)
+        self.json_store.save_blob(key, serialize_series(series, self.freq))
 
     def load_series(self, year):
         key = self._get_cache_key(year)
-        data = self.json_store.retrieve_json(key)
+        data = self.json_store.retrieve_blob(key)
+        if data is not None:
+            return deserialize_series(data)
+
+        json_key = self._get_json_cache_key(year)
+        data = self.json_store.retrieve_json(json_key)
         if data is None:
             raise KeyError("Key `{}` not found in cache.".format(key))
 
@@ -293,12 +527,16 @@ class NOAAWeatherSourceBase(WeatherSourceBase):
                                format=self.cache_date_format, utc=True)
         values = [d[1] for d in data]
 
-        # changed for pandas > 0.18
-        return pd.Series(values, index=index, dtype=float) \
-            .sort_index().resample(self.freq).mean()
+        series = pd.Series(values, index=index, dtype=float)
 
-    def _merge_series(self, a, b):
-        return a.append(b).sort_index().resample(self.freq).mean()
+        # migrate to the binary format, keeping the original fetch time.
+        data = serialize_series(series, self.freq)
+        self.json_store.move_to_blob(json_key, key, data)
+        logger.info(
+            "{} migrated cached {} data from {} to {}."
+            .format(self, year, json_key, key)
+        )
+        return deserialize_series(data)
 
 
 class GSODWeatherSource(NOAAWeatherSourceBase):
@@ -342,7 +580,8 @@ class GSODWeatherSource(NOAAWeatherSourceBase):
     '''
 
     cache_date_format = "%Y%m%d"
-    cache_key_format = "GSOD-{}-{}.json"
+    cache_key_format = "GSOD-{}-{}.bin"
+    json_cache_key_format = "GSOD-{}-{}.json"
     year_existence_format = "{}-01-01"
     freq = "D"
 
@@ -405,7 +644,8 @@ class ISDWeatherSource(NOAAWeatherSourceBase):
     '''
 
     cache_date_format = "%Y%m%d%H"
-    cache_key_format = "ISD-{}-{}.json"
+    cache_key_format = "ISD-{}-{}.bin"
+    json_cache_key_format = "ISD-{}-{}.json"
     year_existence_format = "{}-01-01 00"
     freq = "H"
 
@@ -416,7 +656,11 @@ class ISDWeatherSource(NOAAWeatherSourceBase):
         return self.client.get_isd_data(self.station, year)
 
     def _hourly_indexed_temperatures(self, index, unit):
-        tempC = self.tempC.resample(self.freq).mean()[index]
+        positions = self._grid.positions(index)
+        if positions is None:  # not on the grid
+            tempC = self._resampled(self.freq)[index]
+        else:
+            tempC = pd.Series(self._grid.lookup(positions), index=index)
         return self._unit_convert(tempC, unit)
 
     def _get_min_acceptable_period(self):
@@ -0,0 +1,104 @@
+from collections import OrderedDict
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class WeatherSourceRegistry(object):
+    ''' Bounded registry of weather sources keyed by station, so that
+    each station's weather data is loaded once and shared by every project
+    that maps to it. Least recently used weather sources are evicted once
+    :code:`max_size` is reached.
+
+    Basic usage is as follows:
+
+    .. code-block:: python
+
+        >>> from eemeter.weather import ISDWeatherSource, WeatherSourceRegistry
+        >>> with WeatherSourceRegistry(max_size=500) as registry:
+        ...     ws1 = registry.get(ISDWeatherSource, "722880")
+        ...     ws2 = registry.get(ISDWeatherSource, "722880")
+        >>> ws1 is ws2
+        True
+
+    Weather sources are released when the :code:`with` block exits or
+    when :code:`.clear()` is called.
+
+    Parameters
+    ----------
+    max_size : int, default 256
+        Maximum number of weather sources to hold at once.
+    cache_directory : str, default None
+        Cache directory passed to weather sources created by this registry.
+    '''
+
+    def __init__(self, max_size=256, cache_directory=None):
+        self.max_size = max_size
+        self.cache_directory = cache_directory
+        self._weather_sources = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return (
+            'WeatherSourceRegistry(max_size={}, cache_directory={})'
+            .format(self.max_size, self.cache_directory)
+        )
+
+    def __len__(self):
+        return len(self._weather_sources)
+
+    def __contains__(self, key):
+        weather_source_class, station = key
+        return (weather_source_class.__name__, station) in \
+            self._weather_sources
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.clear()
+
+    def get(self, weather_source_class, station):
+        ''' Get the shared weather source for a station, creating it if
+        necessary.
+
+        Parameters
+        ----------
+        weather_source_class : type
+            Weather source class, e.g.,
+            :code:`eemeter.weather.ISDWeatherSource`. Must accept
+            :code:`(station, cache_directory)` as arguments.
+        station : str
+            Station identifier.
+
+        Returns
+        -------
+        weather_source : eemeter.weather.WeatherSourceBase
+            Weather source for the station.
+        '''
+        key = (weather_source_class.__name__, station)
+
+        # creation happens under the lock so that a station is never
+        # loaded twice by concurrent callers.
+        with self._lock:
+            weather_source = self._weather_sources.pop(key, None)
+            if weather_source is None:
+                weather_source = weather_source_class(
+                    station, self.cache_directory)
+                logger.info("{} created {}.".format(self, weather_source))
+
+            # (re)insert as most recently used
+            self._weather_sources[key] = weather_source
+
+            while len(self._weather_sources) > self.max_size:
+                _, evicted = self._weather_sources.popitem(last=False)
+                logger.info("{} evicted {}.".format(self, evicted))
+
+        return weather_source
+
+    def clear(self):
+        ''' Release all weather sources held by this registry.
+        '''
+        with self._lock:
+            self._weather_sources.clear()
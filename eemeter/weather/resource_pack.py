@@ -0,0 +1,427 @@
+import argparse
+import hashlib
+import json
+import logging
+import os
+import struct
+import threading
+
+try:
+    from collections.abc import Mapping, Set
+except ImportError:  # python 2
+    from collections import Mapping, Set
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Resource pack format, version 1. Little-endian:
+#
+#   header (32 bytes):
+#     magic        4s  b"EERP"
+#     version      B   1
+#     (padding)    3x
+#     toc_offset   q   byte offset of the table of contents
+#     toc_size     q   bytes in the table of contents
+#     (padding)    8x
+#   arrays, each starting on an 8 byte boundary.
+#   table of contents: UTF-8 JSON, {"tables": {name: table}}, where each
+#     table has its "kind", the "sha1" of its JSON source and the
+#     [offset, dtype, shape] of each of its "arrays":
+#       keys     sorted, null padded UTF-8 keys (all kinds).
+#       order    <i4 position in keys of each key, in source order (all).
+#       pool     sorted, distinct null padded UTF-8 values ("str"),
+#       values   and the <i4 position in pool of each key's value ("str"),
+#                or <f8 latitude and longitude pairs ("lat_lng"), aligned
+#                with keys.
+#       items    null padded UTF-8 list items, concatenated in key order,
+#       offsets  and the <i8 offsets of each key's items ("str_list").
+#     "set" tables only have keys and order.
+#
+PACK_MAGIC = b"EERP"
+PACK_VERSION = 1
+PACK_FILENAME = "resource_pack.bin"
+
+# packed JSON resources and the kind of table each is stored as.
+PACKED_RESOURCES = {
+    'GSOD-ISD_station_index.json': 'str_list',
+    'climate_zone_tmy3_stations.json': 'str_list',
+    'climate_zone_usaf_stations.json': 'str_list',
+    'climate_zone_zipcodes.json': 'str_list',
+    'supported_climate_zones.json': 'set',
+    'supported_tmy3_stations.json': 'set',
+    'supported_usaf_stations.json': 'set',
+    'supported_zipcodes.json': 'set',
+    'tmy3_station_climate_zone.json': 'str',
+    'tmy3_station_lat_lngs.json': 'lat_lng',
+    'tmy3_station_zipcodes.json': 'str_list',
+    'usaf_station_climate_zone.json': 'str',
+    'usaf_station_lat_lngs.json': 'lat_lng',
+    'usaf_station_zipcodes.json': 'str_list',
+    'zipcode_centroid_lat_lngs.json': 'lat_lng',
+    'zipcode_climate_zone.json': 'str',
+    'zipcode_tmy3_station.json': 'str',
+    'zipcode_usaf_station.json': 'str',
+}
+
+_header = struct.Struct("<4sB3xqq8x")
+
+_pack = None
+_pack_loaded = False
+_pack_lock = threading.Lock()
+
+
+def _resource_directory():
+    # found without pkg_resources, which is slow to import. Zipped installs
+    # have no pack file to memory-map, so they fall back to JSON.
+    import eemeter.resources
+    return os.path.dirname(os.path.abspath(eemeter.resources.__file__))
+
+
+def _encode(value):
+    return value.encode('utf-8')
+
+
+def _decode(value):
+    return value.decode('utf-8')
+
+
+class _PackWriter(object):
+    # Writes arrays with the standard library only, so the pack can be built
+    # without the scientific stack installed.
+
+    def __init__(self, f):
+        self.f = f
+
+    def _write(self, data, dtype, shape):
+        self.f.write(b"\x00" * (-self.f.tell() % 8))
+        offset = self.f.tell()
+        self.f.write(data)
+        return [offset, dtype, list(shape)]
+
+    def strings(self, values):
+        values = [_encode(v) for v in values]
+        width = max([len(v) for v in values] + [1])
+        data = b"".join(v.ljust(width, b"\x00") for v in values)
+        return self._write(data, "S{}".format(width), [len(values)])
+
+    def ints(self, values, code, dtype):
+        data = struct.pack("<{}{}".format(len(values), code), *values)
+        return self._write(data, dtype, [len(values)])
+
+    def floats(self, values, shape):
+        data = struct.pack("<{}d".format(len(values)), *values)
+        return self._write(data, "<f8", shape)
+
+
+def _write_table(writer, kind, resource):
+    if kind == 'set':
+        source_keys = list(dict.fromkeys(resource))
+    else:
+        source_keys = list(resource)
+    keys = sorted(source_keys, key=_encode)
+    positions = dict((key, i) for i, key in enumerate(keys))
+
+    arrays = {
+        'keys': writer.strings(keys),
+        'order': writer.ints([positions[key] for key in source_keys],
+                             "i", "<i4"),
+    }
+    if kind == 'str':
+        pool = sorted(set(resource.values()), key=_encode)
+        pool_positions = dict((value, i) for i, value in enumerate(pool))
+        arrays['pool'] = writer.strings(pool)
+        arrays['values'] = writer.ints(
+            [pool_positions[resource[key]] for key in keys], "i", "<i4")
+    elif kind == 'lat_lng':
+        arrays['values'] = writer.floats(
+            [float(x) for key in keys for x in resource[key]],
+            [len(keys), 2])
+    elif kind == 'str_list':
+        items, offsets = [], [0]
+        for key in keys:
+            items.extend(resource[key])
+            offsets.append(len(items))
+        arrays['items'] = writer.strings(items)
+        arrays['offsets'] = writer.ints(offsets, "q", "<i8")
+    elif kind != 'set':
+        raise ValueError('Unknown resource table kind "{}".'.format(kind))
+    return arrays
+
+
+def build_resource_pack(path=None, resource_directory=None):
+    ''' Build the resource pack from the JSON resources it replaces. Run
+    this (or :code:`eemeter-build-resource-pack`) after changing any of
+    them.
+
+    Parameters
+    ----------
+    path : str, default None
+        Pack filename; defaults to :code:`resource_pack.bin` in the
+        resource directory.
+    resource_directory : str, default None
+        Directory of the JSON resources; defaults to
+        :code:`eemeter/resources`.
+
+    Returns
+    -------
+    path : str
+        Pack filename.
+    '''
+    if resource_directory is None:
+        resource_directory = _resource_directory()
+    if path is None:
+        path = os.path.join(resource_directory, PACK_FILENAME)
+
+    tmp_path = "{}.{}.tmp".format(path, os.getpid())
+    tables = {}
+    with open(tmp_path, "wb") as f:
+        f.write(b"\x00" * _header.size)
+        writer = _PackWriter(f)
+
+        for filename, kind in sorted(PACKED_RESOURCES.items()):
+            with open(os.path.join(resource_directory, filename), "rb") as g:
+                data = g.read()
+            resource = json.loads(data.decode('utf-8'))
+            tables[filename] = {
+                'kind': kind,
+                'sha1': hashlib.sha1(data).hexdigest(),
+                'arrays': _write_table(writer, kind, resource),
+            }
+
+        toc = json.dumps({'tables': tables}, sort_keys=True).encode('utf-8')
+        toc_offset = f.tell()
+        f.write(toc)
+        f.seek(0)
+        f.write(_header.pack(PACK_MAGIC, PACK_VERSION, toc_offset, len(toc)))
+
+    os.rename(tmp_path, path)
+    logger.info("Wrote resource pack {} ({} tables)."
+                .format(path, len(tables)))
+    return path
+
+
+class _PackedTable(object):
+
+    def __init__(self, pack, name):
+        self.pack = pack
+        self.name = name
+        self.kind = pack.tables[name]['kind']
+        arrays = pack.tables[name]['arrays']
+        self._keys = pack._array(arrays['keys'])
+        self._order = pack._array(arrays['order'])
+
+    def __repr__(self):
+        return '{}("{}")'.format(self.__class__.__name__, self.name)
+
+    def __reduce__(self):
+        # reopen (and share the page cache) instead of copying the data.
+        return (_load_packed_table, (self.pack.path, self.name))
+
+    def __len__(self):
+        return self._keys.shape[0]
+
+    def __iter__(self):
+        for i in self._order:
+            yield _decode(self._keys[i])
+
+    def __contains__(self, key):
+        return self._find(key) is not None
+
+    def _find(self, key):
+        try:
+            key = _encode(key)
+        except AttributeError:
+            return None
+        if len(key) > self._keys.dtype.itemsize:
+            return None
+        i = int(np.searchsorted(self._keys, key))
+        if i < self._keys.shape[0] and self._keys[i] == key:
+            return i
+        return None
+
+
+class PackedSet(_PackedTable, Set):
+    ''' Read-only set of strings backed by a memory-mapped resource pack
+    table; membership is a binary search over the sorted keys. Iterates in
+    the order of the JSON source.
+    '''
+
+
+class PackedMapping(_PackedTable, Mapping):
+    ''' Read-only mapping of strings to strings, latitude and longitude
+    pairs or lists of strings, backed by a memory-mapped resource pack
+    table. Values are decoded from the pack on access, just as the JSON
+    source would have held them. Iterates in the order of the JSON source.
+    '''
+
+    def __init__(self, pack, name):
+        super(PackedMapping, self).__init__(pack, name)
+        arrays = pack.tables[name]['arrays']
+        if self.kind == 'str_list':
+            self._items = pack._array(arrays['items'])
+            self._offsets = pack._array(arrays['offsets'])
+        else:
+            self._values = pack._array(arrays['values'])
+        if self.kind == 'str':
+            self._pool = pack._array(arrays['pool'])
+
+    def __getitem__(self, key):
+        i = self._find(key)
+        if i is None:
+            raise KeyError(key)
+        if self.kind == 'str':
+            return _decode(self._pool[self._values[i]])
+        elif self.kind == 'lat_lng':
+            return [float(x) for x in self._values[i]]
+        return [_decode(item) for item
+                in self._items[self._offsets[i]:self._offsets[i + 1]]]
+
+    def value_array(self):
+        ''' Values of a :code:`lat_lng` table as an (n, 2) float array of
+        latitudes and longitudes, in iteration order.
+        '''
+        if self.kind != 'lat_lng':
+            message = 'Table "{}" is not a lat_lng table.'.format(self.name)
+            raise ValueError(message)
+        return self._values[self._order]
+
+
+class ResourcePack(object):
+    ''' Read-only, memory-mapped pack of the location and station index
+    resources, as written by :code:`build_resource_pack`. Tables are
+    views into a single :code:`numpy.memmap`, so opening the pack parses
+    only its small table of contents and all processes share the operating
+    system's page cache instead of each holding parsed JSON.
+
+    Parameters
+    ----------
+    path : str
+        Pack filename.
+    '''
+
+    def __init__(self, path):
+        self.path = path
+
+        with open(path, "rb") as f:
+            header = f.read(_header.size)
+            if len(header) < _header.size:
+                raise ValueError("Not a resource pack: {}".format(path))
+            magic, version, toc_offset, toc_size = _header.unpack(header)
+            if magic != PACK_MAGIC or version != PACK_VERSION:
+                raise ValueError("Not a resource pack: {}".format(path))
+            f.seek(toc_offset)
+            self.tables = json.loads(f.read(toc_size).decode('utf-8'))[
+                'tables']
+
+        self.data = np.memmap(path, dtype=np.uint8, mode="r")
+        self._loaded = {}
+
+    def __repr__(self):
+        return 'ResourcePack("{}")'.format(self.path)
+
+    def __contains__(self, name):
+        return name in self.tables
+
+    def _array(self, spec):
+        offset, dtype, shape = spec
+        dtype = np.dtype(dtype)
+        count = int(np.prod(shape))
+        return np.frombuffer(self.data, dtype=dtype, count=count,
+                             offset=offset).reshape(shape)
+
+    def table(self, name):
+        ''' Table of a packed JSON resource.
+
+        Parameters
+        ----------
+        name : str
+            Filename of the JSON resource, e.g.
+            :code:`"zipcode_usaf_station.json"`.
+
+        Returns
+        -------
+        table : eemeter.weather.resource_pack.PackedMapping or PackedSet
+            :code:`PackedSet` for JSON lists, otherwise
+            :code:`PackedMapping`.
+        '''
+        if name not in self._loaded:
+            if self.tables[name]['kind'] == 'set':
+                self._loaded[name] = PackedSet(self, name)
+            else:
+                self._loaded[name] = PackedMapping(self, name)
+        return self._loaded[name]
+
+
+def get_resource_pack():
+    ''' Return the resource pack shipped with eemeter, which is opened once
+    per process, or None if it is missing or unreadable.
+    '''
+    global _pack, _pack_loaded
+    with _pack_lock:
+        if not _pack_loaded:
+            _pack_loaded = True
+            try:
+                _pack = ResourcePack(
+                    os.path.join(_resource_directory(), PACK_FILENAME))
+            except (IOError, OSError, ValueError) as e:
+                logger.warn("Resource pack not loaded, using JSON: %s", e)
+    return _pack
+
+
+def _load_packed_table(path, name):
+    pack = get_resource_pack()
+    if pack is None or os.path.abspath(pack.path) != os.path.abspath(path):
+        pack = ResourcePack(path)
+    return pack.table(name)
+
+
+def load_resource(filename):
+    ''' Load a location or station index resource, from the resource pack
+    if it holds the resource and otherwise from its JSON file.
+
+    Parameters
+    ----------
+    filename : str
+        Filename of the JSON resource in :code:`eemeter/resources`.
+
+    Returns
+    -------
+    resource : mapping or set
+        Dict-like resources are mappings; list resources are sets.
+    '''
+    pack = get_resource_pack()
+    if pack is not None and filename in pack:
+        return pack.table(filename)
+
+    from pkg_resources import resource_stream
+
+    with resource_stream('eemeter.resources', filename) as f:
+        resource = json.loads(f.read().decode('utf-8'))
+    if PACKED_RESOURCES.get(filename) == 'set':
+        resource = set(resource)
+    return resource
+
+
+def main(argv=None):
+    ''' Command line entry point for :code:`build_resource_pack`. '''
+    parser = argparse.ArgumentParser(
+        description=(
+            "Rebuild the eemeter resource pack from its JSON resources."
+        )
+    )
+    parser.add_argument(
+        "--output", default=None,
+        help="Pack filename (default: eemeter/resources/{})."
+        .format(PACK_FILENAME))
+    parser.add_argument(
+        "--resource-directory", default=None,
+        help="Directory of the JSON resources (default: eemeter/resources).")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    build_resource_pack(args.output, args.resource_directory)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+import struct
+
+import numpy as np
+import pandas as pd
+
+# Binary temperature series format, version 1. Little-endian:
+#
+#   magic     4s   b"EETS"
+#   version   B    1
+#   freq      1s   b"H" (hourly) or b"D" (daily)
+#   start     q    first timestamp, seconds since 1970-01-01 00:00 UTC
+#   count     I    number of values
+#   values    <f4  count float32 values on the grid; missing values are NaN
+#
+MAGIC = b"EETS"
+VERSION = 1
+FREQS = {"H": 3600, "D": 86400}
+
+_header = struct.Struct("<4sB1sqI")
+
+
+def serialize_series(series, freq):
+    ''' Serialize a temperature series as a compact binary blob holding a
+    fixed grid of float32 values. The series is first resampled to
+    :code:`freq`, exactly as cached series always have been on load.
+
+    Parameters
+    ----------
+    series : pandas.Series
+        Temperature series with a timezone-aware UTC
+        :code:`DatetimeIndex`.
+    freq : str, {"H", "D"}
+        Grid frequency.
+
+    Returns
+    -------
+    data : bytes
+        Serialized series.
+    '''
+    if freq not in FREQS:
+        message = 'Frequency "{}" not supported.'.format(freq)
+        raise ValueError(message)
+
+    series = series.sort_index().resample(freq).mean()
+
+    if series.shape[0] == 0:
+        start = 0
+    else:
+        start = series.index[0].value // 10**9
+
+    values = np.ascontiguousarray(series.values, dtype="<f4")
+    header = _header.pack(MAGIC, VERSION, freq.encode("ascii"), start,
+                          values.shape[0])
+    return header + values.tobytes()
+
+
+def deserialize_series(data):
+    ''' Deserialize a temperature series serialized with
+    :code:`serialize_series`.
+
+    Parameters
+    ----------
+    data : bytes
+        Serialized series.
+
+    Returns
+    -------
+    series : pandas.Series
+        Temperature series on a regular UTC grid, as float64.
+    '''
+    magic, version, freq, start, count = _header.unpack_from(data)
+    if magic != MAGIC or version != VERSION:
+        message = "Unrecognized temperature series format."
+        raise ValueError(message)
+
+    freq = freq.decode("ascii")
+    values = np.frombuffer(data, dtype="<f4", count=count,
+                           offset=_header.size)
+    index = pd.date_range(pd.Timestamp(start, unit="s", tz="UTC"),
+                          periods=count, freq=freq)
+    return pd.Series(values.astype(float), index=index)
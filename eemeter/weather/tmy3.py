@@ -6,6 +6,7 @@ import pytz
 from .base import WeatherSourceBase
 from .clients import TMY3Client
 from .cache import SqliteJSONStore
+from .serialization import deserialize_series, serialize_series
 
 
 class TMY3WeatherSource(WeatherSourceBase):
@@ -60,7 +61,8 @@ class TMY3WeatherSource(WeatherSourceBase):
     '''
 
     cache_date_format = "%Y%m%d%H"
-    cache_key_format = "TMY3-{}.json"
+    cache_key_format = "TMY3-{}.bin"
+    json_cache_key_format = "TMY3-{}.json"
     freq = "H"
     client = TMY3Client()
 
@@ -88,36 +90,43 @@ class TMY3WeatherSource(WeatherSourceBase):
             raise ValueError(message)
 
     def _load_data(self):
-        if self.json_store.key_exists(self._get_cache_key()):
+        if self.json_store.key_exists(self._get_cache_key()) or \
+                self.json_store.key_exists(self._get_json_cache_key()):
             self.tempC = self._load_cached_series()
         else:
             self.tempC = self.client.get_tmy3_data(self.station)
             self._save_series(self.tempC)
 
     def _load_cached_series(self):
-        data = self.json_store.retrieve_json(self._get_cache_key())
+        key = self._get_cache_key()
+        data = self.json_store.retrieve_blob(key)
+        if data is not None:
+            return deserialize_series(data)
+
+        json_key = self._get_json_cache_key()
+        data = self.json_store.retrieve_json(json_key)
 
         index = pd.to_datetime([d[0] for d in data],
                                format=self.cache_date_format, utc=True)
         values = [d[1] for d in data]
+        series = pd.Series(values, index=index, dtype=float)
 
-        # changed for pandas > 0.18
-        return pd.Series(values, index=index, dtype=float) \
-            .sort_index().resample(self.freq).mean()
+        # migrate to the binary format, keeping the original fetch time.
+        data = serialize_series(series, self.freq)
+        self.json_store.move_to_blob(json_key, key, data)
+        return deserialize_series(data)
 
     def _save_series(self, series):
-        data = [
-            [
-                d.strftime(self.cache_date_format), t
-                if pd.notnull(t) else None
-            ]
-            for d, t in series.iteritems()
-        ]
-        self.json_store.save_json(self._get_cache_key(), data)
+        self.json_store.save_blob(self._get_cache_key(),
+                                  serialize_series(series, self.freq))
 
     def _get_cache_key(self):
         return self.cache_key_format.format(self.station)
 
+    def _get_json_cache_key(self):
+        # key of data cached as JSON by earlier versions; migrated on load.
+        return self.json_cache_key_format.format(self.station)
+
     @staticmethod
     def _normalize_datetime(dt, year_offset=0):
         return datetime(1900 + year_offset, dt.month, dt.day, dt.hour,
@@ -163,13 +172,12 @@ class TMY3WeatherSource(WeatherSourceBase):
     def _daily_indexed_temperatures(self, index, unit):
         normalized_index = self._normalize_index(index)
         loffset = self._get_loffset(normalized_index[0])
-        tempC = self.tempC.resample('D', loffset=loffset) \
-            .mean()[normalized_index]
+        tempC = self._resampled('D', loffset)[normalized_index]
         tempC.index = index
         return self._unit_convert(tempC, unit)
 
     def _hourly_indexed_temperatures(self, index, unit):
         normalized_index = self._normalize_index(index)
-        tempC = self.tempC.resample('H').mean()[normalized_index]
+        tempC = self._resampled('H')[normalized_index]
         tempC.index = index
         return self._unit_convert(tempC, unit)
@@ -32,7 +32,14 @@ setup(
         'scipy',
         'scikit-learn',
     ],
-    package_data={'': ['*.json', '*.gz']},
+    package_data={'': ['*.json', '*.gz', '*.bin']},
+    entry_points={
+        'console_scripts': [
+            'eemeter-import-noaa = eemeter.weather.importer:main',
+            'eemeter-build-resource-pack = '
+            'eemeter.weather.resource_pack:main',
+        ],
+    },
     setup_requires=['pytest-runner'],
     tests_require=['pytest'],
 )
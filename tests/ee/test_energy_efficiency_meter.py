@@ -1,10 +1,12 @@
 from datetime import datetime
+import pickle
 import tempfile
 
 import pytz
 import pytest
 import pandas as pd
 import numpy as np
+from numpy.testing import assert_allclose
 
 from eemeter.structures import (
     Project,
@@ -17,7 +19,7 @@ from eemeter.structures import (
 from eemeter.modeling.split import SplitModeledEnergyTrace
 from eemeter.ee.meter import EnergyEfficiencyMeter
 from eemeter.testing.mocks import MockWeatherClient
-from eemeter.weather import TMY3WeatherSource
+from eemeter.weather import ISDWeatherSource, TMY3WeatherSource
 
 
 @pytest.fixture
@@ -64,6 +66,16 @@ def mock_tmy3_weather_source():
     return ws
 
 
+@pytest.fixture
+def mock_isd_weather_source():
+    tmp_dir = tempfile.mkdtemp()
+    ws = ISDWeatherSource("722880", tmp_dir)
+    ws.client = MockWeatherClient()
+    # loaded up front so that worker processes don't race to cache it.
+    ws.add_year_range(2012, 2015)
+    return ws
+
+
 def test_basic_usage(project, mock_tmy3_weather_source):
     meter = EnergyEfficiencyMeter()
     results = meter.evaluate(project,
@@ -96,3 +108,162 @@ def test_basic_usage(project, mock_tmy3_weather_source):
 
     assert results['weather_source'].station == '994971'
     assert results['weather_normal_source'].station == '724838'
+
+
+@pytest.mark.parametrize('n_workers', [1, 2])
+def test_evaluate_many(project, mock_isd_weather_source,
+                       mock_tmy3_weather_source, n_workers):
+    meter = EnergyEfficiencyMeter()
+    outputs = list(meter.evaluate_many(
+        [project, None, project], n_workers=n_workers,
+        weather_source=mock_isd_weather_source,
+        weather_normal_source=mock_tmy3_weather_source))
+
+    assert len(outputs) == 3
+    outputs = sorted(outputs, key=lambda o: o['project_index'])
+    assert [o['project_index'] for o in outputs] == [0, 1, 2]
+    assert [o['status'] for o in outputs] == \
+        ['SUCCESS', 'FAILURE', 'SUCCESS']
+
+    failure = outputs[1]
+    assert failure['results'] is None
+    assert 'AttributeError' in failure['traceback']
+
+    results = outputs[0]['results']
+    assert 'modeled_energy_traces' not in results
+    assert isinstance(results['modeling_period_set'], ModelingPeriodSet)
+    derivatives = results['modeled_energy_trace_derivatives']
+    assert 'annualized_weather_normal' in \
+        derivatives['0'][('baseline', 'reporting')]['BASELINE']
+    assert results['weather_source'].station == '722880'
+    assert results['weather_normal_source'].station == '724838'
+
+
+@pytest.fixture
+def project_multiple_traces(daily_data, interventions):
+    energy_trace_set = EnergyTraceSet([
+        EnergyTrace('ELECTRICITY_CONSUMPTION_SUPPLIED', data=daily_data,
+                    unit='kWh'),
+        EnergyTrace('NATURAL_GAS_CONSUMPTION_SUPPLIED', data=daily_data * 2,
+                    unit='therm'),
+        EnergyTrace('ELECTRICITY_CONSUMPTION_SUPPLIED', placeholder=True,
+                    unit='kWh'),
+    ])
+    return Project(energy_trace_set, interventions, ZIPCodeSite("02138"))
+
+
+@pytest.mark.parametrize('trace_executor', ['thread', 'process'])
+def test_trace_executor(project_multiple_traces, mock_isd_weather_source,
+                        mock_tmy3_weather_source, trace_executor):
+    serial_results = EnergyEfficiencyMeter().evaluate(
+        project_multiple_traces,
+        weather_source=mock_isd_weather_source,
+        weather_normal_source=mock_tmy3_weather_source)
+
+    meter = EnergyEfficiencyMeter(settings={
+        'trace_executor': trace_executor,
+        'n_trace_workers': 2,
+    })
+    results = meter.evaluate(
+        project_multiple_traces,
+        weather_source=mock_isd_weather_source,
+        weather_normal_source=mock_tmy3_weather_source)
+
+    assert results['modeled_energy_trace_derivatives'] == \
+        serial_results['modeled_energy_trace_derivatives']
+    assert results['project_derivatives'] == \
+        serial_results['project_derivatives']
+    assert results['modeled_energy_traces']['2'] is None
+
+    fit_outputs = results['modeled_energy_traces']['0'].fit_outputs
+    serial_fit_outputs = \
+        serial_results['modeled_energy_traces']['0'].fit_outputs
+    assert fit_outputs['baseline']['status'] == 'SUCCESS'
+    assert fit_outputs['baseline']['r2'] == \
+        serial_fit_outputs['baseline']['r2']
+
+    # fitted models are usable as after a serial fit
+    modeled_energy_trace = results['modeled_energy_traces']['0']
+    serial_modeled_energy_trace = serial_results['modeled_energy_traces']['0']
+    model = modeled_energy_trace.model_mapping['baseline']
+    serial_model = serial_modeled_energy_trace.model_mapping['baseline']
+    assert model.n == serial_model.n
+    assert model.X.shape == serial_model.X.shape
+    assert_allclose(model.y.values, serial_model.y.values)
+    assert_allclose(model.estimated.values, serial_model.estimated.values)
+
+    index = pd.date_range('2015-01-01', periods=30, freq='D', tz=pytz.UTC)
+    demand_fixture_data = modeled_energy_trace.formatter \
+        .create_demand_fixture(index, mock_isd_weather_source)
+    assert_allclose(
+        modeled_energy_trace.predict('baseline', demand_fixture_data),
+        serial_modeled_energy_trace.predict('baseline', demand_fixture_data))
+
+
+def test_bad_trace_executor():
+    with pytest.raises(ValueError):
+        EnergyEfficiencyMeter(settings={'trace_executor': 'BAD'})
+
+
+def test_evaluate_many_process_trace_executor(project):
+    meter = EnergyEfficiencyMeter(settings={'trace_executor': 'process'})
+    with pytest.raises(ValueError):
+        meter.evaluate_many([project], n_workers=2)
+
+
+def test_lean_results(project_multiple_traces, mock_isd_weather_source,
+                      mock_tmy3_weather_source):
+    full_results = EnergyEfficiencyMeter().evaluate(
+        project_multiple_traces,
+        weather_source=mock_isd_weather_source,
+        weather_normal_source=mock_tmy3_weather_source)
+
+    meter = EnergyEfficiencyMeter(settings={'lean_results': True})
+    results = meter.evaluate(
+        project_multiple_traces,
+        weather_source=mock_isd_weather_source,
+        weather_normal_source=mock_tmy3_weather_source)
+
+    assert 'weather_source' not in results
+    assert 'weather_normal_source' not in results
+    assert results['weather_source_station'] == '722880'
+    assert results['weather_normal_source_station'] == '724838'
+    assert results['modeled_energy_trace_derivatives'] == \
+        full_results['modeled_energy_trace_derivatives']
+    assert results['project_derivatives'] == \
+        full_results['project_derivatives']
+
+    modeled_energy_traces = results['modeled_energy_traces']
+    assert modeled_energy_traces['2'] is None
+    assert modeled_energy_traces['1']['interpretation'] == \
+        'NATURAL_GAS_CONSUMPTION_SUPPLIED'
+    assert modeled_energy_traces['1']['unit'] == 'THERM'
+
+    baseline_outputs = modeled_energy_traces['0']['fit_outputs']['baseline']
+    full_baseline_outputs = full_results['modeled_energy_traces']['0'] \
+        .fit_outputs['baseline']
+    assert baseline_outputs['r2'] == full_baseline_outputs['r2']
+    model_params = baseline_outputs['model_params']
+    assert sorted(model_params.keys()) == [
+        'coefficients', 'cooling_base_temp', 'design',
+        'formula', 'heating_base_temp', 'intercept',
+    ]
+    assert len(model_params['coefficients']) == \
+        len(model_params['design']['column_names'])
+    assert model_params['cooling_base_temp'] == 65
+
+    assert len(pickle.dumps(results)) < 64 * 1024
+
+
+def test_evaluate_many_lean_results(project, mock_isd_weather_source,
+                                    mock_tmy3_weather_source):
+    meter = EnergyEfficiencyMeter(settings={'lean_results': True})
+    outputs = list(meter.evaluate_many(
+        [project], n_workers=2,
+        weather_source=mock_isd_weather_source,
+        weather_normal_source=mock_tmy3_weather_source))
+
+    results = outputs[0]['results']
+    assert outputs[0]['status'] == 'SUCCESS'
+    assert results['modeled_energy_traces']['0']['fit_outputs'][
+        'baseline']['status'] == 'SUCCESS'
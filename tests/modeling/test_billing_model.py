@@ -1,15 +1,18 @@
+import json
 import tempfile
 
 import pytest
 import pandas as pd
 import numpy as np
 import pytz
+from numpy.testing import assert_allclose
 
 from eemeter.modeling.models.billing import BillingElasticNetCVModel
 from eemeter.modeling.formatters import ModelDataBillingFormatter
+from eemeter.modeling.params import portable_params
 from eemeter.structures import EnergyTrace
 from eemeter.weather import ISDWeatherSource
-from eemeter.testing.mocks import MockWeatherClient
+from eemeter.testing.mocks import MockWeatherClient, VaryingWeatherClient
 
 
 @pytest.fixture
@@ -61,3 +64,78 @@ def test_basic_usage(trace, mock_isd_weather_source):
     assert outputs.shape == (365,)
 
     assert "ModelDataBillingFormatter" in str(ModelDataBillingFormatter)
+
+
+@pytest.mark.parametrize('solver', ['ols', 'ridge'])
+def test_solver(trace, mock_isd_weather_source, solver):
+    formatter = ModelDataBillingFormatter()
+    model = BillingElasticNetCVModel(65, 65, solver=solver)
+
+    formatted_input_data = formatter.create_input(
+        trace, mock_isd_weather_source)
+
+    outputs = model.fit(formatted_input_data)
+    assert model.solver == solver
+    assert len(outputs['model_params']['coefficients']) == 4
+
+    index = pd.date_range('2011-01-01', freq='D', periods=365, tz=pytz.UTC)
+    formatted_predict_data = formatter.create_demand_fixture(
+        index, mock_isd_weather_source)
+
+    outputs = model.predict(formatted_predict_data)
+    assert outputs.shape == (365,)
+
+
+def test_portable_params(trace, mock_isd_weather_source):
+    formatter = ModelDataBillingFormatter()
+    model = BillingElasticNetCVModel(65, 65, solver='ols')
+
+    formatted_input_data = formatter.create_input(
+        trace, mock_isd_weather_source)
+    outputs = model.fit(formatted_input_data)
+    params = json.loads(json.dumps(portable_params(outputs['model_params'])))
+
+    index = pd.date_range('2011-01-01', freq='D', periods=365, tz=pytz.UTC)
+    formatted_predict_data = formatter.create_demand_fixture(
+        index, mock_isd_weather_source)
+
+    assert_allclose(model.predict(formatted_predict_data, params),
+                    model.predict(formatted_predict_data))
+
+
+def test_weather_source_degree_days():
+    ws = ISDWeatherSource("722880", tempfile.mkdtemp())
+    ws.client = VaryingWeatherClient()
+
+    index = pd.DatetimeIndex(
+        ["2012-01-06", "2012-02-04 12:00", "2012-03-06", "2012-04-05",
+         "2012-05-07", "2012-06-06", "2012-07-06", "2012-08-06",
+         "2012-09-05", "2012-10-06"], tz=pytz.UTC)
+    data = pd.DataFrame({
+        "value": [30, 25, 20, 12, 8, 14, 22, 24, 15, np.nan],
+        "estimated": [False] * 10,
+    }, index=index, columns=['value', 'estimated'])
+    trace = EnergyTrace(interpretation="NATURAL_GAS_CONSUMPTION_SUPPLIED",
+                        unit="THERM", data=data)
+    input_data = ModelDataBillingFormatter().create_input(trace, ws)
+    _, temperature_data = input_data
+
+    # as computed from the hourly temperatures of the input
+    cdd = np.maximum((temperature_data - 62)
+                     .groupby(level='period').sum()[0] / 24.0, 0.0)
+    hdd = np.maximum((68 - temperature_data)
+                     .groupby(level='period').sum()[0] / 24.0, 0.0)
+
+    model = BillingElasticNetCVModel(62, 68, solver='ols')
+    outputs = model.fit(input_data, weather_source=ws)
+    assert_allclose(model.X.CDD.values, cdd.values, atol=1e-8)
+    assert_allclose(model.X.HDD.values, hdd.values, atol=1e-8)
+
+    model_input = BillingElasticNetCVModel(62, 68, solver='ols')
+    outputs_input = model_input.fit(input_data)
+    assert_allclose(outputs['model_params']['coefficients'],
+                    outputs_input['model_params']['coefficients'],
+                    rtol=1e-6, atol=1e-8)
+    assert_allclose(outputs['r2'], outputs_input['r2'])
+    assert_allclose(model.estimated.values, model_input.estimated.values,
+                    rtol=1e-6)
@@ -0,0 +1,87 @@
+import pickle
+
+import holidays
+import numpy as np
+import pandas as pd
+import pytest
+
+from eemeter.modeling.calendars import (
+    HolidayCalendar,
+    get_holiday_calendar,
+)
+
+
+def _reference_holiday_names(country, dt_index):
+    # per-day lookup, as previously done by the seasonal model
+    raw = getattr(holidays, country)()
+
+    def clean_holiday_name(dt):
+        raw_name = raw.get(dt, "none")
+        if raw_name.endswith(" (Observed)"):
+            return raw_name[:-11]
+        else:
+            return raw_name
+
+    return [clean_holiday_name(dt) for dt in dt_index]
+
+
+@pytest.mark.parametrize('country', ["UnitedStates", "Canada"])
+def test_matches_holidays(country):
+    calendar = HolidayCalendar(country, 2010, 2020)
+    index = pd.date_range('2011-01-01', periods=3 * 365, freq='D', tz='UTC')
+
+    holiday_names = calendar.holiday_names(index)
+
+    assert holiday_names.index.equals(index)
+    assert list(holiday_names) == _reference_holiday_names(country, index)
+    assert len(calendar) > 0
+
+
+def test_codes():
+    calendar = HolidayCalendar("UnitedStates", 2010, 2020)
+    index = pd.date_range('2015-12-24', periods=3, freq='D')
+
+    codes = calendar.holiday_codes(index)
+
+    assert codes[0] == codes[2] == 0
+    assert codes[1] > 0
+    assert list(calendar.names[codes]) == ["none", "Christmas Day", "none"]
+
+
+def test_local_date():
+    calendar = HolidayCalendar("UnitedStates", 2010, 2020)
+    # 2015-12-25 00:00 UTC is still Christmas Eve in US/Pacific
+    index = pd.DatetimeIndex(['2015-12-25 00:00']).tz_localize('UTC') \
+        .tz_convert('US/Pacific')
+
+    assert list(calendar.holiday_names(index)) == ["none"]
+
+
+def test_extends_year_range():
+    calendar = HolidayCalendar("UnitedStates", 2010, 2011)
+    index = pd.date_range('2008-01-01', '2013-01-01', freq='D')
+
+    holiday_names = calendar.holiday_names(index)
+
+    assert calendar.start_year == 2008
+    assert calendar.end_year == 2013
+    assert list(holiday_names) == \
+        _reference_holiday_names("UnitedStates", index)
+
+
+def test_empty_index():
+    calendar = HolidayCalendar("UnitedStates", 2010, 2011)
+    holiday_names = calendar.holiday_names(pd.DatetimeIndex([]))
+    assert holiday_names.shape == (0,)
+
+
+def test_bad_country():
+    with pytest.raises(ValueError):
+        HolidayCalendar("NotACountry")
+
+
+def test_shared_calendar():
+    calendar = get_holiday_calendar("UnitedStates")
+    assert get_holiday_calendar("UnitedStates") is calendar
+    assert pickle.loads(pickle.dumps(calendar)) is calendar
+    assert np.unique(calendar.names).shape == calendar.names.shape
@@ -0,0 +1,149 @@
+import json
+
+import numpy as np
+import pandas as pd
+import patsy
+import pytest
+
+from eemeter.modeling.design import (
+    DesignMatrixBuilder,
+    build_design_matrix,
+    design_spec,
+    dmatrices,
+)
+
+SEASONAL_FORMULA = (
+    'energy ~ 1 + CDD + HDD + CDD:HDD'
+    ' + CDD * C(tempF.index.month) + HDD * C(tempF.index.month)'
+    ' + C(tempF.index.month)'
+    ' + (CDD) * C(tempF.index.weekday) + (HDD) * C(tempF.index.weekday)'
+    ' + C(tempF.index.weekday) + C(holiday_name)'
+)
+
+
+@pytest.fixture
+def model_data():
+    index = pd.date_range('2012-01-01', periods=730, freq='D', tz='UTC')
+    tempF = np.random.RandomState(0).uniform(30, 90, 730)
+    data = pd.DataFrame({
+        'energy': np.random.RandomState(1).uniform(0, 10, 730),
+        'tempF': tempF,
+        'CDD': np.maximum(tempF - 65, 0),
+        'HDD': np.maximum(60 - tempF, 0),
+        'holiday_name': np.where(index.day == 1, 'first',
+                                 np.where(index.day == 15, 'middle', 'none')),
+    }, index=index)
+    data.iloc[5, data.columns.get_loc('tempF')] = np.nan
+    data.iloc[7, data.columns.get_loc('CDD')] = np.nan
+    data.iloc[9, data.columns.get_loc('energy')] = np.nan
+    return data
+
+
+@pytest.mark.parametrize('formula', [
+    SEASONAL_FORMULA,
+    'energy ~ 1 + CDD + HDD + CDD:HDD',
+])
+def test_dmatrices(model_data, formula):
+    y_patsy, X_patsy = patsy.dmatrices(formula, model_data,
+                                       return_type='dataframe')
+
+    # first call compiles, second reuses the compiled builders
+    for _ in range(2):
+        y, X, X_design_info = dmatrices(formula, model_data)
+        pd.testing.assert_frame_equal(y, y_patsy)
+        pd.testing.assert_frame_equal(X, X_patsy)
+        assert X_design_info.column_names == X_patsy.columns.tolist()
+
+
+def test_dmatrices_new_levels(model_data):
+    dmatrices(SEASONAL_FORMULA, model_data)
+
+    model_data = model_data[model_data.holiday_name != 'middle']
+    y_patsy, X_patsy = patsy.dmatrices(SEASONAL_FORMULA, model_data,
+                                       return_type='dataframe')
+    y, X, _ = dmatrices(SEASONAL_FORMULA, model_data)
+
+    assert 'C(holiday_name)[T.middle]' not in X.columns
+    pd.testing.assert_frame_equal(X, X_patsy)
+
+
+def test_build_design_matrix(model_data):
+    _, _, X_design_info = dmatrices(SEASONAL_FORMULA, model_data)
+    demand_fixture_data = model_data.drop('energy', axis=1)
+
+    (X_patsy,) = patsy.build_design_matrices(
+        [X_design_info], demand_fixture_data, return_type='dataframe')
+    X = build_design_matrix(X_design_info, demand_fixture_data)
+
+    pd.testing.assert_frame_equal(X, X_patsy)
+
+
+def test_build_design_matrix_unknown_level(model_data):
+    _, _, X_design_info = dmatrices(SEASONAL_FORMULA, model_data)
+    model_data.loc[:, 'holiday_name'] = 'unknown'
+
+    with pytest.raises(patsy.PatsyError):
+        build_design_matrix(X_design_info, model_data)
+
+
+def test_uncompilable_formula(model_data):
+    formula = 'energy ~ 1 + np.log1p(CDD) + HDD'
+    y_patsy, X_patsy = patsy.dmatrices(formula, model_data,
+                                       return_type='dataframe')
+
+    with pytest.raises(NotImplementedError):
+        DesignMatrixBuilder(X_patsy.design_info)
+
+    y, X, X_design_info = dmatrices(formula, model_data)
+    pd.testing.assert_frame_equal(X, X_patsy)
+
+    (X_patsy,) = patsy.build_design_matrices(
+        [X_design_info], model_data, return_type='dataframe')
+    X = build_design_matrix(X_design_info, model_data)
+    pd.testing.assert_frame_equal(X, X_patsy)
+
+
+def test_design_spec(model_data):
+    _, X_patsy, X_design_info = dmatrices(SEASONAL_FORMULA, model_data)
+
+    spec = json.loads(json.dumps(design_spec(X_design_info)))
+    assert spec['column_names'] == X_patsy.columns.tolist()
+
+    builder = DesignMatrixBuilder.from_spec(spec)
+    assert builder.design_info is None
+    assert builder.to_spec() == spec
+
+    demand_fixture_data = model_data.drop('energy', axis=1)
+    (X_patsy,) = patsy.build_design_matrices(
+        [X_design_info], demand_fixture_data, return_type='dataframe')
+    pd.testing.assert_frame_equal(
+        build_design_matrix(spec, demand_fixture_data), X_patsy)
+
+
+def test_design_spec_full_rank_contrasts(model_data):
+    # C(holiday_name) has a full rank coding when there's no intercept.
+    _, _, X_design_info = dmatrices('energy ~ 0 + C(holiday_name) + CDD',
+                                    model_data)
+    spec = json.loads(json.dumps(design_spec(X_design_info)))
+
+    (X_patsy,) = patsy.build_design_matrices(
+        [X_design_info], model_data, return_type='dataframe')
+    pd.testing.assert_frame_equal(
+        build_design_matrix(spec, model_data), X_patsy)
+
+
+def test_design_spec_uncompilable(model_data):
+    _, _, X_design_info = dmatrices('energy ~ 1 + np.log1p(CDD)', model_data)
+    assert design_spec(X_design_info) is None
+
+
+def test_design_spec_rejects_private_attributes():
+    spec = {
+        'column_names': ['x'],
+        'factors': [{'code': 'x.__class__', 'type': 'numerical',
+                     'num_columns': 1}],
+        'subterms': [{'factors': ['x.__class__'], 'contrasts': {},
+                      'num_columns': 1}],
+    }
+    with pytest.raises(NotImplementedError):
+        DesignMatrixBuilder.from_spec(spec)
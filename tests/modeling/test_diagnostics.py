@@ -0,0 +1,90 @@
+from datetime import datetime
+import sys
+import tempfile
+import warnings
+
+import numpy as np
+import pandas as pd
+import pytest
+import pytz
+
+from eemeter.modeling.diagnostics import plot_fit, plot_modeled_energy_trace
+from eemeter.modeling.formatters import ModelDataFormatter
+from eemeter.modeling.models import SeasonalElasticNetCVModel
+from eemeter.modeling.split import SplitModeledEnergyTrace
+from eemeter.structures import (
+    EnergyTrace,
+    ModelingPeriod,
+    ModelingPeriodSet,
+)
+from eemeter.testing.mocks import MockWeatherClient
+from eemeter.weather import ISDWeatherSource
+
+
+@pytest.fixture
+def mock_isd_weather_source():
+    tmp_dir = tempfile.mkdtemp()
+    ws = ISDWeatherSource("722880", tmp_dir)
+    ws.client = MockWeatherClient()
+    return ws
+
+
+@pytest.fixture
+def trace():
+    data = {
+        "value": np.tile(1, (365,)),
+        "estimated": np.tile(False, (365,)),
+    }
+    columns = ["value", "estimated"]
+    index = pd.date_range('2000-01-01', periods=365, freq='D', tz=pytz.UTC)
+    df = pd.DataFrame(data, index=index, columns=columns)
+    return EnergyTrace("ELECTRICITY_CONSUMPTION_SUPPLIED", df, unit="KWH")
+
+
+@pytest.fixture
+def no_matplotlib(monkeypatch):
+    monkeypatch.setitem(sys.modules, 'matplotlib', None)
+    monkeypatch.setitem(sys.modules, 'matplotlib.pyplot', None)
+
+
+def test_fit_does_not_plot(trace, mock_isd_weather_source, no_matplotlib):
+    input_data = ModelDataFormatter('D').create_input(
+        trace, mock_isd_weather_source)
+    model = SeasonalElasticNetCVModel(65, 65)
+
+    with warnings.catch_warnings(record=True) as w:
+        warnings.simplefilter("always")
+        model.fit(input_data)
+
+    assert not any("plot" in str(warning.message) for warning in w)
+
+    with pytest.warns(UserWarning):
+        assert plot_fit(model) is None
+
+
+def test_unfit_model():
+    with pytest.raises(ValueError):
+        plot_fit(SeasonalElasticNetCVModel(65, 65))
+
+
+def test_modeled_energy_trace(trace, mock_isd_weather_source,
+                              no_matplotlib):
+    modeling_period_set = ModelingPeriodSet({
+        "baseline": ModelingPeriod(
+            "BASELINE", end_date=datetime(2000, 9, 1, tzinfo=pytz.UTC)),
+        "reporting": ModelingPeriod(
+            "REPORTING",
+            start_date=datetime(2001, 1, 1, tzinfo=pytz.UTC)),
+    }, [("baseline", "reporting")])
+    smet = SplitModeledEnergyTrace(
+        trace, ModelDataFormatter('D'), {
+            "baseline": SeasonalElasticNetCVModel(65, 65),
+            "reporting": SeasonalElasticNetCVModel(65, 65),
+        }, modeling_period_set)
+    smet.fit(mock_isd_weather_source)
+
+    with pytest.warns(UserWarning):
+        assert plot_modeled_energy_trace(smet, "baseline") is None
+
+    with pytest.raises(ValueError):
+        plot_modeled_energy_trace(smet, "reporting")
@@ -0,0 +1,122 @@
+import pickle
+import tempfile
+
+import numpy as np
+from numpy.testing import assert_allclose
+import pandas as pd
+import pytest
+import pytz
+from sklearn import linear_model
+
+from eemeter.modeling.cache import SqliteFitCache
+from eemeter.modeling.formatters import ModelDataFormatter
+from eemeter.modeling.models import SeasonalElasticNetCVModel
+from eemeter.structures import EnergyTrace
+from eemeter.testing.mocks import MockWeatherClient
+from eemeter.weather import ISDWeatherSource
+
+
+@pytest.fixture
+def mock_isd_weather_source():
+    tmp_dir = tempfile.mkdtemp()
+    ws = ISDWeatherSource("722880", tmp_dir)
+    ws.client = MockWeatherClient()
+    return ws
+
+
+@pytest.fixture
+def input_df(mock_isd_weather_source):
+    index = pd.date_range('2000-01-01', periods=365, freq='D', tz=pytz.UTC)
+    data = {
+        "value": np.arange(365) % 7,
+        "estimated": np.tile(False, (365,)),
+    }
+    df = pd.DataFrame(data, index=index, columns=["value", "estimated"])
+    trace = EnergyTrace("ELECTRICITY_CONSUMPTION_SUPPLIED", df, unit="KWH")
+    return ModelDataFormatter("D").create_input(
+        trace, mock_isd_weather_source)
+
+
+@pytest.fixture
+def fit_cache():
+    return SqliteFitCache(tempfile.mkdtemp())
+
+
+def _fail(*args, **kwargs):
+    raise AssertionError("ElasticNetCV.fit should not be called.")
+
+
+def test_basic_usage(input_df, fit_cache, monkeypatch):
+    output1 = SeasonalElasticNetCVModel(65, 65, fit_cache).fit(input_df)
+
+    monkeypatch.setattr(linear_model.ElasticNetCV, "fit", _fail)
+    m = SeasonalElasticNetCVModel(65, 65, fit_cache)
+    output2 = m.fit(input_df)
+
+    assert_allclose(output1["model_params"]["coefficients"],
+                    output2["model_params"]["coefficients"])
+    assert output1["r2"] == output2["r2"]
+    assert output1["rmse"] == output2["rmse"]
+    assert m.predict(input_df).shape == (365,)
+
+
+def test_cache_miss(input_df, fit_cache):
+    SeasonalElasticNetCVModel(65, 65, fit_cache).fit(input_df)
+    SeasonalElasticNetCVModel(60, 65, fit_cache).fit(input_df)
+
+    input_df.energy *= 2
+    SeasonalElasticNetCVModel(65, 65, fit_cache).fit(input_df)
+
+    n_items = fit_cache.conn.execute('SELECT COUNT(*) FROM items;')
+    assert n_items.fetchone()[0] == 3
+
+
+def test_clear(input_df, fit_cache, monkeypatch):
+    SeasonalElasticNetCVModel(65, 65, fit_cache).fit(input_df)
+    fit_cache.clear()
+
+    monkeypatch.setattr(linear_model.ElasticNetCV, "fit", _fail)
+    with pytest.raises(AssertionError):
+        SeasonalElasticNetCVModel(65, 65, fit_cache).fit(input_df)
+
+
+def test_eviction(fit_cache):
+    fit_cache.max_size = 100
+    X = pd.DataFrame({"a": [1., 2., 3.]})
+    for i in range(10):
+        estimator = linear_model.LinearRegression()
+        fit_cache.fit(estimator, X, np.array([1., 2., 3.]) * i)
+
+    n_items, size = fit_cache.conn.execute(
+        'SELECT COUNT(*), SUM(LENGTH(data)) FROM items;').fetchone()
+    assert 0 < n_items < 10
+    assert size <= 100
+
+
+def test_eviction_least_recently_used(fit_cache):
+    X = pd.DataFrame({"a": [1., 2., 3.]})
+
+    def fit(i):
+        estimator = linear_model.LinearRegression()
+        fit_cache.fit(estimator, X, np.array([1., 2., 3.]) * i)
+        return fit_cache.fingerprint(estimator, X, np.array([1., 2., 3.]) * i)
+
+    keys = [fit(i) for i in range(3)]
+    size = fit_cache.conn.execute(
+        'SELECT SUM(LENGTH(data)) FROM items;').fetchone()[0]
+    fit_cache.max_size = size
+
+    fit(0)  # hit; the least recently used fit is now keys[1]
+    fit(3)
+    assert fit_cache.key_exists(keys[0])
+    assert not fit_cache.key_exists(keys[1])
+
+
+def test_pickle(fit_cache):
+    fit_cache.max_size = 10
+    fit_cache2 = pickle.loads(pickle.dumps(fit_cache))
+    assert fit_cache2.directory == fit_cache.directory
+    assert fit_cache2.max_size == 10
+    assert fit_cache2.db_filename.endswith("fit_cache.db")
+    assert str(fit_cache2) == \
+        'SqliteFitCache("{}")'.format(fit_cache.directory)
@@ -0,0 +1,30 @@
+import json
+
+import numpy as np
+import pandas as pd
+from numpy.testing import assert_allclose
+import patsy
+
+from eemeter.modeling.params import portable_params, predict_linear
+
+
+def test_portable_params():
+    data = pd.DataFrame({
+        'energy': [1., 2., 3., 5.],
+        'CDD': [0., 1., 2., 4.],
+    })
+    y, X = patsy.dmatrices('energy ~ 1 + CDD', data, return_type='dataframe')
+    model_params = {
+        'coefficients': np.array([1., 1.]),
+        'intercept': 0.,
+        'X_design_info': X.design_info,
+        'formula': 'energy ~ 1 + CDD',
+    }
+
+    params = portable_params(model_params)
+
+    assert json.loads(json.dumps(params)) == params
+    assert params['coefficients'] == [1., 1.]
+    assert params['design']['column_names'] == ['Intercept', 'CDD']
+    assert params['cooling_base_temp'] is None
+    assert_allclose(predict_linear(X, params), [1., 2., 3., 5.])
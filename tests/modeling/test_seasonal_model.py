@@ -1,3 +1,4 @@
+import json
 import tempfile
 from datetime import datetime
 
@@ -8,10 +9,11 @@ from numpy.testing import assert_allclose
 import pytz
 
 from eemeter.weather import ISDWeatherSource
-from eemeter.testing.mocks import MockWeatherClient
+from eemeter.testing.mocks import MockWeatherClient, VaryingWeatherClient
 from eemeter.modeling.formatters import ModelDataFormatter
 from eemeter.structures import EnergyTrace
 from eemeter.modeling.models import SeasonalElasticNetCVModel
+from eemeter.modeling.params import portable_params
 
 
 @pytest.fixture
@@ -86,3 +88,59 @@ def test_basic(input_df):
     assert m.r2 == 0.0
     assert_allclose(m.rmse, 0.0010302718099450827)
     assert m.y.shape == (365, 1)
+
+
+@pytest.mark.parametrize('solver', ['ols', 'ridge'])
+def test_solver(input_df, solver):
+    m = SeasonalElasticNetCVModel(65, 65, solver=solver)
+    output = m.fit(input_df)
+    assert_allclose(output["rmse"], 0.0, atol=1e-8)
+
+    predict = m.predict(input_df)
+    assert_allclose(predict, 1.0)
+
+
+def test_bad_solver():
+    with pytest.raises(ValueError):
+        SeasonalElasticNetCVModel(65, 65, solver="BAD")
+
+
+def test_portable_params(input_df):
+    m = SeasonalElasticNetCVModel(65, 65)
+    output = m.fit(input_df)
+    params = json.loads(json.dumps(portable_params(output['model_params'])))
+
+    # base temperatures come from the params
+    predict = SeasonalElasticNetCVModel(50, 80).predict(input_df, params)
+
+    assert_allclose(predict, m.predict(input_df))
+
+
+def test_weather_source_degree_days(daily_trace):
+    ws = ISDWeatherSource("722880", tempfile.mkdtemp())
+    ws.client = VaryingWeatherClient()
+    input_data = ModelDataFormatter("D").create_input(daily_trace, ws)
+    input_data.energy = np.arange(365) % 11 + input_data.tempF / 10.
+
+    m = SeasonalElasticNetCVModel(62, 68, solver="ols")
+    output = m.fit(input_data, weather_source=ws)
+
+    # as computed from the daily mean temperatures of the input
+    assert_allclose(m.X.CDD.values,
+                    np.maximum(input_data.tempF.values - 62, 0),
+                    atol=1e-8)
+    assert_allclose(m.X.HDD.values,
+                    np.maximum(68 - input_data.tempF.values, 0),
+                    atol=1e-8)
+
+    m_input = SeasonalElasticNetCVModel(62, 68, solver="ols")
+    output_input = m_input.fit(input_data)
+    assert_allclose(output["model_params"]["coefficients"],
+                    output_input["model_params"]["coefficients"],
+                    rtol=1e-6, atol=1e-8)
+    assert_allclose(output["r2"], output_input["r2"])
+    assert_allclose(m.estimated.values, m_input.estimated.values,
+                    rtol=1e-6)
+    # added to the table's precomputed base temperatures on first use
+    assert 62 in ws.degree_day_table().base_temps
+    assert 68 in ws.degree_day_table().base_temps
@@ -0,0 +1,97 @@
+import numpy as np
+from numpy.testing import assert_allclose
+import pandas as pd
+import pytest
+from sklearn import linear_model
+
+from eemeter.modeling.solvers import (
+    LeastSquaresRegression,
+    RidgeCholeskyRegression,
+    get_estimator,
+)
+
+
+@pytest.fixture
+def X():
+    rng = np.random.RandomState(0)
+    return pd.DataFrame({
+        "Intercept": np.ones(50),
+        "CDD": rng.uniform(0, 10, 50),
+        "HDD": rng.uniform(0, 10, 50),
+    }, columns=["Intercept", "CDD", "HDD"])
+
+
+@pytest.fixture
+def y(X):
+    return X.dot([5., 2., 3.]).values
+
+
+def test_least_squares(X, y):
+    m = LeastSquaresRegression().fit(X, y)
+    assert_allclose(m.coef_, [5., 2., 3.])
+    assert m.intercept_ == 0.0
+    assert_allclose(m.predict(X), y)
+    assert_allclose(m.score(X, y), 1.0)
+
+
+def test_least_squares_rank_deficient(X, y):
+    X["zero"] = 0.
+    m = LeastSquaresRegression().fit(X, y)
+    assert_allclose(m.coef_, [5., 2., 3., 0.], atol=1e-10)
+
+
+def test_ridge(X, y):
+    m = RidgeCholeskyRegression(alpha=0.).fit(X, y)
+    assert_allclose(m.coef_, [5., 2., 3.])
+
+    # matches sklearn with an unpenalized intercept
+    m = RidgeCholeskyRegression(alpha=10.).fit(X, y)
+    sk = linear_model.Ridge(alpha=10.).fit(X[["CDD", "HDD"]], y)
+    assert_allclose(m.coef_[1:], sk.coef_)
+    assert_allclose(m.coef_[0], sk.intercept_)
+
+
+def test_ridge_zero_column(X, y):
+    X["zero"] = 0.
+    m = RidgeCholeskyRegression(alpha=1.).fit(X, y)
+    assert m.coef_[3] == 0.0
+
+
+def test_estimator_params(X, y):
+    m = RidgeCholeskyRegression(alpha=2.)
+    assert m.get_params() == {"alpha": 2.}
+    assert repr(m) == "RidgeCholeskyRegression(alpha=2.0)"
+    assert m.set_params(alpha=3.).alpha == 3.
+    with pytest.raises(ValueError):
+        m.set_params(beta=1.)
+    assert LeastSquaresRegression().get_params() == {}
+
+    # R^2 as sklearn computes it
+    m = RidgeCholeskyRegression(alpha=100.).fit(X, y)
+    sk = linear_model.LinearRegression(fit_intercept=False)
+    sk.coef_, sk.intercept_ = m.coef_, 0.0
+    assert_allclose(m.score(X, y), sk.score(X, y))
+
+
+def test_score_2d_response(X, y):
+    # models score against the (n, 1) response DataFrame from dmatrices
+    rng = np.random.RandomState(1)
+    y = pd.DataFrame({"energy": y + rng.normal(0, 2, y.shape[0])})
+    m = LeastSquaresRegression().fit(X, y.values.ravel())
+    sk = linear_model.LinearRegression(fit_intercept=False)
+    sk.coef_, sk.intercept_ = m.coef_, 0.0
+    score = m.score(X, y)
+    assert score < 1.0
+    assert_allclose(score, sk.score(X, y.values.ravel()))
+
+
+def test_get_estimator():
+    assert isinstance(get_estimator("elastic_net_cv"),
+                      linear_model.ElasticNetCV)
+    assert isinstance(get_estimator("ols"), LeastSquaresRegression)
+    ridge = get_estimator("ridge", ridge_alpha=2.)
+    assert isinstance(ridge, RidgeCholeskyRegression)
+    assert ridge.alpha == 2.
+
+    with pytest.raises(ValueError):
+        get_estimator("BAD")
@@ -14,7 +14,7 @@ from eemeter.structures import (
     ModelingPeriod,
     ModelingPeriodSet,
 )
-from eemeter.testing.mocks import MockWeatherClient
+from eemeter.testing.mocks import MockModel, MockWeatherClient
 from eemeter.weather import ISDWeatherSource
 
 
@@ -111,3 +111,19 @@ def test_basic_usage(trace, modeling_period_set, mock_isd_weather_source):
     # bad weather source
     smet.fit(None)
     assert outputs['modeling_period_1']['status'] == 'FAILURE'
+
+
+def test_model_without_weather_source_argument(trace, modeling_period_set,
+                                               mock_isd_weather_source):
+    # MockModel.fit takes only the input data, as models written before
+    # weather sources were given to fit() do.
+    model_mapping = {
+        'modeling_period_1': MockModel(),
+        'modeling_period_2': MockModel(),
+    }
+    smet = SplitModeledEnergyTrace(
+        trace, ModelDataFormatter('D'), model_mapping, modeling_period_set)
+
+    outputs = smet.fit(mock_isd_weather_source)
+    assert outputs['modeling_period_1']['status'] == 'SUCCESS'
+    assert outputs['modeling_period_1']['n_rows'] == 245
@@ -1,10 +1,13 @@
 from datetime import datetime
+import tempfile
+
 import pytz
 
 import pytest
 import numpy as np
 import pandas as pd
 
+from eemeter.modeling.cache import SqliteFitCache
 from eemeter.processors.dispatchers import get_energy_modeling_dispatches
 from eemeter.structures import (
     ModelingPeriod,
@@ -75,3 +78,22 @@ def test_placeholder_trace(modeling_period_set, placeholder_trace_set):
 
     assert len(dispatches) == 1
     assert dispatches["trace"] is None
+
+
+def test_fit_cache(modeling_period_set, trace_set):
+    fit_cache = SqliteFitCache(tempfile.mkdtemp())
+    dispatches = get_energy_modeling_dispatches(
+        modeling_period_set, trace_set, fit_cache)
+
+    model_mapping = dispatches["trace"].model_mapping
+    assert model_mapping["modeling_period_1"].fit_cache is fit_cache
+    assert model_mapping["modeling_period_2"].fit_cache is fit_cache
+
+
+def test_solver(modeling_period_set, trace_set):
+    dispatches = get_energy_modeling_dispatches(
+        modeling_period_set, trace_set, solver="ridge")
+
+    model_mapping = dispatches["trace"].model_mapping
+    assert model_mapping["modeling_period_1"].solver == "ridge"
+    assert model_mapping["modeling_period_2"].solver == "ridge"
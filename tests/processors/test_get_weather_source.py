@@ -1,3 +1,5 @@
+import tempfile
+
 import pytest
 
 from eemeter.structures import (
@@ -7,6 +9,7 @@ from eemeter.structures import (
 )
 
 from eemeter.processors.location import get_weather_source
+from eemeter.weather import WeatherSourceRegistry
 
 
 @pytest.fixture
@@ -39,3 +42,13 @@ def test_bad_zip(project_bad_zip):
     ws = get_weather_source(project_bad_zip)
 
     assert ws is None
+
+
+def test_registry(project):
+    registry = WeatherSourceRegistry(cache_directory=tempfile.mkdtemp())
+
+    ws1 = get_weather_source(project, registry)
+    ws2 = get_weather_source(project, registry)
+
+    assert ws1.station == '722880'
+    assert ws1 is ws2
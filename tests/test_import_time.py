@@ -0,0 +1,42 @@
+import sys
+
+import pytest
+
+import eemeter.weather
+from eemeter.testing.importtime import (
+    DEFERRED_MODULES,
+    ENTRY_POINTS,
+    imported_modules,
+    measure_import_time,
+)
+
+
+@pytest.mark.skipif(sys.version_info < (3, 7),
+                    reason="package attributes are imported eagerly")
+@pytest.mark.parametrize('entry_point', ENTRY_POINTS)
+def test_entry_point_defers_heavy_imports(entry_point):
+    modules = imported_modules(entry_point)
+    assert entry_point in modules
+    loaded = [name for name in DEFERRED_MODULES
+              if any(module == name or module.startswith(name + ".")
+                     for module in modules)]
+    assert loaded == []
+
+
+@pytest.mark.skipif(sys.version_info < (3, 7),
+                    reason="python -X importtime not available")
+def test_measure_import_time():
+    total, imports = measure_import_time("eemeter.weather.location")
+    assert total > 0
+    assert imports["eemeter.weather.location"] == total
+    assert "eemeter.weather.resource_pack" in imports
+    assert "site" not in imports
+
+
+def test_lazy_package_attributes():
+    assert "ISDWeatherSource" in dir(eemeter.weather)
+    from eemeter.weather import ISDWeatherSource
+    from eemeter.weather.noaa import ISDWeatherSource as _ISDWeatherSource
+    assert ISDWeatherSource is _ISDWeatherSource
+    with pytest.raises(AttributeError):
+        eemeter.weather.NotAWeatherSource
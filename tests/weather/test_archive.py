@@ -0,0 +1,176 @@
+import os
+import pickle
+import tempfile
+
+import numpy as np
+from numpy.testing import assert_allclose
+import pandas as pd
+import pytest
+
+from eemeter.weather import ArchiveWeatherSource, ISDWeatherSource
+from eemeter.weather.archive import (
+    TemperatureArchive,
+    build_archive,
+    open_archive,
+    write_archive,
+)
+from eemeter.testing import MockWeatherClient
+
+
+@pytest.fixture
+def archive_path():
+    index = pd.date_range('2000-01-01', periods=72, freq='H', tz='UTC')
+    series_by_station = {
+        "722880": pd.Series(np.arange(72, dtype=float), index=index),
+        "111111": pd.Series(np.full(72, 10.), index=index),
+    }
+    series_by_station["722880"].iloc[30] = np.nan
+    path = os.path.join(tempfile.mkdtemp(), "archive.bin")
+    write_archive(path, series_by_station, "2000-01-01", "2000-01-03")
+    return path
+
+
+@pytest.fixture
+def archive_weather_source(archive_path):
+    return ArchiveWeatherSource("722880", archive_path)
+
+
+def test_archive(archive_path):
+    archive = TemperatureArchive(archive_path)
+    assert len(archive) == 2
+    assert "111111" in archive
+    assert "222222" not in archive
+    assert archive.start == pd.Timestamp('2000-01-01', tz='UTC')
+    assert archive.end == pd.Timestamp('2000-01-03', tz='UTC')
+
+    data = archive.station_data("722880")
+    assert isinstance(data, np.memmap)
+    assert data.shape == (48,)
+    assert_allclose(data[:3], [0, 1, 2])
+    assert np.isnan(data[30])
+    assert_allclose(archive.station_data("111111"), 10)
+
+    with pytest.raises(KeyError):
+        archive.station_data("222222")
+
+
+def test_open_archive(archive_path):
+    archive = open_archive(archive_path)
+    assert open_archive(archive_path) is archive
+    assert pickle.loads(pickle.dumps(archive)) is archive
+
+    # rewriting the archive replaces the shared instance
+    write_archive(archive_path, {}, "2000-01-01", "2000-01-02")
+    assert len(open_archive(archive_path)) == 0
+
+
+def test_bad_archive():
+    path = os.path.join(tempfile.mkdtemp(), "archive.bin")
+    with open(path, "wb") as f:
+        f.write(b"x" * 100)
+    with pytest.raises(ValueError):
+        TemperatureArchive(path)
+
+
+def test_hourly_by_index(archive_weather_source):
+    index = pd.date_range('2000-01-01 01:00:00Z', periods=3, freq='H')
+    temps = archive_weather_source.indexed_temperatures(index, 'degC')
+    assert all(temps.index == index)
+    assert_allclose(temps.values, [1, 2, 3])
+    assert np.shares_memory(temps.values, archive_weather_source.archive.data)
+
+    temps = archive_weather_source.indexed_temperatures(index, 'degF')
+    assert_allclose(temps.values, [33.8, 35.6, 37.4], rtol=1e-6)
+
+
+def test_hourly_out_of_range(archive_weather_source):
+    index = pd.date_range('1999-12-31 23:00:00Z', periods=3, freq='H')
+    temps = archive_weather_source.indexed_temperatures(index, 'degC')
+    assert_allclose(temps.values, [np.nan, 0, 1])
+
+    index = pd.date_range('2000-01-05', periods=3, freq='H', tz='UTC')
+    temps = archive_weather_source.indexed_temperatures(index, 'degC')
+    assert temps.isnull().all()
+
+
+def test_daily_by_index(archive_weather_source):
+    index = pd.date_range('2000-01-01', periods=3, freq='D', tz='UTC')
+    temps = archive_weather_source.indexed_temperatures(index, 'degC')
+    assert all(temps.index == index)
+    expected = [np.mean(np.arange(24)),
+                np.mean([h for h in range(24, 48) if h != 30]),
+                np.nan]
+    assert_allclose(temps.values, expected, rtol=1e-6)
+
+
+def test_mixed_frequency(archive_weather_source):
+    index = pd.DatetimeIndex(['2000-01-01 00:00', '2000-01-01 02:30',
+                              '2000-01-01 05:00'], tz='UTC')
+    temps = archive_weather_source.indexed_temperatures(
+        index, 'degC', allow_mixed_frequency=True)
+    assert temps.index.names == ["period", "hourly"]
+    assert temps.shape == (5, 1)
+    assert_allclose(temps[0].values, [0, 1, 2, 3, 4])
+    periods = temps.index.get_level_values("period")
+    assert all(periods == index[[0, 0, 0, 1, 1]])
+
+    with pytest.raises(ValueError):
+        archive_weather_source.indexed_temperatures(index, 'degC')
+
+
+def test_empty_index(archive_weather_source):
+    index = pd.DatetimeIndex([], tz='UTC')
+    temps = archive_weather_source.indexed_temperatures(index, 'degC')
+    assert temps.shape == (0,)
+
+
+def test_tempC(archive_weather_source):
+    tempC = archive_weather_source.tempC
+    assert tempC.shape == (48,)
+    assert tempC.index[0] == pd.Timestamp('2000-01-01', tz='UTC')
+    assert np.shares_memory(tempC.values, archive_weather_source.archive.data)
+
+
+def test_default_archive_filename(archive_path):
+    directory = os.path.dirname(archive_path)
+    os.rename(archive_path, os.path.join(directory, "weather_archive.bin"))
+    ws = ArchiveWeatherSource("111111", directory)
+    assert ws.archive.path.endswith("weather_archive.bin")
+
+
+def test_bad_station(archive_path):
+    with pytest.raises(ValueError):
+        ArchiveWeatherSource("222222", archive_path)
+
+
+def test_pickle(archive_weather_source):
+    ws = pickle.loads(pickle.dumps(archive_weather_source))
+    assert ws.station == "722880"
+    assert ws.archive is archive_weather_source.archive
+
+
+def test_repr(archive_weather_source):
+    assert 'ArchiveWeatherSource("722880")' == str(archive_weather_source)
+
+
+class MockISDWeatherSource(ISDWeatherSource):
+
+    def __init__(self, station, cache_directory=None):
+        super(MockISDWeatherSource, self).__init__(station, cache_directory)
+        self.client = MockWeatherClient()
+
+
+def test_build_archive():
+    tmp_dir = tempfile.mkdtemp()
+    path = os.path.join(tmp_dir, "archive.bin")
+    archive = build_archive(path, ["722880"], 2000, 2000,
+                            weather_source_class=MockISDWeatherSource,
+                            cache_directory=tmp_dir)
+
+    assert archive.n_hours == 366 * 24
+    ws = ArchiveWeatherSource("722880", archive)
+    isd = MockISDWeatherSource("722880", tmp_dir)
+    isd.add_year(2000)
+    index = pd.date_range('2000-06-01', periods=48, freq='H', tz='UTC')
+    assert_allclose(ws.indexed_temperatures(index, 'degC').values,
+                    isd.tempC[index].values, rtol=1e-6)
@@ -0,0 +1,239 @@
+import gzip
+from io import BytesIO
+import threading
+
+import numpy as np
+from numpy.testing import assert_allclose
+import pandas as pd
+import pytest
+
+from eemeter.testing import MockFTPServer
+from eemeter.weather.clients import (
+    FTPConnectionPool,
+    NOAAClient,
+    parse_gsod_data,
+    parse_isd_data,
+    parse_tmy3_data,
+)
+
+
+def _isd_line(timestamp, temp):
+    return (
+        b"0" * 15 + timestamp.encode("ascii") + b"X" * 60 +
+        temp.encode("ascii") + b"1ADDAA101000091\n"
+    )
+
+
+def test_parse_isd_data():
+    lines = [
+        _isd_line("201401010000", "+0010"),
+        _isd_line("201401010100", "+9999"),
+        _isd_line("201401010200", "-0025"),
+        _isd_line("201401010200", "-0030"),  # duplicate: last one wins
+        _isd_line("201401010251", "+0040"),  # off the hourly grid
+        _isd_line("201401010100", "+0020"),
+        _isd_line("201401010251", "+0050"),
+    ]
+    series = parse_isd_data(lines, 2014)
+
+    grid = pd.date_range('2014-01-01', '2015-12-31 23:00', freq='H',
+                         tz='UTC')
+    assert series.shape == (grid.shape[0] + 1,)
+    assert all(series.index[:-1] == grid)
+    assert series.index[-1] == pd.Timestamp('2014-01-01 02:51', tz='UTC')
+    assert_allclose(series.values[[0, 1, 2, 3, -1]],
+                    [1.0, 2.0, -3.0, np.nan, 5.0])
+    assert series.iloc[3:-1].isnull().all()
+
+
+def test_parse_isd_data_missing_temperature():
+    series = parse_isd_data([_isd_line("201401010000", "+9999")], 2014)
+    assert series.index.freq == 'H'
+    assert series.isnull().all()
+
+
+def test_parse_isd_data_empty():
+    series = parse_isd_data([], 2014)
+    assert series.shape == (2 * 365 * 24,)
+    assert series.isnull().all()
+
+
+def test_parse_isd_data_invalid_date():
+    with pytest.raises(ValueError):
+        parse_isd_data([_isd_line("201402300000", "+0010")], 2014)
+    with pytest.raises(ValueError):
+        parse_isd_data([_isd_line("2014010100XX", "+0010")], 2014)
+
+
+def _gsod_line(date, temp):
+    return (
+        "722880 23152  {}    {} 24    38.3 24  1016.7 24  1000.2 24"
+        "   10.0 24    3.1 24    8.0  999.9    75.2*   41.0   0.00G 999.9"
+        "  000000\n".format(date, temp).encode("ascii")
+    )
+
+
+def test_parse_gsod_data():
+    lines = [
+        b"STN--- WBAN   YEARMODA    TEMP       DEWP      SLP        STP\n",
+        _gsod_line("20140101", "32.0"),
+        _gsod_line("20140102", "50.0"),
+        _gsod_line("20140101", "41.0"),  # duplicate: last one wins
+    ]
+    series = parse_gsod_data(lines, 2014)
+    assert series.index.freq == 'D'
+    assert series.shape == (365,)
+    assert_allclose(series.values[:3], [5.0, 10.0, np.nan])
+    assert series.iloc[2:].isnull().all()
+
+
+def test_parse_gsod_data_empty():
+    series = parse_gsod_data([b"STN--- WBAN   YEARMODA    TEMP\n"], 2014)
+    assert series.shape == (365,)
+    assert series.isnull().all()
+
+
+def _tmy3_text(utc_offset, rows):
+    header = "690150,\"TWENTYNINE PALMS\",CA,{},34.300,-116.167,626\n" \
+        .format(utc_offset)
+    columns = "Date (MM/DD/YYYY),Time (HH:MM),{}\n".format(
+        ",".join("Column {}".format(i) for i in range(2, 68)))
+    lines = [
+        ",".join([date, time] + ["0"] * 29 + [temp] + ["0"] * 36)
+        for date, time, temp in rows
+    ]
+    return header + columns + "\n".join(lines) + "\n"
+
+
+def test_parse_tmy3_data():
+    text = _tmy3_text("-8.0", [
+        ("01/01/1988", "01:00", "10.0"),
+        ("01/01/1988", "02:00", "11.0"),
+        ("12/31/1988", "24:00", "12.0"),
+    ])
+    series = parse_tmy3_data(text)
+    assert series.index.freq == 'H'
+    assert series.shape == (8760,)
+    assert_allclose(series[[
+        pd.Timestamp('1900-01-01 08:00', tz='UTC'),
+        pd.Timestamp('1900-01-01 09:00', tz='UTC'),
+        # wrapped around from 1901-01-01 07:00 UTC
+        pd.Timestamp('1900-01-01 07:00', tz='UTC'),
+    ]].values, [10.0, 11.0, 12.0])
+    assert series.notnull().sum() == 3
+
+
+def test_parse_tmy3_data_fractional_offset():
+    series = parse_tmy3_data(_tmy3_text("-3.5", [
+        ("01/01/1988", "01:00", "10.0"),
+    ]))
+    assert series.shape == (8761,)
+    assert series.index[-1] == pd.Timestamp('1900-01-01 03:30', tz='UTC')
+    assert_allclose(series.values[-1], 10.0)
+
+
+def _gzip(lines):
+    string = BytesIO()
+    with gzip.GzipFile(fileobj=string, mode="wb") as f:
+        f.write(b"".join(lines))
+    return string.getvalue()
+
+
+@pytest.fixture
+def ftp_server():
+    files = {
+        "/pub/data/noaa/2014/722880-23152-2014.gz": _gzip([
+            _isd_line("201401010000", "+0010"),
+        ]),
+        "/pub/data/noaa/2015/722880-99999-2015.gz": _gzip([
+            _isd_line("201501010000", "+0020"),
+        ]),
+    }
+    with MockFTPServer(files) as server:
+        yield server
+
+
+def test_noaa_client_get_isd_data(ftp_server):
+    client = NOAAClient(host=ftp_server.host, port=ftp_server.port)
+    series = client.get_isd_data("722880", 2014)
+    assert_allclose(series.values[0], 1.0)
+
+    # falls back to the other station id
+    series = client.get_isd_data("722880", 2015)
+    assert_allclose(series.values[0], 2.0)
+    assert ftp_server.retrieved[1:] == [
+        "/pub/data/noaa/2015/722880-23152-2015.gz",
+        "/pub/data/noaa/2015/722880-99999-2015.gz",
+    ]
+
+    # one connection, reused
+    assert ftp_server.n_connections == 1
+
+
+def test_noaa_client_reconnect(ftp_server):
+    client = NOAAClient(host=ftp_server.host, port=ftp_server.port)
+    ftp_server.drop_connections(1)
+    series = client.get_isd_data("722880", 2014)
+    assert_allclose(series.values[0], 1.0)
+    assert ftp_server.n_connections == 2
+
+    series = client.get_isd_data("722880", 2014)
+    assert_allclose(series.values[0], 1.0)
+    assert ftp_server.n_connections == 2
+
+
+def test_noaa_client_concurrent(ftp_server):
+    client = NOAAClient(host=ftp_server.host, port=ftp_server.port,
+                        max_connections=2)
+    results = []
+
+    def _fetch():
+        results.append(client.get_isd_data("722880", 2014))
+
+    threads = [threading.Thread(target=_fetch) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(results) == 8
+    assert all(series.values[0] == 1.0 for series in results)
+    assert ftp_server.max_concurrent_connections <= 2
+    assert ftp_server.n_connections <= 2
+
+
+def test_ftp_connection_pool():
+    connections = []
+
+    class Connection(object):
+        closed = False
+
+        def close(self):
+            self.closed = True
+
+    def _connect():
+        connections.append(Connection())
+        return connections[-1]
+
+    pool = FTPConnectionPool(_connect, max_size=2, max_idle=60)
+    ftp1 = pool.get()
+    ftp2 = pool.get()
+    assert ftp1 is not ftp2
+
+    pool.put(ftp1)
+    assert pool.get() is ftp1
+
+    pool.discard(ftp2)
+    assert ftp2.closed
+    ftp3 = pool.get()
+    assert len(connections) == 3
+
+    # idle connections are replaced after max_idle
+    pool.max_idle = 0
+    pool.put(ftp3)
+    assert pool.get() is not ftp3
+    assert ftp3.closed
+
+    pool.put(ftp1)
+    pool.close()
+    assert ftp1.closed
@@ -0,0 +1,145 @@
+import tempfile
+
+import numpy as np
+from numpy.testing import assert_allclose
+import pandas as pd
+import pytest
+
+from eemeter.weather import ISDWeatherSource
+from eemeter.weather.degree_days import (
+    DegreeDayTable,
+    temperature_fingerprint,
+)
+from eemeter.testing import MockWeatherClient
+
+
+@pytest.fixture
+def hourly_tempC():
+    index = pd.date_range('2016-01-01 00:00:00Z', periods=24 * 10, freq='H')
+    tempC = pd.Series(np.arange(24 * 10) % 30 - 5., index=index)
+    tempC.iloc[30:40] = np.nan
+    return tempC
+
+
+@pytest.fixture
+def mock_isd_weather_source():
+    tmp_dir = tempfile.mkdtemp()
+    ws = ISDWeatherSource("722880", tmp_dir)
+    ws.client = MockWeatherClient()
+    return ws
+
+
+def test_period_degree_days(hourly_tempC):
+    table = DegreeDayTable(hourly_tempC, "H")
+    index = pd.DatetimeIndex(['2016-01-01 05:00', '2016-01-03', '2016-01-03',
+                              '2016-01-09 12:00'], tz='UTC')
+    degree_days = table.period_degree_days(index, 65, 60)
+    assert list(degree_days.columns) == ["CDD", "HDD"]
+    assert all(degree_days.index == index[:-1])
+
+    tempF = hourly_tempC * 1.8 + 32
+    for i in [0, 2]:
+        period = tempF[index[i]:index[i + 1] - pd.Timedelta('1H')]
+        cdd = max((period - 65).sum() / 24., 0)
+        hdd = max((60 - period).sum() / 24., 0)
+        assert_allclose(degree_days.CDD.iloc[i], cdd)
+        assert_allclose(degree_days.HDD.iloc[i], hdd)
+
+    # empty period
+    assert np.isnan(degree_days.CDD.iloc[1])
+    assert np.isnan(degree_days.HDD.iloc[1])
+
+
+def test_daily_degree_days(hourly_tempC):
+    table = DegreeDayTable(hourly_tempC, "H")
+    index = pd.date_range('2016-01-01', periods=4, freq='3D', tz='UTC')
+    daily_means = (hourly_tempC * 1.8 + 32).resample('D').mean()
+
+    for base_temp in [65, 62.5]:
+        degree_days = table.daily_degree_days(index, base_temp, base_temp)
+        cdd = np.maximum(daily_means - base_temp, 0)
+        hdd = np.maximum(base_temp - daily_means, 0)
+        for i in range(3):
+            days = slice(index[i], index[i + 1] - pd.Timedelta('1D'))
+            assert_allclose(degree_days.CDD.iloc[i], cdd[days].sum())
+            assert_allclose(degree_days.HDD.iloc[i], hdd[days].sum())
+    assert 62.5 in table.base_temps
+
+    with pytest.raises(ValueError):
+        table.daily_degree_days(
+            pd.DatetimeIndex(['2016-01-01 01:00', '2016-01-02'], tz='UTC'),
+            65, 65)
+
+
+def test_serialization_round_trip(hourly_tempC):
+    table = DegreeDayTable(hourly_tempC, "H", base_temps=[60, 65])
+    table.add_base_temp(62.5)
+    deserialized = DegreeDayTable.deserialize(table.serialize())
+    assert deserialized.fingerprint == table.fingerprint
+    assert deserialized.base_temps == [60., 62.5, 65.]
+    assert_allclose(deserialized.sums, table.sums)
+    assert_allclose(deserialized.counts, table.counts)
+    assert_allclose(deserialized.daily_means, table.daily_means)
+
+    index = pd.date_range('2016-01-01', periods=3, freq='4D', tz='UTC')
+    assert_allclose(deserialized.daily_degree_days(index, 62.5, 60).values,
+                    table.daily_degree_days(index, 62.5, 60).values)
+
+    with pytest.raises(ValueError):
+        DegreeDayTable.deserialize(b"EETS" + table.serialize()[4:])
+
+
+def test_concatenate(hourly_tempC):
+    table = DegreeDayTable(hourly_tempC, "H", base_temps=[65])
+    joined = DegreeDayTable.concatenate([
+        DegreeDayTable(hourly_tempC[:24 * 3], "H", base_temps=[65]),
+        DegreeDayTable(hourly_tempC[24 * 3:], "H", base_temps=[60]),
+    ])
+    assert joined.base_temps == [60., 65.]
+    assert_allclose(joined.sums, table.sums)
+    assert_allclose(joined.counts, table.counts)
+    assert_allclose(joined.daily_means, table.daily_means)
+
+    index = pd.date_range('2016-01-01', periods=3, freq='4D', tz='UTC')
+    assert_allclose(joined.daily_degree_days(index, 65, 60).values,
+                    table.daily_degree_days(index, 65, 60).values)
+
+    with pytest.raises(ValueError):
+        DegreeDayTable.concatenate([
+            DegreeDayTable(hourly_tempC[:24 * 3], "H"),
+            DegreeDayTable(hourly_tempC[24 * 4:], "H"),
+        ])
+
+
+def test_temperature_fingerprint(hourly_tempC):
+    fingerprint = temperature_fingerprint(hourly_tempC, "H")
+    assert fingerprint == temperature_fingerprint(hourly_tempC.copy(), "H")
+    changed = hourly_tempC.copy()
+    changed.iloc[0] += 1
+    assert fingerprint != temperature_fingerprint(changed, "H")
+    assert fingerprint != temperature_fingerprint(hourly_tempC[1:], "H")
+
+
+def test_weather_source_degree_days(mock_isd_weather_source):
+    index = pd.DatetimeIndex(['2012-01-01', '2012-01-31', '2012-03-01'],
+                             tz='UTC')
+    degree_days = mock_isd_weather_source.indexed_degree_days(index, 65, 65)
+    assert_allclose(degree_days.CDD.values, [0, 0])
+    assert_allclose(degree_days.HDD.values, [33 * 30, 33 * 30])
+
+    table = mock_isd_weather_source.degree_day_table()
+    assert mock_isd_weather_source.degree_day_table([62.5]) is table
+    assert 62.5 in table.base_temps
+
+    # persisted next to the cached temperatures
+    assert mock_isd_weather_source.json_store.key_exists(
+        "ISD-722880-2012-degree-days.bin")
+    ws = ISDWeatherSource(
+        "722880", mock_isd_weather_source.json_store.directory)
+    ws.client = MockWeatherClient()
+    ws.add_year_range(2012, 2012)
+    assert ws.degree_day_table().fingerprint == table.fingerprint
+
+    empty = mock_isd_weather_source.indexed_degree_days(
+        pd.DatetimeIndex([], tz='UTC'), 65, 65)
+    assert empty.shape == (0, 2)
@@ -0,0 +1,143 @@
+from datetime import datetime, timedelta
+import tempfile
+import threading
+
+from numpy.testing import assert_allclose
+import pandas as pd
+import pytest
+
+from eemeter.weather import ISDWeatherSource
+from eemeter.weather.freshness import (
+    BackgroundRefresher,
+    BackgroundRefreshPolicy,
+    MaxAgePolicy,
+    NeverRefreshPolicy,
+)
+
+
+class Client(object):
+
+    def __init__(self, value, ready=None):
+        self.value = value
+        self.ready = ready
+        self.fetched = []
+
+    def get_isd_data(self, station, year):
+        if self.ready is not None:
+            self.ready.wait()
+        self.fetched.append((station, year))
+        index = pd.date_range("{}-01-01".format(year), periods=48, freq='H',
+                              tz='UTC')
+        return pd.Series(self.value, index=index, dtype=float)
+
+
+@pytest.fixture
+def stale_cache_directory():
+    # current-year data cached two days ago, historical data cached too.
+    tmp_dir = tempfile.mkdtemp()
+    ws = ISDWeatherSource("722880", tmp_dir,
+                          freshness_policy=NeverRefreshPolicy())
+    ws.client = Client(1.0)
+    year = (datetime.now() - timedelta(days=1)).year
+    ws.add_year(year)
+    ws.add_year(2011)
+
+    fetched = datetime.utcnow() - timedelta(days=2)
+    ws.json_store.conn.execute(
+        "UPDATE items SET dt=?", (fetched.strftime("%Y-%m-%d %H:%M:%S"),))
+    ws.json_store.conn.commit()
+    return tmp_dir, year
+
+
+class LocalISDWeatherSource(ISDWeatherSource):
+    client = None
+
+    def _check_station(self, station):
+        pass
+
+
+def _year_index(year):
+    return pd.date_range("{}-01-01".format(year), periods=2, freq='H',
+                         tz='UTC')
+
+
+def test_is_stale():
+    now = datetime(2016, 6, 2, 12)
+    policy = MaxAgePolicy(timedelta(days=1))
+    assert policy.is_stale(datetime(2016, 6, 1), now)
+    assert not policy.is_stale(datetime(2016, 6, 2), now)
+    assert not policy.is_stale(None, now)
+    assert not NeverRefreshPolicy().is_stale(datetime(2000, 1, 1), now)
+
+
+def test_max_age_policy(stale_cache_directory):
+    tmp_dir, year = stale_cache_directory
+
+    class RefetchingISDWeatherSource(LocalISDWeatherSource):
+        client = Client(2.0)
+
+    # refetched before the weather source is used
+    ws = RefetchingISDWeatherSource("722880", tmp_dir)
+    assert str(ws.freshness_policy) == \
+        "MaxAgePolicy(max_age=datetime.timedelta(days=1))"
+    assert ws.client.fetched == [("722880", year)]
+    temps = ws.indexed_temperatures(_year_index(year), 'degC')
+    assert_allclose(temps.values, [2, 2])
+
+
+def test_never_refresh_policy(stale_cache_directory):
+    tmp_dir, year = stale_cache_directory
+    ws = ISDWeatherSource("722880", tmp_dir,
+                          freshness_policy=NeverRefreshPolicy())
+    ws.client = None  # must not fetch
+    temps = ws.indexed_temperatures(_year_index(year), 'degC')
+    assert_allclose(temps.values, [1, 1])
+
+
+def test_background_refresh_policy(stale_cache_directory):
+    tmp_dir, year = stale_cache_directory
+    ready = threading.Event()
+    refresher = BackgroundRefresher()
+    policy = BackgroundRefreshPolicy(refresher=refresher)
+
+    class BlockingISDWeatherSource(LocalISDWeatherSource):
+        client = Client(3.0, ready)
+
+    # creating the source and using historical data doesn't wait for the
+    # network
+    ws = BlockingISDWeatherSource("722880", tmp_dir, freshness_policy=policy)
+    temps = ws.indexed_temperatures(_year_index(2011), 'degC')
+    assert_allclose(temps.values, [1, 1])
+    temps = ws.indexed_temperatures(_year_index(year), 'degC')
+    assert_allclose(temps.values, [1, 1])
+
+    # already queued
+    assert not refresher.submit(ws, year)
+
+    ready.set()
+    refresher.join()
+    assert ws.client.fetched == [("722880", year)]
+    temps = ws.indexed_temperatures(_year_index(year), 'degC')
+    assert_allclose(temps.values, [3, 3])
+
+    # saved to the cache
+    ws2 = ISDWeatherSource("722880", tmp_dir,
+                           freshness_policy=NeverRefreshPolicy())
+    ws2.client = None  # must not fetch
+    temps = ws2.indexed_temperatures(_year_index(year), 'degC')
+    assert_allclose(temps.values, [3, 3])
+    assert not policy.is_stale(ws2.json_store.retrieve_datetime(
+        ws2._get_cache_key(year)), datetime.utcnow())
+
+
+def test_background_refresh_failure(stale_cache_directory):
+    tmp_dir, year = stale_cache_directory
+    refresher = BackgroundRefresher()
+    ws = LocalISDWeatherSource(  # fails in the background
+        "722880", tmp_dir,
+        freshness_policy=BackgroundRefreshPolicy(refresher=refresher))
+    refresher.join()
+    temps = ws.indexed_temperatures(_year_index(year), 'degC')
+    assert_allclose(temps.values, [1, 1])
+    assert refresher.submit(ws, year)
+    refresher.join()
@@ -0,0 +1,102 @@
+import numpy as np
+from numpy.testing import assert_allclose
+import pandas as pd
+import pytest
+
+from eemeter.weather.grid import TemperatureGrid, window_means
+
+
+def _series(start, values, freq='H'):
+    index = pd.date_range(start, periods=len(values), freq=freq, tz='UTC')
+    return pd.Series(values, index=index, dtype=float)
+
+
+def test_write():
+    grid = TemperatureGrid('H')
+    assert grid.series().shape == (0,)
+
+    grid.write(_series('2012-01-01', [1, np.nan, 3]))
+    assert grid.start_year == 2012
+    assert grid.end_year == 2013
+    series = grid.series()
+    assert series.index.freq == 'H'
+    assert series.index[0] == pd.Timestamp('2012-01-01', tz='UTC')
+    assert_allclose(series.values, [1, np.nan, 3])
+
+    # later years extend the covered range; the allocation at least doubles
+    grid.write(_series('2013-12-31 23:00', [4]))
+    assert grid.end_year == 2014
+    grid.write(_series('2015-01-01', [5]))
+    assert grid.end_year == 2016
+    series = grid.series()
+    assert series.index[-1] == pd.Timestamp('2015-01-01', tz='UTC')
+    assert_allclose(series.values[:3], [1, np.nan, 3])
+    assert_allclose(series[pd.Timestamp('2013-12-31 23:00', tz='UTC')], 4)
+
+    # so do earlier years
+    grid.write(_series('2010-06-01', [6]))
+    assert grid.start_year <= 2010
+    series = grid.series()
+    assert series.index[0] == pd.Timestamp('2010-06-01', tz='UTC')
+    start = pd.Timestamp('2012-01-01', tz='UTC')
+    assert_allclose(series[start:start + pd.Timedelta('2H')].values,
+                    [1, np.nan, 3])
+    assert_allclose(series[pd.Timestamp('2015-01-01', tz='UTC')], 5)
+
+
+def test_write_averages_and_replaces():
+    grid = TemperatureGrid('H')
+    grid.write(_series('2012-01-01', [1, 2]))
+
+    index = pd.DatetimeIndex(['2012-01-01 00:51', '2012-01-01 00:10',
+                              '2012-01-01 01:00'], tz='UTC')
+    grid.write(pd.Series([3, 5, np.nan], index=index))
+    assert_allclose(grid.series().values, [4, 2])
+
+
+def test_series_is_a_view():
+    grid = TemperatureGrid('D')
+    grid.write(_series('2012-01-01', [1, 2], freq='D'))
+    assert np.shares_memory(grid.series().values, grid.values)
+
+
+def test_lookup():
+    grid = TemperatureGrid('H')
+    assert grid.positions(pd.date_range('2012-01-01', periods=2, freq='H',
+                                        tz='UTC')) is None
+    grid.write(_series('2012-01-01 01:00', [1, 2, 3]))
+
+    index = pd.date_range('2012-01-01', periods=5, freq='H', tz='UTC')
+    positions = grid.positions(index)
+    assert_allclose(grid.lookup(positions), [np.nan, 1, 2, 3, np.nan])
+
+    # not on the grid
+    assert grid.positions(index + pd.Timedelta('30 min')) is None
+    assert grid.positions(index.tz_localize(None)) is None
+
+
+def test_window_means():
+    grid = TemperatureGrid('H')
+    grid.write(_series('2012-01-01', [np.nan] + list(range(1, 48))))
+
+    index = pd.date_range('2011-12-31', periods=4, freq='D', tz='UTC')
+    means = grid.window_means(grid.positions(index), 24)
+    assert_allclose(means, [np.nan, np.mean(range(1, 24)),
+                            np.mean(range(24, 48)), np.nan])
+
+    # windows partly outside the covered range
+    index = pd.DatetimeIndex(['2012-01-01 12:00', '2011-12-31 20:00'],
+                             tz='UTC')
+    means = grid.window_means(grid.positions(index), 24)
+    assert_allclose(means, [np.mean(range(12, 36)), np.mean(range(1, 20))])
+
+
+def test_window_means_function():
+    values = np.array([1., np.nan, 3., np.nan, np.nan])
+    assert_allclose(window_means(values, np.array([0, 1, 3]), 2),
+                    [1., 3., np.nan])
+
+
+def test_bad_freq():
+    with pytest.raises(ValueError):
+        TemperatureGrid('M')
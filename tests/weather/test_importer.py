@@ -0,0 +1,143 @@
+import gzip
+import os
+import tempfile
+
+import numpy as np
+from numpy.testing import assert_allclose
+import pandas as pd
+import pytest
+
+from eemeter.weather import GSODWeatherSource, ISDWeatherSource
+from eemeter.weather.cache import SqliteJSONStore
+from eemeter.weather.importer import import_noaa_mirror, main
+
+
+class OfflineClient(object):
+
+    def get_gsod_data(self, station, year):
+        raise AssertionError("Unexpected fetch.")
+
+    def get_isd_data(self, station, year):
+        raise AssertionError("Unexpected fetch.")
+
+
+def _write_gzip(path, lines):
+    directory = os.path.dirname(path)
+    if not os.path.exists(directory):
+        os.makedirs(directory)
+    with gzip.open(path, "wb") as f:
+        f.write(b"".join(lines))
+
+
+def _isd_line(timestamp, temp):
+    return (
+        b"0" * 15 + timestamp.encode("ascii") + b"X" * 60 +
+        temp.encode("ascii") + b"\n"
+    )
+
+
+@pytest.fixture
+def mirror_directory():
+    mirror_directory = tempfile.mkdtemp()
+    isd = os.path.join(mirror_directory, "pub", "data", "noaa")
+    gsod = os.path.join(mirror_directory, "pub", "data", "gsod")
+
+    for year in [2014, 2015]:
+        _write_gzip(
+            os.path.join(isd, str(year), "725300-94846-{}.gz".format(year)),
+            [_isd_line("{}01010000".format(year), "+0010"),
+             _isd_line("{}01010100".format(year), "+0020")])
+
+    # 722880-23152 is tried before 722880-99999
+    _write_gzip(os.path.join(isd, "2014", "722880-99999-2014.gz"),
+                [_isd_line("201401010000", "+0100")])
+    _write_gzip(os.path.join(isd, "2014", "722880-23152-2014.gz"),
+                [_isd_line("201401010000", "+0050")])
+
+    # unknown station
+    _write_gzip(os.path.join(isd, "2014", "000000-00000-2014.gz"),
+                [_isd_line("201401010000", "+0100")])
+
+    _write_gzip(
+        os.path.join(gsod, "2014", "725300-94846-2014.op.gz"),
+        [b"STN--- WBAN   YEARMODA    TEMP\n",
+         b"725300 94846  20140101    50.0 24\n"])
+
+    return mirror_directory
+
+
+@pytest.mark.parametrize("n_processes", [1, 2])
+def test_import_noaa_mirror(mirror_directory, n_processes):
+    cache_directory = tempfile.mkdtemp()
+    n_imported, n_failed = import_noaa_mirror(
+        mirror_directory, cache_directory, n_processes=n_processes,
+        batch_size=2)
+    assert n_imported == {"isd": 3, "gsod": 1}
+    assert n_failed == {"isd": 0, "gsod": 0}
+
+    ws = ISDWeatherSource("725300", cache_directory)
+    ws.client = OfflineClient()
+    index = pd.date_range('2015-01-01', periods=3, freq='H', tz='UTC')
+    assert_allclose(ws.indexed_temperatures(index, 'degC').values,
+                    [1.0, 2.0, np.nan])
+
+    ws = ISDWeatherSource("722880", cache_directory)
+    ws.client = OfflineClient()
+    index = pd.date_range('2014-01-01', periods=1, freq='H', tz='UTC')
+    assert_allclose(ws.indexed_temperatures(index, 'degC').values, [5.0])
+
+    ws = GSODWeatherSource("725300", cache_directory)
+    ws.client = OfflineClient()
+    index = pd.date_range('2014-01-01', periods=1, freq='D', tz='UTC')
+    assert_allclose(ws.indexed_temperatures(index, 'degC').values, [10.0])
+
+    # already cached
+    n_imported, _ = import_noaa_mirror(mirror_directory, cache_directory,
+                                       n_processes=n_processes)
+    assert n_imported == {"isd": 0, "gsod": 0}
+
+
+@pytest.mark.parametrize("n_processes", [1, 2])
+def test_import_noaa_mirror_corrupt_file(mirror_directory, n_processes):
+    path = os.path.join(mirror_directory, "pub", "data", "noaa", "2014",
+                        "725300-94846-2014.gz")
+    with open(path, "rb") as f:
+        data = f.read()
+    with open(path, "wb") as f:
+        f.write(data[:len(data) // 2])  # truncated
+
+    cache_directory = tempfile.mkdtemp()
+    n_imported, n_failed = import_noaa_mirror(
+        mirror_directory, cache_directory, datasets=["isd"],
+        n_processes=n_processes, batch_size=1)
+    assert n_imported == {"isd": 2}
+    assert n_failed == {"isd": 1}
+
+    store = SqliteJSONStore(cache_directory)
+    assert not store.key_exists("ISD-725300-2014.bin")
+    assert store.key_exists("ISD-725300-2015.bin")
+    assert store.key_exists("ISD-722880-2014.bin")
+
+
+def test_import_noaa_mirror_filters(mirror_directory):
+    cache_directory = tempfile.mkdtemp()
+    n_imported, _ = import_noaa_mirror(
+        mirror_directory, cache_directory, datasets=["isd"], years=[2015],
+        stations=["725300", "722880"], n_processes=1)
+    assert n_imported == {"isd": 1}
+
+    store = SqliteJSONStore(cache_directory)
+    assert store.key_exists("ISD-725300-2015.bin")
+    assert not store.key_exists("ISD-725300-2014.bin")
+
+
+def test_main(mirror_directory, capsys):
+    cache_directory = tempfile.mkdtemp()
+    main([mirror_directory, "--cache-directory", cache_directory,
+          "--dataset", "isd", "--years", "2013-2014", "--station", "725300",
+          "--processes", "1"])
+    out, _ = capsys.readouterr()
+    assert "isd: imported 1 station-years, 0 failed" in out
+
+    store = SqliteJSONStore(cache_directory)
+    assert store.key_exists("ISD-725300-2014.bin")
@@ -1,11 +1,21 @@
+import numpy as np
 from numpy.testing import assert_allclose
+import pandas as pd
 
 from eemeter.weather.location import (
+    SpatialIndex,
+    get_tmy3_station_index,
+    get_usaf_station_index,
+    get_zipcode_index,
     haversine,
     lat_lng_to_usaf_station,
     lat_lng_to_tmy3_station,
     lat_lng_to_zipcode,
     lat_lng_to_climate_zone,
+    lat_lngs_to_usaf_stations,
+    lat_lngs_to_tmy3_stations,
+    lat_lngs_to_zipcodes,
+    lat_lngs_to_climate_zones,
     usaf_station_to_lat_lng,
     usaf_station_to_zipcodes,
     usaf_station_to_climate_zone,
@@ -16,6 +26,10 @@ from eemeter.weather.location import (
     zipcode_to_usaf_station,
     zipcode_to_tmy3_station,
     zipcode_to_climate_zone,
+    zipcodes_to_lat_lngs,
+    zipcodes_to_usaf_stations,
+    zipcodes_to_tmy3_stations,
+    zipcodes_to_climate_zones,
     climate_zone_to_zipcodes,
     climate_zone_to_usaf_stations,
     climate_zone_to_tmy3_stations,
@@ -114,3 +128,78 @@ def test_tmy3_station_is_supported():
 
 def test_climate_zone_is_supported():
     assert climate_zone_is_supported('4|B|Mixed-Dry') is True
+
+
+def test_spatial_index_nearest():
+    index = SpatialIndex({'a': (0, 0), 'b': (0, 1), 'c': (0, 2)})
+    assert len(index) == 3
+    nearest = index.nearest(0, 0.9, k=2)
+    assert [key for key, _ in nearest] == ['b', 'a']
+    assert_allclose(nearest[0][1], haversine(0, 0.9, 0, 1))
+    assert len(index.nearest(0, 0, k=10)) == 3
+    assert index.nearest(0, 0, k=0) == []
+
+
+def test_spatial_index_nearest_ties():
+    index = SpatialIndex({'a': (0, -1), 'b': (0, 1)})
+    assert index.nearest(0, 0)[0][0] == 'a'
+
+
+def test_spatial_index_within():
+    index = SpatialIndex({'a': (0, 0), 'b': (0, 1), 'c': (0, 2)})
+    assert [key for key, _ in index.within(0, 0, 120)] == ['a', 'b']
+    assert index.within(10, 10, 1) == []
+
+
+def test_spatial_index_matches_brute_force():
+    index = get_usaf_station_index()
+    for lat, lng in [(40, -100), (38.5, -122.4), (21.3, -157.8)]:
+        dists = haversine(lat, lng, index.lats, index.lngs)
+        assert index.nearest(lat, lng)[0][0] == index.keys[np.argmin(dists)]
+
+
+def test_get_zipcode_index_is_shared():
+    assert get_zipcode_index() is get_zipcode_index()
+    assert get_tmy3_station_index() is get_tmy3_station_index()
+
+
+def test_spatial_index_nearest_many():
+    index = SpatialIndex({'a': (0, -1), 'b': (0, 1), 'c': (0, 2)})
+    keys, distances = index.nearest_many([0, 0, None, 0], [1.9, 0, 0, 0.8])
+    assert list(keys) == ['c', 'a', None, 'b']
+    assert_allclose(distances[[0, 3]], haversine(0, [1.9, 0.8], 0, [2, 1]))
+    assert np.isnan(distances[2])
+
+
+def test_lat_lngs_to_usaf_stations():
+    stations = lat_lngs_to_usaf_stations([40, 38.5, np.nan], [-100, -122.4, 0])
+    assert list(stations) == [
+        '725625', lat_lng_to_usaf_station(38.5, -122.4), None]
+
+
+def test_lat_lngs_to_tmy3_stations():
+    assert list(lat_lngs_to_tmy3_stations([45], [-90])) == ['726463']
+
+
+def test_lat_lngs_to_zipcodes_series():
+    lats = pd.Series([41.917904], index=['site-1'])
+    lngs = pd.Series([-78.762944], index=['site-1'])
+    zipcodes = lat_lngs_to_zipcodes(lats, lngs)
+    assert zipcodes['site-1'] == lat_lng_to_zipcode(41.917904, -78.762944)
+    assert list(lat_lngs_to_climate_zones(lats, lngs)) == [
+        lat_lng_to_climate_zone(41.917904, -78.762944)]
+
+
+def test_zipcodes_to_lat_lngs():
+    lats, lngs = zipcodes_to_lat_lngs(['16701', 'XXXXX'])
+    assert_allclose(lats[0], 41.917904)
+    assert_allclose(lngs[0], -78.762944)
+    assert np.isnan(lats[1]) and np.isnan(lngs[1])
+
+
+def test_zipcodes_to_stations_and_climate_zones():
+    assert list(zipcodes_to_usaf_stations(['82440', 'XXXXX'])) == [
+        '726700', None]
+    assert list(zipcodes_to_tmy3_stations(['19975'])) == ['745966']
+    climate_zones = zipcodes_to_climate_zones(pd.Series(['81050']))
+    assert climate_zones[0] == '4|B|Mixed-Dry'
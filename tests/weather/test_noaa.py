@@ -1,11 +1,15 @@
+import gzip
+from io import BytesIO
 import tempfile
 
+import numpy as np
 from numpy.testing import assert_allclose
 import pandas as pd
 import pytest
 
 from eemeter.weather import GSODWeatherSource, ISDWeatherSource
-from eemeter.testing import MockWeatherClient
+from eemeter.testing import MockFTPServer, MockWeatherClient
+from eemeter.weather.clients import NOAAClient
 
 
 @pytest.fixture
@@ -121,3 +125,108 @@ def test_bad_isd_station():
 
 def test_isd_repr(mock_isd_weather_source):
     assert str(mock_isd_weather_source) == 'ISDWeatherSource("722880")'
+
+
+def test_isd_binary_cache(mock_isd_weather_source):
+    ws = mock_isd_weather_source
+    ws.add_year(2011)
+    assert ws.json_store.key_exists('ISD-722880-2011.bin')
+
+    ws2 = ISDWeatherSource('722880', ws.json_store.directory)
+    ws2.client = None  # must not fetch
+    ws2.add_year(2011)
+    assert ws2.tempC.index.freq == 'H'
+    assert_allclose(ws2.tempC.values, ws.tempC.resample('H').mean().values)
+
+
+def test_isd_json_cache_migration(mock_isd_weather_source):
+    ws = mock_isd_weather_source
+    index = pd.date_range('2011-01-01', periods=3, freq='H', tz='UTC')
+    legacy_data = [
+        [d.strftime(ws.cache_date_format), t]
+        for d, t in zip(index, [1.5, None, 2.5])
+    ]
+    ws.json_store.save_json('ISD-722880-2011.json', legacy_data)
+    fetched = ws.json_store.retrieve_datetime('ISD-722880-2011.json')
+
+    ws.client = None  # must not fetch
+    ws.add_year(2011)
+
+    assert_allclose(ws.tempC.values, [1.5, float('nan'), 2.5])
+    assert not ws.json_store.key_exists('ISD-722880-2011.json')
+    assert ws.json_store.retrieve_datetime('ISD-722880-2011.bin') == fetched
+
+    series = ws.load_series(2011)
+    assert_allclose(series.values, [1.5, float('nan'), 2.5])
+
+
+def test_isd_prefetch():
+    lines = [
+        b"0" * 15 + "{}01010000".format(year).encode("ascii") + b"X" * 60 +
+        b"+0010" + b"\n"
+        for year in [2013, 2014, 2015]
+    ]
+    files = {}
+    for line, year in zip(lines, [2013, 2014, 2015]):
+        string = BytesIO()
+        with gzip.GzipFile(fileobj=string, mode="wb") as f:
+            f.write(line)
+        for station_id in ["722880-23152", "725300-94846"]:
+            filename = "/pub/data/noaa/{year}/{station}-{year}.gz" \
+                .format(station=station_id, year=year)
+            files[filename] = string.getvalue()
+
+    with MockFTPServer(files) as server:
+
+        class LocalISDWeatherSource(ISDWeatherSource):
+            client = NOAAClient(host=server.host, port=server.port,
+                                max_connections=2)
+
+        tmp_dir = tempfile.mkdtemp()
+        ws = LocalISDWeatherSource("722880", tmp_dir)
+        ws.add_year(2013)
+
+        fetched = LocalISDWeatherSource.prefetch(
+            ["722880", "725300"], [2013, 2014, 2015], tmp_dir)
+        assert sorted(fetched) == [
+            ("722880", 2014), ("722880", 2015),
+            ("725300", 2013), ("725300", 2014), ("725300", 2015),
+        ]
+        assert server.max_concurrent_connections <= 2
+        n_retrieved = len(server.retrieved)
+
+        # loaded from the cache
+        ws = LocalISDWeatherSource("725300", tmp_dir)
+        index = pd.date_range('2015-01-01', periods=2, freq='H', tz='UTC')
+        temps = ws.indexed_temperatures(index, 'degC')
+        assert_allclose(temps.values, [1.0, np.nan])
+        assert len(server.retrieved) == n_retrieved
+
+        assert LocalISDWeatherSource.prefetch(
+            ["722880", "725300"], [2013, 2014, 2015], tmp_dir) == []
+
+
+def test_resampled_views_invalidated(mock_isd_weather_source):
+    index = pd.date_range('2011-01-01', periods=2, freq='D', tz='UTC')
+    temps = mock_isd_weather_source.indexed_temperatures(index, 'degC')
+    assert_allclose(temps.values, [0, 0])
+    daily = mock_isd_weather_source._resampled('D')
+    assert mock_isd_weather_source._resampled('D') is daily
+
+    # forced refetch of a loaded year updates tempC in place
+    class Client(object):
+        def get_isd_data(self, station, year):
+            dates = pd.date_range("{}-01-01 00:00".format(year),
+                                  "{}-12-31 23:00".format(year),
+                                  freq='H', tz='UTC')
+            return pd.Series(1, index=dates, dtype=float)
+
+    mock_isd_weather_source.client = Client()
+    mock_isd_weather_source.add_year(2011, force_fetch=True)
+    temps = mock_isd_weather_source.indexed_temperatures(index, 'degC')
+    assert_allclose(temps.values, [1, 1])
+
+    # adding a year replaces tempC
+    index = pd.date_range('2012-01-01', periods=2, freq='D', tz='UTC')
+    temps = mock_isd_weather_source.indexed_temperatures(index, 'degC')
+    assert_allclose(temps.values, [1, 1])
@@ -0,0 +1,58 @@
+import tempfile
+
+import pytest
+
+from eemeter.weather import (
+    GSODWeatherSource,
+    ISDWeatherSource,
+    WeatherSourceRegistry,
+)
+
+
+@pytest.fixture
+def registry():
+    tmp_dir = tempfile.mkdtemp()
+    return WeatherSourceRegistry(max_size=2, cache_directory=tmp_dir)
+
+
+def test_basic_usage(registry):
+    ws1 = registry.get(ISDWeatherSource, "722880")
+    ws2 = registry.get(ISDWeatherSource, "722880")
+    ws3 = registry.get(GSODWeatherSource, "722880")
+
+    assert ws1 is ws2
+    assert isinstance(ws3, GSODWeatherSource)
+    assert ws1.json_store.directory == registry.cache_directory
+    assert len(registry) == 2
+    assert (ISDWeatherSource, "722880") in registry
+    assert (GSODWeatherSource, "722880") in registry
+
+
+def test_lru_eviction(registry):
+    ws1 = registry.get(ISDWeatherSource, "722880")
+    registry.get(ISDWeatherSource, "725300")
+    registry.get(ISDWeatherSource, "722880")  # now most recently used
+    registry.get(ISDWeatherSource, "724838")
+
+    assert len(registry) == 2
+    assert (ISDWeatherSource, "725300") not in registry
+    assert registry.get(ISDWeatherSource, "722880") is ws1
+
+
+def test_bad_station(registry):
+    with pytest.raises(ValueError):
+        registry.get(ISDWeatherSource, "INVALID")
+    assert len(registry) == 0
+
+
+def test_lifetime(registry):
+    with registry:
+        registry.get(ISDWeatherSource, "722880")
+        assert len(registry) == 1
+    assert len(registry) == 0
+
+
+def test_repr(registry):
+    assert str(registry) == \
+        'WeatherSourceRegistry(max_size=2, cache_directory={})'.format(
+            registry.cache_directory)
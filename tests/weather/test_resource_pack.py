@@ -0,0 +1,109 @@
+import hashlib
+import json
+import os
+import pickle
+import tempfile
+
+from numpy.testing import assert_allclose
+from pkg_resources import resource_stream
+import pytest
+
+from eemeter.weather.resource_pack import (
+    PACKED_RESOURCES,
+    PackedMapping,
+    PackedSet,
+    ResourcePack,
+    build_resource_pack,
+    get_resource_pack,
+    load_resource,
+)
+
+
+def _json_resource(filename):
+    with resource_stream('eemeter.resources', filename) as f:
+        return f.read()
+
+
+@pytest.fixture
+def pack_path():
+    resources = {
+        'zipcode_usaf_station.json': {'94403': '994041', '11542': '997280'},
+        'zipcode_centroid_lat_lngs.json': {'94403': [37.5, -122.3],
+                                           '11542': [40.8, -73.6]},
+        'climate_zone_zipcodes.json': {'CA_02': ['95968', '95476'],
+                                       'CA_11': []},
+        'supported_zipcodes.json': ['94403', '11542', '94403'],
+    }
+    directory = tempfile.mkdtemp()
+    for filename in PACKED_RESOURCES:
+        with open(os.path.join(directory, filename), 'w') as f:
+            json.dump(resources.get(filename, {}), f)
+    return build_resource_pack(os.path.join(directory, 'pack.bin'),
+                               directory)
+
+
+def test_resource_pack_tables(pack_path):
+    pack = ResourcePack(pack_path)
+    assert 'zipcode_usaf_station.json' in pack
+    assert 'missing.json' not in pack
+
+    stations = pack.table('zipcode_usaf_station.json')
+    assert isinstance(stations, PackedMapping)
+    assert stations['94403'] == '994041'
+    assert stations.get('00000') is None
+    assert stations.get('944031') is None
+    assert stations.get(None) is None
+    assert list(stations) == ['94403', '11542']
+    with pytest.raises(KeyError):
+        stations['00000']
+
+    lat_lngs = pack.table('zipcode_centroid_lat_lngs.json')
+    assert lat_lngs['11542'] == [40.8, -73.6]
+    assert_allclose(lat_lngs.value_array(),
+                    [[37.5, -122.3], [40.8, -73.6]])
+
+    zipcodes = pack.table('climate_zone_zipcodes.json')
+    assert zipcodes['CA_02'] == ['95968', '95476']
+    assert zipcodes['CA_11'] == []
+
+    supported = pack.table('supported_zipcodes.json')
+    assert isinstance(supported, PackedSet)
+    assert len(supported) == 2
+    assert '11542' in supported
+    assert '00000' not in supported
+
+    assert len(pack.table('usaf_station_lat_lngs.json')) == 0
+
+
+def test_resource_pack_pickle(pack_path):
+    stations = ResourcePack(pack_path).table('zipcode_usaf_station.json')
+    unpickled = pickle.loads(pickle.dumps(stations))
+    assert dict(unpickled) == dict(stations)
+
+
+def test_not_a_resource_pack():
+    path = os.path.join(tempfile.mkdtemp(), 'pack.bin')
+    with open(path, 'wb') as f:
+        f.write(b'not a pack')
+    with pytest.raises(ValueError):
+        ResourcePack(path)
+
+
+def test_shipped_resource_pack_is_current():
+    # rebuild with eemeter-build-resource-pack if this fails.
+    pack = get_resource_pack()
+    assert pack is not None
+    for filename in PACKED_RESOURCES:
+        data = _json_resource(filename)
+        assert pack.tables[filename]['sha1'] == hashlib.sha1(data).hexdigest()
+
+
+@pytest.mark.parametrize('filename', sorted(PACKED_RESOURCES))
+def test_load_resource_matches_json(filename):
+    expected = json.loads(_json_resource(filename).decode('utf-8'))
+    resource = load_resource(filename)
+    if isinstance(expected, list):
+        assert set(resource) == set(expected)
+    else:
+        assert list(resource) == list(expected)
+        assert dict(resource) == expected
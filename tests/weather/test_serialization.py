@@ -0,0 +1,68 @@
+import numpy as np
+from numpy.testing import assert_allclose
+import pandas as pd
+import pytest
+import pytz
+
+from eemeter.weather.serialization import (
+    deserialize_series,
+    serialize_series,
+)
+
+
+def test_hourly_roundtrip():
+    index = pd.date_range('2012-01-01', periods=8784, freq='H', tz=pytz.UTC)
+    values = np.round(np.random.RandomState(0).uniform(-20, 40, 8784), 1)
+    values[[0, 10, 8783]] = np.nan
+    series = pd.Series(values, index=index)
+
+    data = serialize_series(series, 'H')
+    assert len(data) < 8784 * 4 + 32
+
+    loaded = deserialize_series(data)
+    assert loaded.index.equals(index)
+    assert loaded.index.freq == 'H'
+    assert loaded.dtype == float
+    assert_allclose(loaded.values, values, rtol=1e-6)
+    assert np.isnan(loaded.values[[0, 10, 8783]]).all()
+
+
+def test_irregular_series_resampled():
+    index = pd.DatetimeIndex([
+        '2012-01-01 00:53', '2012-01-01 00:10', '2012-01-01 03:00',
+    ]).tz_localize(pytz.UTC)
+    series = pd.Series([1., 2., 4.], index=index)
+
+    loaded = deserialize_series(serialize_series(series, 'H'))
+
+    assert loaded.index[0] == pd.Timestamp('2012-01-01 00:00', tz=pytz.UTC)
+    assert_allclose(loaded.values, [1.5, np.nan, np.nan, 4.])
+
+
+def test_daily_roundtrip():
+    index = pd.date_range('2012-01-01', periods=366, freq='D', tz=pytz.UTC)
+    series = pd.Series(np.arange(366, dtype=float), index=index)
+
+    loaded = deserialize_series(serialize_series(series, 'D'))
+
+    assert loaded.index.equals(index)
+    assert_allclose(loaded.values, series.values)
+
+
+def test_empty():
+    series = pd.Series([], index=pd.DatetimeIndex([], tz=pytz.UTC),
+                       dtype=float)
+    loaded = deserialize_series(serialize_series(series, 'H'))
+    assert loaded.shape == (0,)
+
+
+def test_bad_freq():
+    series = pd.Series([1.], index=pd.DatetimeIndex(
+        ['2012-01-01'], tz=pytz.UTC))
+    with pytest.raises(ValueError):
+        serialize_series(series, 'M')
+
+
+def test_bad_data():
+    with pytest.raises(ValueError):
+        deserialize_series(b'NOPE' + b'\x00' * 32)
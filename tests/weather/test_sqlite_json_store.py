@@ -1,6 +1,11 @@
+from multiprocessing import Pool
+from multiprocessing.pool import ThreadPool
+import pickle
 import tempfile
+import threading
 from datetime import datetime
 import pytz
+import pytest
 
 from eemeter.weather.cache import SqliteJSONStore
 
@@ -44,3 +49,135 @@ def test_basic_usage():
     s.clear("b")
     assert s.key_exists("a") is True
     assert s.key_exists("b") is False
+
+
+def test_pickle():
+    tmpdir = tempfile.mkdtemp()
+    s = SqliteJSONStore(tmpdir)
+    s.save_json("a", [1])
+
+    s2 = pickle.loads(pickle.dumps(s))
+    assert s2.directory == tmpdir
+    assert s2.retrieve_json("a") == [1]
+
+
+def test_blob():
+    tmpdir = tempfile.mkdtemp()
+    s = SqliteJSONStore(tmpdir)
+
+    assert s.retrieve_blob("a") is None
+    s.save_blob("a", b"\x00\x01")
+    assert s.key_exists("a") is True
+    assert s.retrieve_blob("a") == b"\x00\x01"
+
+    s.save_blob("a", b"\x02")
+    assert s.retrieve_blob("a") == b"\x02"
+
+
+def test_move_to_blob():
+    tmpdir = tempfile.mkdtemp()
+    s = SqliteJSONStore(tmpdir)
+
+    s.save_json("a.json", [1])
+    s.conn.execute("UPDATE items SET dt='2000-01-01 00:00:00';")
+    s.conn.commit()
+
+    s.move_to_blob("a.json", "a.bin", b"\x01")
+    assert s.key_exists("a.json") is False
+    assert s.retrieve_blob("a.bin") == b"\x01"
+    assert s.retrieve_datetime("a.bin") == datetime(2000, 1, 1)
+
+    # new key already exists: old item is dropped
+    s.save_json("a.json", [1])
+    s.move_to_blob("a.json", "a.bin", b"\x02")
+    assert s.key_exists("a.json") is False
+    assert s.retrieve_blob("a.bin") == b"\x01"
+
+
+def test_save_blobs():
+    tmpdir = tempfile.mkdtemp()
+    s = SqliteJSONStore(tmpdir)
+    s.save_blob("a", b"old")
+
+    s.save_blobs([("a", b"\x00new"), ("b", b"\x01")])
+    assert s.retrieve_blob("a") == b"\x00new"
+    assert s.retrieve_blob("b") == b"\x01"
+
+    # all or nothing
+    with pytest.raises(TypeError):
+        s.save_blobs([("c", b"\x02"), ("d", None)])
+    assert s.key_exists("c") is False
+
+
+def test_transaction():
+    tmpdir = tempfile.mkdtemp()
+    s = SqliteJSONStore(tmpdir)
+
+    with s.transaction():
+        s.save_json("a", 1)
+        with s.transaction():
+            s.save_json("b", 2)
+        # not visible to other connections until committed
+        assert SqliteJSONStore(tmpdir).key_exists("a") is False
+    assert SqliteJSONStore(tmpdir).retrieve_json("b") == 2
+
+    with pytest.raises(ValueError):
+        with s.transaction():
+            s.save_json("c", 3)
+            raise ValueError
+    assert s.key_exists("c") is False
+    assert s.retrieve_json("a") == 1
+
+
+def test_wal():
+    tmpdir = tempfile.mkdtemp()
+    s = SqliteJSONStore(tmpdir)
+    journal_mode = s.conn.execute('PRAGMA journal_mode;').fetchone()[0]
+    assert journal_mode == 'wal'
+
+
+_store = None  # shared by threads, inherited by forked processes
+
+
+def _save_many(prefix):
+    for i in range(20):
+        _store.save_json("{}-{}".format(prefix, i % 5), i)
+        assert _store.retrieve_json("{}-{}".format(prefix, i % 5)) == i
+        _store.save_json("shared", prefix)
+    return prefix
+
+
+def _check_concurrent_saves(pool_class, prefixes):
+    global _store
+    tmpdir = tempfile.mkdtemp()
+    _store = s = SqliteJSONStore(tmpdir)
+    s.save_json("shared", None)
+    pool = pool_class(4)
+    try:
+        assert pool.map(_save_many, prefixes) == prefixes
+    finally:
+        pool.close()
+        pool.join()
+
+    for prefix in prefixes:
+        assert s.retrieve_json("{}-4".format(prefix)) == 19
+    assert s.retrieve_json("shared") in prefixes
+    n_items = s.conn.execute('SELECT COUNT(*) FROM items;').fetchone()[0]
+    assert n_items == 5 * len(prefixes) + 1
+
+
+def test_concurrent_threads():
+    _check_concurrent_saves(ThreadPool, list("abcdefgh"))
+
+    # one connection per thread
+    s = _store
+    assert s.conn is s.conn
+    conns = []
+    thread = threading.Thread(target=lambda: conns.append(s.conn))
+    thread.start()
+    thread.join()
+    assert conns[0] is not s.conn
+
+
+def test_concurrent_processes():
+    _check_concurrent_saves(Pool, list("abcdefgh"))
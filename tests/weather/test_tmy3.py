@@ -51,3 +51,32 @@ def test_bad_station():
 
 def test_repr(mock_tmy3_weather_source):
     assert 'TMY3WeatherSource("724838")' == str(mock_tmy3_weather_source)
+
+
+def test_json_cache_migration():
+    tmp_dir = tempfile.mkdtemp()
+    ws = TMY3WeatherSource("724838", tmp_dir, preload=False)
+    index = pd.date_range('1900-01-01', periods=2, freq='H', tz='UTC')
+    legacy_data = [
+        [d.strftime(ws.cache_date_format), t]
+        for d, t in zip(index, [1.5, 2.5])
+    ]
+    ws.json_store.save_json('TMY3-724838.json', legacy_data)
+
+    ws.client = None  # must not fetch
+    ws._load_data()
+
+    assert_allclose(ws.tempC.values, [1.5, 2.5])
+    assert not ws.json_store.key_exists('TMY3-724838.json')
+    assert ws.json_store.key_exists('TMY3-724838.bin')
+
+
+def test_resampled_views(mock_tmy3_weather_source):
+    index = pd.date_range('2000-01-01 00:00:00Z', periods=2, freq='D')
+    mock_tmy3_weather_source.indexed_temperatures(index, 'degF')
+    assert len(mock_tmy3_weather_source._resampled_views) == 1
+
+    mock_tmy3_weather_source.tempC = mock_tmy3_weather_source.tempC + 10
+    assert len(mock_tmy3_weather_source._resampled_views) == 0
+    temps = mock_tmy3_weather_source.indexed_temperatures(index, 'degC')
+    assert_allclose(temps.values, [10, 10])